@@ -1,14 +1,40 @@
 """Streamlit application for interactive margin calculations."""
 
-import inspect
+import functools
+import hashlib
+import json
+import os
+import time
 from decimal import Decimal
 
+import altair as alt
+import numpy as np
+import pandas as pd
 import streamlit as st
 
 try:  # Prefer relative import when installed as a package
-    from .calculator import cena_z_marzy, licz_marze_z_ceny
+    from . import calculator
+    from .app_support import CSS, LANGUAGES, compat_submit_button
+    from .cache import CalculatorCache
+    from .catalog import guess_format, process_catalog, read_catalog, to_csv_bytes
+    from .discount import DiscountError, oblicz_obnizke
+    from .index import MarginIndex
+    from .metrics import METRICS, InstrumentedCalculator
+    from .scenarios import ScenarioGrid, siatka_obnizki
+    from .simulation import Distribution, SimulationResult, symuluj_obnizke
 except ImportError:  # Fallback for running as a standalone script
-    from calculator import cena_z_marzy, licz_marze_z_ceny
+    import calculator
+    from app_support import CSS, LANGUAGES, compat_submit_button
+    from cache import CalculatorCache
+    from catalog import guess_format, process_catalog, read_catalog, to_csv_bytes
+    from discount import DiscountError, oblicz_obnizke
+    from index import MarginIndex
+    from metrics import METRICS, InstrumentedCalculator
+    from scenarios import ScenarioGrid, siatka_obnizki
+    from simulation import Distribution, SimulationResult, symuluj_obnizke
+
+# Start of the rerun timed as ``app_rerun`` when ``MARGIN_CALC_PROFILE`` is set.
+RERUN_START = time.perf_counter()
 
 # ------------------ Konfiguracja / Config ------------------
 st.set_page_config(
@@ -16,134 +42,28 @@ st.set_page_config(
     page_icon="💰",
 )
 
-# Prevent button labels from wrapping
-st.markdown(
-    "<style>div.stButton>button, form button[type=submit]{white-space:nowrap}</style>",
-    unsafe_allow_html=True,
-)
+st.markdown(CSS, unsafe_allow_html=True)
 
-# Ensure uniform size and centered text for all number inputs
-st.markdown(
-    """
-    <style>
-        div.stNumberInput>label {
-            display: block;
-            text-align: center;
-            white-space: nowrap;
-        }
-        div.stNumberInput input {
-            text-align: center;
-        }
-        div.stNumberInput>div {
-            width: 100%;
-        }
-    </style>
-    """,
-    unsafe_allow_html=True,
-)
 
-# Compatibility helper for older Streamlit versions.
-_fsb_params = inspect.signature(st.form_submit_button).parameters
-
-
-def compat_submit_button(label: str, *, key=None, on_click=None, args=None):
-    """Wrapper for ``st.form_submit_button`` handling old Streamlit releases."""
-    kwargs = {}
-    label_mod = label
-    # Encode ``key`` with zero-width characters for uniqueness on old Streamlit
-    if "key" not in _fsb_params and key is not None:
-        import hashlib
-
-        digest = hashlib.sha256(str(key).encode()).digest()
-        bits = "".join(f"{b:08b}" for b in digest)
-        # Use zero width joiner characters which don't introduce line breaks
-        zw = "".join("\u2060" if bit == "0" else "\u200d" for bit in bits)
-        label_mod += zw
-    elif "key" in _fsb_params and key is not None:
-        kwargs["key"] = key
-    if "on_click" in _fsb_params and on_click is not None:
-        kwargs["on_click"] = on_click
-    if "args" in _fsb_params and args is not None:
-        kwargs["args"] = args
-    pressed = st.form_submit_button(label_mod, **kwargs)
-    if "on_click" not in _fsb_params and pressed and on_click is not None:
-        if args:
-            on_click(*args)
-        else:
-            on_click()
-    return pressed
+@st.cache_resource
+def _calculator():
+    """Return the calculator, memoized when ``MARGIN_CALC_CACHE_SIZE`` is set.
 
+    The cache is shared by all sessions of the server process. The app only
+    shows rounded results, so equal numbers such as ``50`` and ``50.00``
+    share an entry. Calls are timed when ``MARGIN_CALC_PROFILE`` enables
+    :data:`metrics.METRICS`.
+    """
+    size = int(os.environ.get("MARGIN_CALC_CACHE_SIZE") or 0)
+    cache = CalculatorCache(size, normalize=True) if size > 0 else None
+    if METRICS.enabled:
+        return InstrumentedCalculator(cache)
+    return calculator if cache is None else cache
 
-# ------------------ Tłumaczenia / Translations -------------
-PL = {
-    "title": "💰 Kalkulator Marży",
-    "tab_discount": "Obniżka marży / ceny",
-    "tab_quick": "Szybki kalkulator marży",
-    "discount_header": "📉 Obniżka marży / ceny",
-    "quick_header": "⚙️ Szybki kalkulator marży",
-    "quick_sub": "podaj dowolne 2 pola",
-    "calc_mode": "Tryb kalkulatora",
-    "tkw": "TKW (koszt jednostkowy)",
-    "price": "Cena sprzedaży",
-    "old_margin": "Obecna marża [%]",
-    "new_margin": "Nowa marża [%]",
-    "new_price": "Nowa cena sprzedaży",
-    "qty": "Ilość sprzedana wcześniej [szt.]",
-    "btn_discount": "Oblicz",
-    "btn_quick": "Oblicz",
-    "btn_clear": "Wyczyść",
-    "btn_clear_all": "Wyczyść wszystko",
-    "btn_example": "Wczytaj przykład",
-    "or": "lub",
-    "err_fill": "Uzupełnij TKW oraz ilość sprzedaną wcześniej.",
-    "err_pair_old": "Podaj starą marżę lub starą cenę.",
-    "err_pair_new": "Podaj nową marżę lub nową cenę.",
-    "err_loss": "Zysk po obniżce wynosi 0 lub mniej – obliczenia niemożliwe.",
-    "err_two_values": "⚠️ Podaj dowolne dwie wartości.",
-    "res_profit_old": "📈 **Zysk przed:** {v:.2f}/szt",
-    "res_profit_new": "📉 **Zysk po:** {v:.2f}/szt",
-    "res_loss": "💰 **Strata łączna:** {v:.2f}",
-    "res_extra": "➕ Dodatkowa sprzedaż",
-    "res_total": "📦 **Łącznie:** {v} szt.",
-    "res_quick": "**TKW:** {tkw:.2f}  |  **Cena:** {price:.2f}  |  **Marża:** {margin:.2f} %",
-    "author": "Autor programu: Marcin Czerwiński  |  Product Concept",
-}
-EN = {
-    "title": "💰 Margin Calculator",
-    "tab_discount": "Margin / price drop",
-    "tab_quick": "Quick margin calc",
-    "discount_header": "📉 Margin / price drop",
-    "quick_header": "⚙️ Quick margin calculator",
-    "quick_sub": "fill any 2 fields",
-    "calc_mode": "Calculator mode",
-    "tkw": "Production cost (unit cost)",
-    "price": "Sale price",
-    "old_margin": "Current margin [%]",
-    "new_margin": "New margin [%]",
-    "new_price": "New sale price",
-    "qty": "Quantity sold before [pcs]",
-    "btn_discount": "Calculate",
-    "btn_quick": "Calculate",
-    "btn_clear": "Clear",
-    "btn_clear_all": "Clear all",
-    "btn_example": "Load example",
-    "or": "or",
-    "err_fill": "Fill Production cost and previous quantity first.",
-    "err_pair_old": "Provide either old margin or old price.",
-    "err_pair_new": "Provide either new margin or new price.",
-    "err_loss": "Profit after drop is 0 or negative – cannot compute.",
-    "err_two_values": "⚠️ Provide any two values.",
-    "res_profit_old": "📈 **Profit before:** {v:.2f}/pc",
-    "res_profit_new": "📉 **Profit after:** {v:.2f}/pc",
-    "res_loss": "💰 **Total loss:** {v:.2f}",
-    "res_extra": "➕ Extra sales needed",
-    "res_total": "📦 **Total:** {v} pcs",
-    "res_quick": "**Production cost:** {tkw:.2f}  |  **Price:** {price:.2f}  |  **Margin:** {margin:.2f} %",
-    "author": "Program author: Marcin Czerwiński  |  Product Concept",
-}
 
-lang = st.sidebar.selectbox("Language / Język", ("Polski", "English"))
-T = PL if lang == "Polski" else EN
+# ------------------ Tłumaczenia / Translations -------------
+lang = st.sidebar.selectbox("Language / Język", tuple(LANGUAGES))
+T = LANGUAGES[lang]
 
 # ------------------ Session state defaults -----------------
 INITIAL_DISCOUNT = {
@@ -289,12 +209,13 @@ query = st.query_params
 default_tab = query.get("tab", "discount")
 st.session_state.setdefault("selected_tab", default_tab)
 
-tab_labels = [T["tab_discount"], T["tab_quick"]]
+TAB_KEYS = ("discount", "quick", "catalog")
+tab_labels = [T[f"tab_{key}"] for key in TAB_KEYS]
 
 
 def _on_tab_change() -> None:
     label = st.session_state.get("tab_choice", tab_labels[0])
-    new_key = "discount" if label == T["tab_discount"] else "quick"
+    new_key = TAB_KEYS[tab_labels.index(label)] if label in tab_labels else "discount"
     if new_key != st.session_state.get("selected_tab"):
         clear_discount_all()
         clear_quick_all()
@@ -308,17 +229,41 @@ def _on_tab_change() -> None:
 st.radio(
     label=T["calc_mode"],
     options=tab_labels,
-    index=0 if st.session_state["selected_tab"] == "discount" else 1,
+    index=(
+        TAB_KEYS.index(st.session_state["selected_tab"])
+        if st.session_state["selected_tab"] in TAB_KEYS
+        else 0
+    ),
     key="tab_choice",
     on_change=_on_tab_change,
     label_visibility="collapsed",
 )
 
+
+# Each tab is a fragment: submitting or clearing its form reruns only the
+# fragment instead of the whole script.
+def _timed_fragment(func):
+    """Time every run of the fragment ``func`` as ``app_fragment_<name>``.
+
+    Fragment reruns skip the rest of the script and so are not part of
+    ``app_rerun``.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with METRICS.timer(f"app_fragment_{func.__name__}"):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
 # ========= Zakładka 1: obniżka marży / ceny ================
-if st.session_state["selected_tab"] == "discount":
+@st.fragment
+@_timed_fragment
+def discount_tab() -> None:
+    """Render the margin / price drop form and its result."""
     st.header(T["discount_header"])
     with st.form("discount_form"):
-
         col_a, col_or1, col_b = st.columns([1, 0.15, 1])
         with col_a:
             tkw = number_input_with_clear(T["tkw"], "tkw", INITIAL_DISCOUNT)
@@ -375,58 +320,303 @@ if st.session_state["selected_tab"] == "discount":
         )
     if submitted_discount:
         with st.spinner("Obliczanie..."):
-
-            if not _entered("tkw") or not _entered("ilosc_stara"):
-                st.error(T["err_fill"])
-                st.stop()
-
-            if _entered("marza_stara"):
-                cena_stara = cena_z_marzy(
-                    tkw,
-                    marza_stara / Decimal(100),
-                ).quantize(Decimal("0.01"))
-            elif not _entered("cena_stara"):
-                st.error(T["err_pair_old"])
-                st.stop()
-            else:
-                marza_stara = licz_marze_z_ceny(tkw, cena_stara) * 100
-
-            if _entered("marza_nowa"):
-                cena_nowa = cena_z_marzy(
-                    tkw,
-                    marza_nowa / Decimal(100),
-                ).quantize(Decimal("0.01"))
-            elif not _entered("cena_nowa"):
-                st.error(T["err_pair_new"])
-                st.stop()
-            else:
-                marza_nowa = licz_marze_z_ceny(tkw, cena_nowa) * 100
-
-            zysk_stary = cena_stara - tkw
-            zysk_nowy = cena_nowa - tkw
-            strata = (zysk_stary - zysk_nowy) * ilosc_stara
-
-            if zysk_nowy <= 0:
-                st.error(T["err_loss"])
-                st.stop()
-
-            ilosc_dodatkowa = round(strata / zysk_nowy)
-            ilosc_nowych = ilosc_stara + ilosc_dodatkowa
-
-            st.metric("➕ Dodatkowa sprzedaż", f"{ilosc_dodatkowa} szt.")
+            try:
+                with METRICS.timer("oblicz_obnizke"):
+                    wynik = oblicz_obnizke(
+                        tkw if _entered("tkw") else None,
+                        ilosc_stara if _entered("ilosc_stara") else None,
+                        cena_stara=cena_stara if _entered("cena_stara") else None,
+                        marza_stara=(
+                            marza_stara / Decimal(100)
+                            if _entered("marza_stara")
+                            else None
+                        ),
+                        cena_nowa=cena_nowa if _entered("cena_nowa") else None,
+                        marza_nowa=(
+                            marza_nowa / Decimal(100)
+                            if _entered("marza_nowa")
+                            else None
+                        ),
+                    )
+            except DiscountError as exc:
+                st.error(T[exc.code])
+                return
+
+            st.metric("➕ Dodatkowa sprzedaż", f"{wynik.ilosc_dodatkowa} szt.")
 
             st.success(
-                T["res_profit_old"].format(v=zysk_stary)
+                T["res_profit_old"].format(v=wynik.zysk_stary)
                 + "  \n"
-                + T["res_profit_new"].format(v=zysk_nowy)
+                + T["res_profit_new"].format(v=wynik.zysk_nowy)
                 + "  \n"
-                + T["res_loss"].format(v=strata)
+                + T["res_loss"].format(v=wynik.strata)
                 + "  \n"
-                + T["res_total"].format(v=ilosc_nowych)
+                + T["res_total"].format(v=wynik.ilosc_nowych)
             )
 
+
+SCENARIO_DISPLAY_CELLS = 100
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def _scenario_grid(
+    dane: tuple,
+    os_marzy: bool,
+    zakres: tuple[float, float, int],
+    zakres_tkw: tuple[float, float, int],
+) -> ScenarioGrid:
+    """Return the scenario grid, memoized per set of inputs.
+
+    ``dane`` holds ``tkw``, ``ilosc_stara``, ``cena_stara`` and the old margin
+    in percent; ranges are ``(start, stop, steps)`` with margins and cost
+    changes in percent.
+    """
+    tkw, ilosc_stara, cena_stara, marza_stara = dane
+    wartosci = np.linspace(*zakres)
+    with METRICS.timer("siatka_obnizki"):
+        return siatka_obnizki(
+            tkw,
+            ilosc_stara,
+            cena_stara=cena_stara,
+            marza_stara=None if marza_stara is None else marza_stara / 100,
+            cena_nowa=None if os_marzy else wartosci,
+            marza_nowa=wartosci / 100 if os_marzy else None,
+            zmiana_tkw=np.linspace(*zakres_tkw) / 100,
+        )
+
+
+def _scenario_chart(grid: ScenarioGrid, os_marzy: bool, metric: str) -> None:
+    """Plot ``metric`` of ``grid``, subsampled to at most 100 x 100 cells."""
+    values = getattr(grid, metric)
+    rows, cols = (
+        np.unique(np.linspace(0, n - 1, SCENARIO_DISPLAY_CELLS).astype(int))
+        for n in values.shape
+    )
+    y = grid.marza_nowa[rows, 0] * 100 if os_marzy else grid.cena_nowa[rows, 0]
+    y_title = T["new_margin"] if os_marzy else T["new_price"]
+    z_title = T["scenario_extra" if metric == "ilosc_dodatkowa" else "scenario_loss"]
+    if len(cols) == 1:
+        st.line_chart(pd.DataFrame({z_title: values[rows, 0]}, index=y.round(2)))
+        return
+    x = grid.tkw_nowe[cols]
+    frame = pd.DataFrame(
+        {
+            "x": np.tile(x.round(2), len(y)),
+            "y": np.repeat(y.round(2), len(x)),
+            "z": values[np.ix_(rows, cols)].ravel(),
+        }
+    )
+    chart = (
+        alt.Chart(frame)
+        .mark_rect()
+        .encode(
+            x=alt.X("x:O", title=T["tkw"], axis=alt.Axis(labelOverlap=True)),
+            y=alt.Y("y:O", title=y_title, sort="descending"),
+            color=alt.Color("z:Q", title=z_title, scale=alt.Scale(scheme="viridis")),
+            tooltip=[
+                alt.Tooltip("x:Q", title=T["tkw"]),
+                alt.Tooltip("y:Q", title=y_title),
+                alt.Tooltip("z:Q", title=z_title),
+            ],
+        )
+    )
+    st.altair_chart(chart, use_container_width=True)
+
+
+@st.fragment
+@_timed_fragment
+def scenario_section() -> None:
+    """Render the sensitivity grid for the values of the discount form."""
+    st.subheader(T["scenario_header"])
+    st.caption(T["scenario_help"])
+    with st.form("scenario_form"):
+        os_marzy = st.radio(
+            T["scenario_axis"],
+            (True, False),
+            format_func=lambda m: T["new_margin"] if m else T["new_price"],
+            horizontal=True,
+            key="scenario_axis",
+        )
+        col_from, col_to, col_steps = st.columns(3)
+        start = col_from.number_input(T["scenario_from"], value=5.0, key="sc_from")
+        stop = col_to.number_input(T["scenario_to"], value=40.0, key="sc_to")
+        steps = col_steps.number_input(
+            T["scenario_steps"], 1, 1000, 100, key="sc_steps"
+        )
+        col_tkw_from, col_tkw_to, col_tkw_steps = st.columns(3)
+        tkw_from = col_tkw_from.number_input(
+            T["scenario_tkw_from"], value=0.0, key="sc_tkw_from"
+        )
+        tkw_to = col_tkw_to.number_input(
+            T["scenario_tkw_to"], value=0.0, key="sc_tkw_to"
+        )
+        tkw_steps = col_tkw_steps.number_input(
+            T["scenario_steps"], 1, 1000, 1, key="sc_tkw_steps"
+        )
+        metric = st.radio(
+            T["scenario_metric"],
+            ("ilosc_dodatkowa", "strata"),
+            format_func=lambda m: T[
+                "scenario_extra" if m == "ilosc_dodatkowa" else "scenario_loss"
+            ],
+            horizontal=True,
+            key="scenario_metric",
+        )
+        submitted = compat_submit_button(T["btn_discount"], key="submit_scenario")
+    if not submitted:
+        return
+
+    def value(key: str):
+        return float(st.session_state[key]) if _entered(key) else None
+
+    dane = (
+        value("tkw"),
+        value("ilosc_stara"),
+        value("cena_stara"),
+        value("marza_stara"),
+    )
+    try:
+        with st.spinner("Obliczanie..."):
+            grid = _scenario_grid(
+                dane,
+                os_marzy,
+                (start, stop, int(steps)),
+                (tkw_from, tkw_to, int(tkw_steps)),
+            )
+    except DiscountError as exc:
+        st.error(T[exc.code])
+        return
+    st.caption(T["scenario_size"].format(rows=int(steps), cols=int(tkw_steps)))
+    _scenario_chart(grid, os_marzy, metric)
+
+
+SIMULATION_DRAWS = (10_000, 100_000, 1_000_000)
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def _simulation(
+    dane: tuple,
+    rozrzut: tuple[float, float],
+    wzrost: tuple[float, float, float],
+    proby: int,
+    seed: int,
+) -> SimulationResult:
+    """Return the Monte Carlo simulation, memoized per set of inputs.
+
+    ``dane`` holds ``tkw``, ``ilosc_stara``, ``cena_stara``, the old margin,
+    ``cena_nowa`` and the new margin; margins, the standard deviation of the
+    cost and the spread of the new price in ``rozrzut`` and the demand uplift
+    ``(min, mode, max)`` are in percent.
+    """
+    tkw, ilosc_stara, cena_stara, marza_stara, cena_nowa, marza_nowa = dane
+    if tkw is not None and marza_nowa is not None:
+        cena_nowa = float(
+            _calculator().cena_z_marzy(
+                Decimal(str(tkw)), Decimal(str(marza_nowa)) / 100
+            )
+        )
+    tkw_sd, cena_spread = (value / 100 for value in rozrzut)
+    with METRICS.timer("symuluj_obnizke"):
+        return symuluj_obnizke(
+            None if tkw is None else Distribution("normal", (tkw, tkw * tkw_sd)),
+            ilosc_stara,
+            cena_stara=cena_stara,
+            marza_stara=None if marza_stara is None else marza_stara / 100,
+            cena_nowa=(
+                None
+                if cena_nowa is None
+                else Distribution(
+                    "triangular",
+                    (
+                        cena_nowa * (1 - cena_spread),
+                        cena_nowa,
+                        cena_nowa * (1 + cena_spread),
+                    ),
+                )
+            ),
+            wzrost_sprzedazy=Distribution("triangular", tuple(v / 100 for v in wzrost)),
+            proby=proby,
+            seed=seed,
+        )
+
+
+@st.fragment
+@_timed_fragment
+def simulation_section() -> None:
+    """Render the Monte Carlo risk analysis for the values of the discount form."""
+    st.subheader(T["sim_header"])
+    st.caption(T["sim_help"])
+    with st.form("simulation_form"):
+        col_tkw, col_price = st.columns(2)
+        tkw_sd = col_tkw.number_input(
+            T["sim_tkw_sd"], 0.0, 100.0, 5.0, key="sim_tkw_sd"
+        )
+        cena_spread = col_price.number_input(
+            T["sim_price_spread"], 0.0, 100.0, 0.0, key="sim_price_spread"
+        )
+        col_min, col_mode, col_max = st.columns(3)
+        wzrost = (
+            col_min.number_input(T["sim_uplift_min"], value=10.0, key="sim_up_min"),
+            col_mode.number_input(T["sim_uplift_mode"], value=25.0, key="sim_up_mode"),
+            col_max.number_input(T["sim_uplift_max"], value=50.0, key="sim_up_max"),
+        )
+        col_draws, col_seed = st.columns(2)
+        proby = col_draws.selectbox(
+            T["sim_draws"],
+            SIMULATION_DRAWS,
+            index=1,
+            format_func="{:,}".format,
+            key="sim_draws",
+        )
+        seed = col_seed.number_input(T["sim_seed"], 0, 2**31 - 1, 0, key="sim_seed")
+        submitted = compat_submit_button(T["btn_discount"], key="submit_simulation")
+    if not submitted:
+        return
+    if list(wzrost) != sorted(wzrost):
+        st.error(T["sim_uplift_order"])
+        return
+
+    def value(key: str):
+        return float(st.session_state[key]) if _entered(key) else None
+
+    dane = tuple(
+        value(key)
+        for key in (
+            "tkw",
+            "ilosc_stara",
+            "cena_stara",
+            "marza_stara",
+            "cena_nowa",
+            "marza_nowa",
+        )
+    )
+    try:
+        with st.spinner("Obliczanie..."):
+            wynik = _simulation(
+                dane, (tkw_sd, cena_spread), wzrost, int(proby), int(seed)
+            )
+    except DiscountError as exc:
+        st.error(T[exc.code])
+        return
+    col_p, col_mean = st.columns(2)
+    col_p.metric(T["sim_probability"], f"{wynik.prawdopodobienstwo:.1%}")
+    col_mean.metric(T["sim_mean_loss"], f"{wynik.strata_srednia:,.2f}")
+    st.dataframe(
+        pd.DataFrame(
+            {
+                T["sim_percentile"]: [f"P{p:g}" for p in wynik.percentyle_straty],
+                T["scenario_loss"]: list(wynik.percentyle_straty.values()),
+            }
+        ),
+        hide_index=True,
+    )
+
+
 # ========= Zakładka 2: szybki kalkulator ====================
-elif st.session_state["selected_tab"] == "quick":
+@st.fragment
+@_timed_fragment
+def quick_tab() -> None:
+    """Render the quick margin calculator form and its result."""
     st.header(T["quick_header"])
     with st.form("quick_form"):
         or_html = f"<div style='text-align:center; padding-top:2.3rem; font-weight:700;'>{T['or']}</div>"
@@ -473,16 +663,16 @@ elif st.session_state["selected_tab"] == "quick":
         )
     if submitted_quick:
         with st.spinner("Obliczanie..."):
-
             pola = [_entered("tkw_m"), _entered("cena_m"), _entered("marza_m")]
             if sum(pola) < 2:
                 st.error(T["err_two_values"])
-                st.stop()
+                return
 
+            calc = _calculator()
             if _entered("cena_m") and _entered("tkw_m"):
-                marza_m = licz_marze_z_ceny(tkw_m, cena_m) * 100
+                marza_m = calc.licz_marze_z_ceny(tkw_m, cena_m) * 100
             elif _entered("tkw_m") and _entered("marza_m"):
-                cena_m = cena_z_marzy(tkw_m, marza_m / Decimal(100)).quantize(
+                cena_m = calc.cena_z_marzy(tkw_m, marza_m / Decimal(100)).quantize(
                     Decimal("0.01")
                 )
             elif _entered("cena_m") and _entered("marza_m"):
@@ -490,8 +680,140 @@ elif st.session_state["selected_tab"] == "quick":
 
             st.success(T["res_quick"].format(tkw=tkw_m, price=cena_m, margin=marza_m))
 
+
+# ========= Zakładka 3: katalog produktów ====================
+CATALOG_PAGE_SIZE = 100
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def _catalog_result(digest: str, fmt: str, _data: bytes) -> pd.DataFrame:
+    """Return the processed catalog, cached by the SHA-256 ``digest`` of the file."""
+    return process_catalog(read_catalog(_data, fmt))
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def _catalog_csv(digest: str, language: str, _result: pd.DataFrame) -> bytes:
+    """Return the results of the catalog ``digest`` translated to ``language``."""
+    return to_csv_bytes(_translate_errors(_result))
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def _catalog_index(digest: str, _result: pd.DataFrame) -> MarginIndex:
+    """Return the margin index of the catalog ``digest`` keyed by row number."""
+    rows = [str(row) for row in range(len(_result))]
+    return MarginIndex(rows, _result["tkw"], _result["cena_stara"])
+
+
+def _translate_errors(result: pd.DataFrame) -> pd.DataFrame:
+    """Return ``result`` with error codes replaced by translated messages."""
+    return result.assign(blad=result["blad"].map(lambda code: T.get(code, code)))
+
+
+@st.fragment
+@_timed_fragment
+def catalog_tab() -> None:
+    """Render the catalog upload, the paginated results and their download."""
+    st.header(T["catalog_header"])
+    st.caption(T["catalog_help"])
+    uploaded = st.file_uploader(
+        T["catalog_upload"], type=["csv", "xlsx"], key="catalog_file"
+    )
+    if uploaded is None:
+        return
+    data = uploaded.getvalue()
+    digest = hashlib.sha256(data).hexdigest()
+    fmt = guess_format(uploaded.name)
+    try:
+        with st.spinner("Obliczanie..."):
+            result = _catalog_result(digest, fmt, data)
+    except (ValueError, ImportError) as exc:
+        st.error(T["err_catalog"].format(e=exc))
+        return
+
+    errors = int((result["blad"] != "").sum())
+    st.success(T["catalog_summary"].format(rows=len(result), errors=errors))
+
+    with st.expander(T["catalog_filter"]):
+        col1, col2 = st.columns(2)
+        cut = col1.number_input(
+            T["catalog_cut"], min_value=0.0, max_value=99.0, step=1.0, key="catalog_cut"
+        )
+        max_extra = col2.number_input(
+            T["catalog_max_extra"], min_value=0.0, step=1.0, key="catalog_max_extra"
+        )
+    shown = result
+    if cut > 0 and max_extra > 0:
+        rows = _catalog_index(digest, result).mozliwa_obnizka(
+            cut / 100, max_extra / 100
+        )
+        shown = result.iloc[np.sort(rows)]
+        st.caption(T["catalog_filtered"].format(rows=len(shown)))
+
+    view = (digest, cut, max_extra)
+    if st.session_state.get("catalog_view") != view:
+        st.session_state["catalog_view"] = view
+        st.session_state["catalog_page"] = 1
+    pages = max(1, -(-len(shown) // CATALOG_PAGE_SIZE))
+    page = st.number_input(
+        T["catalog_page"].format(pages=pages),
+        min_value=1,
+        max_value=pages,
+        step=1,
+        key="catalog_page",
+    )
+    start = (page - 1) * CATALOG_PAGE_SIZE
+    page_rows = shown.iloc[start : start + CATALOG_PAGE_SIZE]
+    st.dataframe(_translate_errors(page_rows), hide_index=True)
+
+    st.download_button(
+        T["catalog_download"],
+        data=_catalog_csv(digest, lang, result),
+        file_name=f"{uploaded.name.rsplit('.', 1)[0]}_wyniki.csv",
+        mime="text/csv",
+    )
+
+
+if st.session_state["selected_tab"] == "discount":
+    discount_tab()
+    scenario_section()
+    simulation_section()
+elif st.session_state["selected_tab"] == "quick":
+    quick_tab()
+elif st.session_state["selected_tab"] == "catalog":
+    catalog_tab()
+
 # ====== Informacja o autorze ======
 author_html = (
     f"<div style='margin-top:2em;text-align:center;color:#999'>{T['author']}</div>"
 )
 st.markdown(author_html, unsafe_allow_html=True)
+
+
+# ====== Metryki / Metrics (MARGIN_CALC_PROFILE) ======
+@st.fragment
+def metrics_exports() -> None:
+    """Offer the metrics exports, rebuilt on every run of the fragment.
+
+    Fragment reruns record metrics without rerunning this part of the
+    script, so the refresh button and every download rerun the fragment to
+    export the current registry.
+    """
+    st.button(T["metrics_refresh"])
+    st.download_button(
+        T["metrics_prometheus"],
+        data=METRICS.to_prometheus(),
+        file_name="metrics.txt",
+        mime="text/plain",
+    )
+    st.download_button(
+        T["metrics_json"],
+        data=json.dumps(METRICS.snapshot(), indent=2),
+        file_name="metrics.json",
+        mime="application/json",
+    )
+
+
+if METRICS.enabled:
+    with st.sidebar.expander(T["metrics_header"]):
+        metrics_exports()
+    METRICS.observe("app_rerun", time.perf_counter() - RERUN_START)
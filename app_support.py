@@ -0,0 +1,230 @@
+"""Static parts of the Streamlit application.
+
+Streamlit executes ``app.py`` from the top on every interaction, while this
+module is imported once per process. Translations, CSS and the zero-width key
+encoding of :func:`compat_submit_button` are therefore built only once.
+"""
+
+import hashlib
+import inspect
+from functools import lru_cache
+
+import streamlit as st
+
+# Prevent button labels from wrapping and ensure uniform size and centered
+# text for all number inputs
+CSS = """
+<style>
+    div.stButton>button, form button[type=submit] {
+        white-space: nowrap;
+    }
+    div.stNumberInput>label {
+        display: block;
+        text-align: center;
+        white-space: nowrap;
+    }
+    div.stNumberInput input {
+        text-align: center;
+    }
+    div.stNumberInput>div {
+        width: 100%;
+    }
+</style>
+"""
+
+# Compatibility helper for older Streamlit versions.
+_fsb_params = inspect.signature(st.form_submit_button).parameters
+
+
+@lru_cache(maxsize=None)
+def zero_width_suffix(key: str) -> str:
+    """Return ``key`` encoded as invisible zero-width characters."""
+    digest = hashlib.sha256(key.encode()).digest()
+    bits = "".join(f"{b:08b}" for b in digest)
+    # Use zero width joiner characters which don't introduce line breaks
+    return "".join("\u2060" if bit == "0" else "\u200d" for bit in bits)
+
+
+def compat_submit_button(label: str, *, key=None, on_click=None, args=None):
+    """Wrapper for ``st.form_submit_button`` handling old Streamlit releases."""
+    kwargs = {}
+    label_mod = label
+    # Encode ``key`` with zero-width characters for uniqueness on old Streamlit
+    if "key" not in _fsb_params and key is not None:
+        label_mod += zero_width_suffix(str(key))
+    elif "key" in _fsb_params and key is not None:
+        kwargs["key"] = key
+    if "on_click" in _fsb_params and on_click is not None:
+        kwargs["on_click"] = on_click
+    if "args" in _fsb_params and args is not None:
+        kwargs["args"] = args
+    pressed = st.form_submit_button(label_mod, **kwargs)
+    if "on_click" not in _fsb_params and pressed and on_click is not None:
+        if args:
+            on_click(*args)
+        else:
+            on_click()
+    return pressed
+
+
+# ------------------ Tłumaczenia / Translations -------------
+PL = {
+    "title": "💰 Kalkulator Marży",
+    "tab_discount": "Obniżka marży / ceny",
+    "tab_quick": "Szybki kalkulator marży",
+    "tab_catalog": "Katalog produktów",
+    "discount_header": "📉 Obniżka marży / ceny",
+    "quick_header": "⚙️ Szybki kalkulator marży",
+    "quick_sub": "podaj dowolne 2 pola",
+    "scenario_header": "🗺️ Scenariusze obniżki",
+    "scenario_help": "Siatka nowych marż lub cen dla danych TKW, starej ceny lub "
+    "marży i ilości z formularza powyżej.",
+    "scenario_axis": "Zmieniana wartość",
+    "scenario_from": "Od",
+    "scenario_to": "Do",
+    "scenario_steps": "Liczba kroków",
+    "scenario_tkw_from": "Zmiana TKW od [%]",
+    "scenario_tkw_to": "Zmiana TKW do [%]",
+    "scenario_metric": "Wynik",
+    "scenario_extra": "Dodatkowa sprzedaż [szt.]",
+    "scenario_loss": "Strata łączna",
+    "scenario_size": "Siatka {rows} × {cols}",
+    "sim_header": "🎲 Ryzyko obniżki (Monte Carlo)",
+    "sim_help": "Losowe TKW, nowa cena i wzrost sprzedaży wokół wartości z "
+    "formularza powyżej.",
+    "sim_tkw_sd": "Odchylenie standardowe TKW [%]",
+    "sim_price_spread": "Rozrzut nowej ceny ± [%]",
+    "sim_uplift_min": "Wzrost sprzedaży min. [%]",
+    "sim_uplift_mode": "Wzrost sprzedaży najczęstszy [%]",
+    "sim_uplift_max": "Wzrost sprzedaży maks. [%]",
+    "sim_uplift_order": "Wzrost sprzedaży: min. ≤ najczęstszy ≤ maks.",
+    "sim_draws": "Liczba losowań",
+    "sim_seed": "Ziarno losowania",
+    "sim_probability": "Szansa, że obniżka się opłaci",
+    "sim_mean_loss": "Średnia strata łączna",
+    "sim_percentile": "Percentyl",
+    "catalog_header": "📂 Katalog produktów",
+    "catalog_upload": "Plik CSV lub XLSX",
+    "catalog_help": "Kolumny: tkw, ilosc_stara, cena_stara lub marza_stara oraz "
+    "cena_nowa lub marza_nowa (marże w %). Pozostałe kolumny, np. SKU, są "
+    "przepisywane bez zmian.",
+    "catalog_summary": "Produkty: {rows}  |  z błędami: {errors}",
+    "catalog_page": "Strona (z {pages})",
+    "catalog_download": "Pobierz wyniki (CSV)",
+    "catalog_filter": "Filtr: które produkty zniosą obniżkę ceny?",
+    "catalog_cut": "Obniżka ceny [%]",
+    "catalog_max_extra": "Maks. dodatkowa sprzedaż [%]",
+    "catalog_filtered": "Produkty spełniające warunek: {rows}",
+    "metrics_header": "⏱️ Metryki wydajności",
+    "metrics_prometheus": "Pobierz (Prometheus)",
+    "metrics_json": "Pobierz (JSON)",
+    "metrics_refresh": "Odśwież metryki",
+    "calc_mode": "Tryb kalkulatora",
+    "tkw": "TKW (koszt jednostkowy)",
+    "price": "Cena sprzedaży",
+    "old_margin": "Obecna marża [%]",
+    "new_margin": "Nowa marża [%]",
+    "new_price": "Nowa cena sprzedaży",
+    "qty": "Ilość sprzedana wcześniej [szt.]",
+    "btn_discount": "Oblicz",
+    "btn_quick": "Oblicz",
+    "btn_clear": "Wyczyść",
+    "btn_clear_all": "Wyczyść wszystko",
+    "btn_example": "Wczytaj przykład",
+    "or": "lub",
+    "err_fill": "Uzupełnij TKW oraz ilość sprzedaną wcześniej.",
+    "err_pair_old": "Podaj starą marżę lub starą cenę.",
+    "err_pair_new": "Podaj nową marżę lub nową cenę.",
+    "err_loss": "Zysk po obniżce wynosi 0 lub mniej – obliczenia niemożliwe.",
+    "err_two_values": "⚠️ Podaj dowolne dwie wartości.",
+    "err_invalid": "Nieprawidłowa liczba w wierszu.",
+    "err_catalog": "Nie można wczytać pliku: {e}",
+    "res_profit_old": "📈 **Zysk przed:** {v:.2f}/szt",
+    "res_profit_new": "📉 **Zysk po:** {v:.2f}/szt",
+    "res_loss": "💰 **Strata łączna:** {v:.2f}",
+    "res_extra": "➕ Dodatkowa sprzedaż",
+    "res_total": "📦 **Łącznie:** {v} szt.",
+    "res_quick": "**TKW:** {tkw:.2f}  |  **Cena:** {price:.2f}  |  **Marża:** {margin:.2f} %",
+    "author": "Autor programu: Marcin Czerwiński  |  Product Concept",
+}
+EN = {
+    "title": "💰 Margin Calculator",
+    "tab_discount": "Margin / price drop",
+    "tab_quick": "Quick margin calc",
+    "tab_catalog": "Product catalog",
+    "discount_header": "📉 Margin / price drop",
+    "quick_header": "⚙️ Quick margin calculator",
+    "quick_sub": "fill any 2 fields",
+    "scenario_header": "🗺️ Price-drop scenarios",
+    "scenario_help": "Grid of new margins or prices for the production cost, old "
+    "price or margin and quantity entered in the form above.",
+    "scenario_axis": "Swept value",
+    "scenario_from": "From",
+    "scenario_to": "To",
+    "scenario_steps": "Steps",
+    "scenario_tkw_from": "Production cost change from [%]",
+    "scenario_tkw_to": "Production cost change to [%]",
+    "scenario_metric": "Result",
+    "scenario_extra": "Extra sales needed [pcs]",
+    "scenario_loss": "Total loss",
+    "scenario_size": "Grid {rows} × {cols}",
+    "sim_header": "🎲 Price-drop risk (Monte Carlo)",
+    "sim_help": "Random production cost, new price and sales uplift around the "
+    "values entered in the form above.",
+    "sim_tkw_sd": "Production cost standard deviation [%]",
+    "sim_price_spread": "New price spread ± [%]",
+    "sim_uplift_min": "Sales uplift min. [%]",
+    "sim_uplift_mode": "Sales uplift most likely [%]",
+    "sim_uplift_max": "Sales uplift max. [%]",
+    "sim_uplift_order": "Sales uplift: min. ≤ most likely ≤ max.",
+    "sim_draws": "Draws",
+    "sim_seed": "Random seed",
+    "sim_probability": "Chance the price drop pays off",
+    "sim_mean_loss": "Mean total loss",
+    "sim_percentile": "Percentile",
+    "catalog_header": "📂 Product catalog",
+    "catalog_upload": "CSV or XLSX file",
+    "catalog_help": "Columns: tkw, ilosc_stara, cena_stara or marza_stara and "
+    "cena_nowa or marza_nowa (margins in %). Other columns, e.g. SKU, are "
+    "copied unchanged.",
+    "catalog_summary": "Products: {rows}  |  with errors: {errors}",
+    "catalog_page": "Page (of {pages})",
+    "catalog_download": "Download results (CSV)",
+    "catalog_filter": "Filter: which products can afford a price cut?",
+    "catalog_cut": "Price cut [%]",
+    "catalog_max_extra": "Max. extra sales [%]",
+    "catalog_filtered": "Products meeting the condition: {rows}",
+    "metrics_header": "⏱️ Performance metrics",
+    "metrics_prometheus": "Download (Prometheus)",
+    "metrics_json": "Download (JSON)",
+    "metrics_refresh": "Refresh metrics",
+    "calc_mode": "Calculator mode",
+    "tkw": "Production cost (unit cost)",
+    "price": "Sale price",
+    "old_margin": "Current margin [%]",
+    "new_margin": "New margin [%]",
+    "new_price": "New sale price",
+    "qty": "Quantity sold before [pcs]",
+    "btn_discount": "Calculate",
+    "btn_quick": "Calculate",
+    "btn_clear": "Clear",
+    "btn_clear_all": "Clear all",
+    "btn_example": "Load example",
+    "or": "or",
+    "err_fill": "Fill Production cost and previous quantity first.",
+    "err_pair_old": "Provide either old margin or old price.",
+    "err_pair_new": "Provide either new margin or new price.",
+    "err_loss": "Profit after drop is 0 or negative – cannot compute.",
+    "err_two_values": "⚠️ Provide any two values.",
+    "err_invalid": "Invalid number in the row.",
+    "err_catalog": "Cannot read the file: {e}",
+    "res_profit_old": "📈 **Profit before:** {v:.2f}/pc",
+    "res_profit_new": "📉 **Profit after:** {v:.2f}/pc",
+    "res_loss": "💰 **Total loss:** {v:.2f}",
+    "res_extra": "➕ Extra sales needed",
+    "res_total": "📦 **Total:** {v} pcs",
+    "res_quick": "**Production cost:** {tkw:.2f}  |  **Price:** {price:.2f}  |  **Margin:** {margin:.2f} %",
+    "author": "Program author: Marcin Czerwiński  |  Product Concept",
+}
+
+LANGUAGES = {"Polski": PL, "English": EN}
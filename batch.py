@@ -0,0 +1,454 @@
+"""Vectorized counterparts of the helpers in :mod:`calculator` and :mod:`discount`.
+
+The functions operate on whole columns at once and accept anything NumPy can
+view as an array: ``ndarray`` objects, sequences and objects exposing the
+buffer protocol (``array.array``, ``memoryview`` ...). Computation is carried
+out in ``float64``.
+"""
+
+from decimal import Decimal, InvalidOperation
+from typing import Callable, NamedTuple
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+try:  # Prefer relative import when installed as a package
+    from .calculator import cena_z_marzy, licz_marze_z_ceny
+    from .discount import ERR_FILL, ERR_LOSS, ERR_PAIR_NEW, ERR_PAIR_OLD
+    from .fixed import GROSZE_SCALE, MARGIN_SCALE, MAX_GROSZE, MIN_MARGIN
+except ImportError:  # Fallback for running as a standalone script
+    from calculator import cena_z_marzy, licz_marze_z_ceny
+    from discount import ERR_FILL, ERR_LOSS, ERR_PAIR_NEW, ERR_PAIR_OLD
+    from fixed import GROSZE_SCALE, MARGIN_SCALE, MAX_GROSZE, MIN_MARGIN
+
+ENGINES = ("float", "fixed", "hybrid")
+MARGIN_DECIMALS = 6  # decimal places of 1 / fixed.MARGIN_SCALE
+
+# Unit roundoff of float64 and the factor by which the error bounds of the
+# hybrid functions are widened to cover the approximations made in them.
+_U = 2.0**-53
+_SAFETY = 4.0
+
+
+def _as_float_array(values: ArrayLike) -> np.ndarray:
+    """Return ``values`` as a ``float64`` array without copying when possible."""
+    return np.asarray(values, dtype=np.float64)
+
+
+def _check_engine(engine: str) -> None:
+    """Raise ``ValueError`` for unknown ``engine`` names."""
+    if engine not in ENGINES:
+        raise ValueError(f"unknown engine: {engine}")
+
+
+def _unrepresentable(values: ArrayLike, scale: int) -> np.ndarray:
+    """Return the rows of ``values`` that are no multiple of ``1 / scale``.
+
+    A value counts as a multiple when it is the ``float64`` nearest to one,
+    i.e. when its shortest decimal representation has at most as many places
+    as ``1 / scale``. Non-finite values are never multiples.
+    """
+    raw = _as_float_array(values) * scale
+    with np.errstate(invalid="ignore"):
+        return ~(np.abs(raw - np.rint(raw)) <= _SAFETY * _U * np.abs(raw))
+
+
+def _fixed_rejected(
+    values: ArrayLike, scale: int, low: float, high: float
+) -> np.ndarray:
+    """Return the rows the ``"fixed"`` engine cannot evaluate exactly.
+
+    Those are the rows of :func:`_unrepresentable` and the rows whose value
+    multiplied by ``scale`` lies outside ``(low, high)``.
+    """
+    raw = _as_float_array(values) * scale
+    with np.errstate(invalid="ignore"):
+        in_range = (raw > low) & (raw < high)
+    return _unrepresentable(values, scale) | ~in_range
+
+
+def _to_scaled(values: ArrayLike, scale: int) -> np.ndarray:
+    """Return ``values`` multiplied by ``scale`` as ``int64``.
+
+    Like :func:`fixed.do_groszy`, ``ValueError`` is raised for values with
+    more decimal places than ``1 / scale`` instead of rounding them, so the
+    fixed-point results never silently differ from ``Decimal``.
+    """
+    scaled = np.rint(_as_float_array(values) * scale)
+    if not np.isfinite(scaled).all():
+        raise ValueError("non-finite value in fixed-point input")
+    if _unrepresentable(values, scale).any():
+        raise ValueError(f"value not representable at scale {scale}")
+    return scaled.astype(np.int64)
+
+
+def _check_range(values: np.ndarray, low: int, high: int, name: str) -> None:
+    """Raise ``ValueError`` if any of ``values`` lies outside ``(low, high)``."""
+    if values.size and (values.min() <= low or values.max() >= high):
+        raise ValueError(f"{name} out of fixed-point range")
+
+
+def _div_half_even(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    """Return ``num / den`` rounded half to even. ``den`` must be positive."""
+    quot, rem = np.divmod(num, den)
+    twice = 2 * rem
+    quot += (twice > den) | ((twice == den) & (quot % 2 == 1))
+    return quot
+
+
+def licz_marze_z_ceny_gr_batch(
+    tkw: ArrayLike, cena: ArrayLike, scale: int = MARGIN_SCALE
+) -> np.ndarray:
+    """Vectorized :func:`fixed.licz_marze_z_ceny_gr` on ``int64`` grosze.
+
+    Examples
+    --------
+    >>> licz_marze_z_ceny_gr_batch([8000, 50], [12000, 0], scale=10**4)
+    array([3333,    0])
+    """
+    tkw_arr = np.asarray(tkw, dtype=np.int64)
+    cena_arr = np.asarray(cena, dtype=np.int64)
+    _check_range(tkw_arr, -MAX_GROSZE, MAX_GROSZE, "tkw")
+    _check_range(cena_arr, -MAX_GROSZE, MAX_GROSZE, "cena")
+    sign = np.where(cena_arr < 0, -1, 1)
+    den = np.where(cena_arr == 0, 1, cena_arr * sign)
+    wynik = _div_half_even((cena_arr - tkw_arr) * sign * scale, den)
+    return np.where(cena_arr == 0, 0, wynik)
+
+
+def cena_z_marzy_gr_batch(tkw: ArrayLike, marza: ArrayLike) -> np.ndarray:
+    """Vectorized :func:`fixed.cena_z_marzy_gr` on ``int64`` values.
+
+    Examples
+    --------
+    >>> cena_z_marzy_gr_batch([5000, 1000], [200000, 1000000])
+    array([6250,    0])
+    """
+    tkw_arr = np.asarray(tkw, dtype=np.int64)
+    marza_arr = np.asarray(marza, dtype=np.int64)
+    _check_range(tkw_arr, -MAX_GROSZE, MAX_GROSZE, "tkw")
+    _check_range(marza_arr, MIN_MARGIN, np.iinfo(np.int64).max, "marza")
+    below_one = marza_arr < MARGIN_SCALE
+    den = np.where(below_one, MARGIN_SCALE - marza_arr, 1)
+    wynik = _div_half_even(tkw_arr * MARGIN_SCALE, den)
+    return np.where(below_one, wynik, 0)
+
+
+def licz_marze_z_ceny_batch(
+    tkw: ArrayLike,
+    cena: ArrayLike,
+    *,
+    out: np.ndarray | None = None,
+    engine: str = "float",
+) -> np.ndarray:
+    """Return margins for whole columns of costs and prices.
+
+    Parameters
+    ----------
+    tkw : array_like
+        Unit production costs.
+    cena : array_like
+        Selling prices per unit. Broadcast against ``tkw``.
+    out : numpy.ndarray, optional
+        Preallocated ``float64`` array receiving the result.
+    engine : {"float", "fixed", "hybrid"}
+        ``"fixed"`` evaluates the inputs as grosze with the integer engine
+        of :mod:`fixed` and returns margins rounded to
+        ``1 / fixed.MARGIN_SCALE``; inputs with more than two decimal places
+        raise ``ValueError``. ``"hybrid"`` returns the margins of
+        :func:`licz_marze_z_ceny_hybrid` rounded to ``MARGIN_DECIMALS``.
+
+    Returns
+    -------
+    numpy.ndarray
+        Margins expressed as ``(cena - tkw) / cena``. ``0`` is stored for rows
+        where ``cena`` equals ``0``, matching
+        :func:`calculator.licz_marze_z_ceny`.
+
+    Examples
+    --------
+    >>> licz_marze_z_ceny_batch([50, 80], [100, 0])
+    array([0.5, 0. ])
+    """
+    _check_engine(engine)
+    if engine == "hybrid":
+        marze = licz_marze_z_ceny_hybrid(tkw, cena).values
+        if out is None:
+            return marze
+        out[...] = marze
+        return out
+    if engine == "fixed":
+        marze = licz_marze_z_ceny_gr_batch(
+            _to_scaled(tkw, GROSZE_SCALE), _to_scaled(cena, GROSZE_SCALE)
+        )
+        return np.divide(marze, MARGIN_SCALE, out=out)
+    tkw_arr = _as_float_array(tkw)
+    cena_arr = _as_float_array(cena)
+    shape = np.broadcast_shapes(tkw_arr.shape, cena_arr.shape)
+    if out is None:
+        out = np.zeros(shape, dtype=np.float64)
+    else:
+        out[...] = 0.0
+    nonzero = cena_arr != 0
+    np.subtract(cena_arr, tkw_arr, out=out, where=nonzero)
+    np.divide(out, cena_arr, out=out, where=nonzero)
+    return out
+
+
+def cena_z_marzy_batch(
+    tkw: ArrayLike,
+    marza: ArrayLike,
+    *,
+    out: np.ndarray | None = None,
+    engine: str = "float",
+) -> np.ndarray:
+    """Return prices for whole columns of costs and desired margins.
+
+    Parameters
+    ----------
+    tkw : array_like
+        Unit production costs.
+    marza : array_like
+        Desired margins expressed as fractions. Broadcast against ``tkw``.
+    out : numpy.ndarray, optional
+        Preallocated ``float64`` array receiving the result.
+    engine : {"float", "fixed", "hybrid"}
+        ``"fixed"`` evaluates costs as grosze and margins scaled by
+        ``fixed.MARGIN_SCALE`` with the integer engine of :mod:`fixed` and
+        returns prices rounded to ``0.01`` exactly like ``Decimal.quantize``
+        does; costs with more than two or margins with more than six decimal
+        places raise ``ValueError``. ``"hybrid"`` returns the prices of
+        :func:`cena_z_marzy_hybrid` rounded to ``0.01``.
+
+    Returns
+    -------
+    numpy.ndarray
+        Prices computed as ``tkw / (1 - marza)``. ``0`` is stored for rows
+        where ``marza`` is greater than or equal to ``1``, matching
+        :func:`calculator.cena_z_marzy`.
+
+    Examples
+    --------
+    >>> cena_z_marzy_batch([50, 10], [0.2, 1])
+    array([62.5,  0. ])
+    """
+    _check_engine(engine)
+    if engine == "hybrid":
+        ceny = cena_z_marzy_hybrid(tkw, marza).values
+        if out is None:
+            return ceny
+        out[...] = ceny
+        return out
+    if engine == "fixed":
+        ceny = cena_z_marzy_gr_batch(
+            _to_scaled(tkw, GROSZE_SCALE),
+            _to_scaled(np.minimum(marza, 1), MARGIN_SCALE),
+        )
+        return np.divide(ceny, GROSZE_SCALE, out=out)
+    tkw_arr = _as_float_array(tkw)
+    marza_arr = _as_float_array(marza)
+    shape = np.broadcast_shapes(tkw_arr.shape, marza_arr.shape)
+    if out is None:
+        out = np.zeros(shape, dtype=np.float64)
+    else:
+        out[...] = 0.0
+    below_one = marza_arr < 1
+    np.subtract(1.0, marza_arr, out=out, where=below_one)
+    np.divide(tkw_arr, out, out=out, where=below_one)
+    return out
+
+
+class HybridResult(NamedTuple):
+    """Result of the hybrid functions.
+
+    ``fallback`` marks the rows that were recomputed with ``Decimal``.
+    """
+
+    values: np.ndarray
+    fallback: np.ndarray
+
+
+def _round_hybrid(
+    wynik: np.ndarray,
+    bound: np.ndarray,
+    decimals: int,
+    args: tuple[np.ndarray, np.ndarray],
+    func: Callable[[Decimal, Decimal], Decimal],
+) -> HybridResult:
+    """Round ``wynik`` to ``decimals`` places, recomputing ambiguous rows.
+
+    ``bound`` is the absolute error bound of ``wynik * 10**decimals``. Rows
+    whose scaled value may lie on the other side of a rounding boundary
+    ``k + 0.5`` than the exact result are evaluated by ``func`` on
+    ``Decimal(str(x))`` of their arguments and quantized half to even.
+    """
+    scaled = wynik * 10.0**decimals
+    with np.errstate(invalid="ignore"):
+        dist = np.abs(scaled - np.floor(scaled) - 0.5)
+        known = np.isfinite(args[0]) & np.isfinite(args[1])
+        fallback = known & ~((dist > bound * _SAFETY) & (np.abs(scaled) < 2.0**52))
+    values = np.asarray(np.rint(scaled) / 10.0**decimals)
+    quantum = Decimal(1).scaleb(-decimals)
+    for index in np.flatnonzero(fallback):
+        first, second = (Decimal(repr(float(arg.flat[index]))) for arg in args)
+        try:
+            values.flat[index] = float(func(first, second).quantize(quantum))
+        except InvalidOperation:  # more digits than the context precision
+            values.flat[index] = np.nan
+    return HybridResult(values, fallback)
+
+
+def licz_marze_z_ceny_hybrid(
+    tkw: ArrayLike, cena: ArrayLike, *, decimals: int = MARGIN_DECIMALS
+) -> HybridResult:
+    """Return margins rounded to ``decimals`` places, identical to ``Decimal``.
+
+    Margins are computed in ``float64``. A row is recomputed with
+    :func:`calculator.licz_marze_z_ceny` only when its error bound does not
+    rule out a different rounding, so the values equal
+    ``licz_marze_z_ceny(Decimal(str(tkw)), Decimal(str(cena)))`` quantized
+    to ``decimals`` places. Use ``decimals=4`` for margins shown in percent
+    with two decimal places. Rows with ``NaN`` or infinite input yield a
+    non-finite result without fallback.
+
+    Examples
+    --------
+    >>> res = licz_marze_z_ceny_hybrid([50, 1], [100, 8], decimals=2)
+    >>> res.values, int(res.fallback.sum())
+    (array([0.5 , 0.88]), 1)
+    """
+    tkw_arr, cena_arr = np.broadcast_arrays(_as_float_array(tkw), _as_float_array(cena))
+    marza = licz_marze_z_ceny_batch(tkw_arr, cena_arr)
+    # Error of the inputs, the subtraction, the division and the scaling.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        spread = (np.abs(cena_arr) + np.abs(tkw_arr) + np.abs(cena_arr - tkw_arr)) / (
+            np.abs(cena_arr)
+        )
+    bound = (
+        10.0**decimals * _U * (np.where(cena_arr != 0, spread, 0) + 3 * np.abs(marza))
+    )
+    return _round_hybrid(marza, bound, decimals, (tkw_arr, cena_arr), licz_marze_z_ceny)
+
+
+def cena_z_marzy_hybrid(
+    tkw: ArrayLike, marza: ArrayLike, *, decimals: int = 2
+) -> HybridResult:
+    """Return prices rounded to ``decimals`` places, identical to ``Decimal``.
+
+    The ``float64`` counterpart of
+    ``cena_z_marzy(Decimal(str(tkw)), Decimal(str(marza))).quantize(...)``;
+    see :func:`licz_marze_z_ceny_hybrid`.
+
+    Examples
+    --------
+    >>> res = cena_z_marzy_hybrid([50, 0.9], [0.2, 0.2])
+    >>> res.values, res.fallback
+    (array([62.5 ,  1.12]), array([False,  True]))
+    """
+    tkw_arr, marza_arr = np.broadcast_arrays(
+        _as_float_array(tkw), _as_float_array(marza)
+    )
+    cena = cena_z_marzy_batch(tkw_arr, marza_arr)
+    # Error of the inputs, the subtraction ``1 - marza`` (which loses relative
+    # accuracy for margins close to 1), the division and the scaling.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.abs(marza_arr) / np.abs(1.0 - marza_arr)
+    bound = (
+        10.0**decimals * _U * np.abs(cena) * (5 + np.where(marza_arr < 1, ratio, 0))
+    )
+    return _round_hybrid(cena, bound, decimals, (tkw_arr, marza_arr), cena_z_marzy)
+
+
+class DiscountBatchResult(NamedTuple):
+    """Columns produced by :func:`oblicz_obnizke_batch`.
+
+    ``blad`` holds the :mod:`discount` error code of every row or an empty
+    string for rows that were calculated. Numeric columns are ``NaN`` where a
+    value could not be determined.
+    """
+
+    cena_stara: np.ndarray
+    marza_stara: np.ndarray
+    cena_nowa: np.ndarray
+    marza_nowa: np.ndarray
+    zysk_stary: np.ndarray
+    zysk_nowy: np.ndarray
+    strata: np.ndarray
+    ilosc_dodatkowa: np.ndarray
+    ilosc_nowych: np.ndarray
+    blad: np.ndarray
+
+
+def _cena_i_marza_batch(
+    tkw: np.ndarray, cena: np.ndarray, marza: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return prices, margins and a mask of rows missing both values.
+
+    A given margin takes precedence; the derived price is rounded to ``0.01``
+    exactly like :func:`discount._cena_i_marza` does.
+    """
+    has_marza = ~np.isnan(marza)
+    cena_out = np.where(has_marza, cena_z_marzy_hybrid(tkw, marza).values, cena)
+    marza_out = np.where(has_marza, marza, licz_marze_z_ceny_batch(tkw, cena))
+    return cena_out, marza_out, ~has_marza & np.isnan(cena)
+
+
+def oblicz_obnizke_batch(
+    tkw: ArrayLike,
+    ilosc_stara: ArrayLike,
+    *,
+    cena_stara: ArrayLike | None = None,
+    marza_stara: ArrayLike | None = None,
+    cena_nowa: ArrayLike | None = None,
+    marza_nowa: ArrayLike | None = None,
+) -> DiscountBatchResult:
+    """Columnar counterpart of :func:`discount.oblicz_obnizke`.
+
+    Missing values are given as ``NaN`` (or by omitting the whole column) and
+    the price/margin rules are applied per row: a margin takes precedence
+    over a price. Instead of raising, failing rows are marked in
+    ``DiscountBatchResult.blad``. As the computation runs in ``float64``,
+    quantities lying exactly on a ``.5`` rounding tie may differ by one unit
+    from the ``Decimal`` result.
+
+    Examples
+    --------
+    >>> res = oblicz_obnizke_batch([80, 80], [100, 100], cena_stara=[120, 120],
+    ...                            cena_nowa=[100, 80])
+    >>> res.ilosc_dodatkowa, res.blad
+    (array([100.,  nan]), array(['', 'err_loss'], dtype='<U12'))
+    """
+    columns = [tkw, ilosc_stara, cena_stara, marza_stara, cena_nowa, marza_nowa]
+    arrays = [np.nan if col is None else _as_float_array(col) for col in columns]
+    tkw, ilosc, cena_s, marza_s, cena_n, marza_n = np.broadcast_arrays(*arrays)
+
+    cena_s, marza_s, brak_starej = _cena_i_marza_batch(tkw, cena_s, marza_s)
+    cena_n, marza_n, brak_nowej = _cena_i_marza_batch(tkw, cena_n, marza_n)
+
+    zysk_stary = cena_s - tkw
+    zysk_nowy = cena_n - tkw
+    strata = (zysk_stary - zysk_nowy) * ilosc
+
+    dodatni = zysk_nowy > 0
+    ilosc_dodatkowa = np.full(strata.shape, np.nan)
+    np.divide(strata, zysk_nowy, out=ilosc_dodatkowa, where=dodatni)
+    np.rint(ilosc_dodatkowa, out=ilosc_dodatkowa)
+
+    blad = np.full(strata.shape, "", dtype="<U12")
+    blad[~dodatni] = ERR_LOSS
+    blad[brak_nowej] = ERR_PAIR_NEW
+    blad[brak_starej] = ERR_PAIR_OLD
+    blad[np.isnan(tkw) | np.isnan(ilosc)] = ERR_FILL
+
+    return DiscountBatchResult(
+        cena_stara=cena_s,
+        marza_stara=marza_s,
+        cena_nowa=cena_n,
+        marza_nowa=marza_n,
+        zysk_stary=zysk_stary,
+        zysk_nowy=zysk_nowy,
+        strata=strata,
+        ilosc_dodatkowa=ilosc_dodatkowa,
+        ilosc_nowych=ilosc + ilosc_dodatkowa,
+        blad=blad,
+    )
@@ -0,0 +1,209 @@
+"""Reproducible performance benchmarks for the margin calculator.
+
+Run from the repository root::
+
+    python benchmarks/run.py --output bench.json
+
+Every benchmark is repeated ``--repeat`` times and reported with its best and
+median wall time in seconds and, where it makes sense, a throughput in items
+per second of the best run. Inputs are generated from fixed seeds so results
+of different revisions can be compared. The report is printed as JSON.
+"""
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+from typing import Callable, Optional
+
+REPO = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO))
+
+# pylint: disable=wrong-import-position,import-error
+import numpy as np  # noqa: E402
+
+from batch import (  # noqa: E402
+    cena_z_marzy_batch,
+    licz_marze_z_ceny_batch,
+    oblicz_obnizke_batch,
+)
+from calculator import cena_z_marzy, licz_marze_z_ceny  # noqa: E402
+from utils import _to_decimal, _to_decimal_column  # noqa: E402
+
+GROUPS = ("calculator", "parsing", "cli", "app")
+
+
+def _measure(
+    func: Callable[[], object], repeat: int, items: Optional[int] = None
+) -> dict:
+    """Return timing statistics of ``repeat`` calls of ``func``."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    result = {"best_s": min(times), "median_s": statistics.median(times)}
+    if items is not None:
+        result["items"] = items
+        result["items_per_s"] = items / min(times)
+    return result
+
+
+def _dirty_cells(count: int, seed: int = 0) -> list[str]:
+    """Return supplier-style price cells: decimal commas, blanks and junk."""
+    rng = random.Random(seed)
+    cells = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.90:
+            cells.append(f"{rng.uniform(0, 5000):.2f}".replace(".", ","))
+        elif roll < 0.95:
+            cells.append(f" {rng.uniform(0, 5000):.2f} ")
+        elif roll < 0.98:
+            cells.append("")
+        else:
+            cells.append(rng.choice(["n/a", "-", "brak", "12,5 zł", "1.234,50"]))
+    return cells
+
+
+def bench_calculator(size: int, repeat: int) -> dict:
+    """Scalar ``Decimal`` and vectorized calculator throughput."""
+    rng = np.random.default_rng(0)
+    tkw = np.round(rng.uniform(1, 1000, size), 2)
+    cena = np.round(tkw * rng.uniform(0.8, 2.0, size), 2)
+    marza = np.round(rng.uniform(-0.5, 0.95, size), 4)
+    ilosc = rng.integers(1, 10_000, size).astype(np.float64)
+
+    scalar_size = min(size, 100_000)
+    tkw_dec = [Decimal(str(v)) for v in tkw[:scalar_size]]
+    cena_dec = [Decimal(str(v)) for v in cena[:scalar_size]]
+    marza_dec = [Decimal(str(v)) for v in marza[:scalar_size]]
+
+    return {
+        "scalar_licz_marze_z_ceny": _measure(
+            lambda: list(map(licz_marze_z_ceny, tkw_dec, cena_dec)),
+            repeat,
+            scalar_size,
+        ),
+        "scalar_cena_z_marzy": _measure(
+            lambda: list(map(cena_z_marzy, tkw_dec, marza_dec)), repeat, scalar_size
+        ),
+        "batch_licz_marze_z_ceny": _measure(
+            lambda: licz_marze_z_ceny_batch(tkw, cena), repeat, size
+        ),
+        "batch_cena_z_marzy": _measure(
+            lambda: cena_z_marzy_batch(tkw, marza), repeat, size
+        ),
+        "batch_cena_z_marzy_fixed": _measure(
+            lambda: cena_z_marzy_batch(tkw, marza, engine="fixed"), repeat, size
+        ),
+        "batch_oblicz_obnizke": _measure(
+            lambda: oblicz_obnizke_batch(
+                tkw, ilosc, cena_stara=cena * 1.2, cena_nowa=cena
+            ),
+            repeat,
+            size,
+        ),
+    }
+
+
+def bench_parsing(size: int, repeat: int) -> dict:
+    """Parse rates of ``_to_decimal`` and the column parser on dirty input."""
+    cells = _dirty_cells(size)
+    return {
+        "scalar_to_decimal": _measure(
+            lambda: [_to_decimal(c, none_on_error=True) for c in cells], repeat, size
+        ),
+        "column_to_decimal": _measure(
+            lambda: _to_decimal_column(cells, none_on_error=True), repeat, size
+        ),
+    }
+
+
+def bench_cli(repeat: int) -> dict:
+    """Cold-start wall time of ``cli.main`` for a single calculation."""
+    command = [sys.executable, "-m", "margin_calculator.cli", "marza", "50", "100"]
+    return {
+        "cold_start_marza": _measure(
+            lambda: subprocess.run(
+                command, cwd=REPO.parent, check=True, capture_output=True
+            ),
+            repeat,
+        )
+    }
+
+
+def bench_app(repeat: int) -> dict:
+    """End-to-end Streamlit script rerun time for both tabs."""
+    # pylint: disable=import-outside-toplevel
+    from streamlit.testing.v1 import AppTest
+
+    def submit(app, label: str) -> None:
+        next(b for b in app.button if b.label.startswith(label)).click().run()
+
+    discount = AppTest.from_file(str(REPO / "app.py"), default_timeout=60).run()
+    for key, value in {
+        "tkw": 80.0,
+        "cena_stara": 120.0,
+        "cena_nowa": 100.0,
+        "ilosc_stara": 100,
+    }.items():
+        discount.number_input(key=key).set_value(value)
+
+    quick = AppTest.from_file(str(REPO / "app.py"), default_timeout=60).run()
+    quick.radio[0].set_value(quick.radio[0].options[1]).run()
+    for key, value in {"tkw_m": 50.0, "cena_m": 100.0}.items():
+        quick.number_input(key=key).set_value(value)
+
+    return {
+        "rerun_discount": _measure(lambda: submit(discount, "Oblicz"), repeat),
+        "rerun_quick": _measure(lambda: submit(quick, "Oblicz"), repeat),
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--size", type=int, default=1_000_000, help="Rows per batch benchmark"
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per benchmark")
+    parser.add_argument(
+        "--only", choices=GROUPS, action="append", help="Run only these groups"
+    )
+    parser.add_argument("-o", "--output", help="Write the JSON report to a file")
+    args = parser.parse_args(argv)
+    groups = args.only or GROUPS
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "size": args.size,
+            "repeat": args.repeat,
+        },
+        "results": {},
+    }
+    if "calculator" in groups:
+        report["results"]["calculator"] = bench_calculator(args.size, args.repeat)
+    if "parsing" in groups:
+        report["results"]["parsing"] = bench_parsing(args.size, args.repeat)
+    if "cli" in groups:
+        report["results"]["cli"] = bench_cli(args.repeat)
+    if "app" in groups:
+        report["results"]["app"] = bench_app(args.repeat)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
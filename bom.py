@@ -0,0 +1,299 @@
+"""Unit production costs rolled up from a bill of materials.
+
+A bill of materials (BOM) is a directed acyclic graph of items. An edge
+``(rodzic, skladnik, ilosc)`` states that one unit of ``rodzic`` consumes
+``ilosc`` units of ``skladnik``. The unit cost of an item is its own cost
+(the purchase price of a component or the labour of an assembly) plus the
+costs of its components::
+
+    tkw(rodzic) = koszt(rodzic) + sum(ilosc * tkw(skladnik))
+
+:class:`CostRollup` evaluates this for every item at once. Items are
+processed level by level in topological order, each level with a few array
+operations, so every edge is visited once per rollup rather than once per
+product using it. The costs of all subassemblies are kept, and
+:meth:`CostRollup.update` recomputes only the items depending on a changed
+cost. Rolled-up costs can be passed straight to the functions of
+:mod:`batch`.
+"""
+
+import csv
+from typing import IO, Iterable, Mapping, Optional, Sequence
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+try:  # Prefer relative import when installed as a package
+    from .batch import cena_z_marzy_batch, licz_marze_z_ceny_batch
+    from .utils import _to_decimal_column
+except ImportError:  # Fallback for running as a standalone script
+    from batch import cena_z_marzy_batch, licz_marze_z_ceny_batch
+    from utils import _to_decimal_column
+
+ITEM_COLUMNS = ("sku", "koszt")
+EDGE_COLUMNS = ("rodzic", "skladnik", "ilosc")
+
+
+class BOMCycleError(ValueError):
+    """Raised when the bill of materials contains a cycle.
+
+    ``cycle`` lists the items of one cycle, starting and ending with the same
+    item.
+    """
+
+    def __init__(self, cycle: list[str]):
+        super().__init__(f"cycle in bill of materials: {' -> '.join(cycle)}")
+        self.cycle = cycle
+
+
+def _csr(keys: np.ndarray, size: int) -> tuple[np.ndarray, np.ndarray]:
+    """Return edge indices sorted by ``keys`` and the offsets of every key."""
+    order = np.argsort(keys, kind="stable")
+    offsets = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=size), out=offsets[1:])
+    return order, offsets
+
+
+def _gather(nodes: np.ndarray, order: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """Return the indices of all edges of ``nodes`` in an index of :func:`_csr`."""
+    starts = offsets[nodes]
+    counts = offsets[nodes + 1] - starts
+    ends = np.cumsum(counts)
+    positions = np.repeat(starts - ends + counts, counts) + np.arange(ends[-1:].sum())
+    return order[positions]
+
+
+class CostRollup:
+    """Unit costs of all items of a bill of materials.
+
+    Parameters
+    ----------
+    koszty : mapping of str to float
+        Own cost of every item. Items that occur only in the edges are
+        assemblies without own cost; a component without components of its
+        own must be listed.
+    rodzic, skladnik : sequence of str
+        Parent and component item of every edge.
+    ilosc : array_like
+        Quantity of the component per unit of the parent. Repeated edges add
+        up.
+
+    Raises
+    ------
+    BOMCycleError
+        When an item is, directly or indirectly, a component of itself.
+    ValueError
+        When the edge columns differ in length or a component has no cost.
+
+    Examples
+    --------
+    >>> bom = CostRollup({"sruba": 0.5, "plyta": 20, "szafka": 15},
+    ...                  ["szafka", "szafka", "zestaw", "zestaw"],
+    ...                  ["plyta", "sruba", "szafka", "sruba"],
+    ...                  [3, 12, 2, 4])
+    >>> bom.tkw(["szafka", "zestaw"])
+    array([ 81., 164.])
+    >>> bom.update({"sruba": 0.25})
+    {'sruba': 0.25, 'szafka': 78.0, 'zestaw': 157.0}
+    """
+
+    def __init__(
+        self,
+        koszty: Mapping[str, float],
+        rodzic: Sequence[str],
+        skladnik: Sequence[str],
+        ilosc: ArrayLike,
+    ):
+        if not len(rodzic) == len(skladnik) == len(np.atleast_1d(ilosc)):
+            raise ValueError("rodzic, skladnik and ilosc differ in length")
+        self.items = list(koszty)
+        self._index = {item: index for index, item in enumerate(self.items)}
+        for item in (*rodzic, *skladnik):
+            if item not in self._index:
+                self._index[item] = len(self.items)
+                self.items.append(item)
+        size = len(self.items)
+        self._own = np.zeros(size)
+        self._own[: len(koszty)] = np.fromiter(koszty.values(), float, len(koszty))
+        self._parent = self._indices(rodzic)
+        self._child = self._indices(skladnik)
+        self._qty = np.asarray(ilosc, dtype=np.float64).reshape(-1)
+        self._by_parent = _csr(self._parent, size)
+        self._by_child = _csr(self._child, size)
+
+        leaves = np.flatnonzero(np.diff(self._by_parent[1]) == 0)
+        unpriced = leaves[leaves >= len(koszty)]
+        if unpriced.size:
+            raise ValueError(f"no cost for component {self.items[unpriced[0]]}")
+        self._level = self._levels()
+        self._cost = np.empty(size)
+        self._recompute(np.arange(size))
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __contains__(self, item: str) -> bool:
+        return item in self._index
+
+    def _indices(self, items: Iterable[str]) -> np.ndarray:
+        """Return the positions of ``items``; ``KeyError`` for unknown ones."""
+        return np.fromiter(map(self._index.__getitem__, items), np.int64)
+
+    def _levels(self) -> np.ndarray:
+        """Return the length of the longest path from every item to a leaf.
+
+        Items are released by Kahn's algorithm once all their components are,
+        a whole level at a time. Items never released lie on or above a
+        cycle.
+        """
+        remaining = np.bincount(self._parent, minlength=len(self.items))
+        level = np.full(len(self.items), -1, dtype=np.int64)
+        frontier = np.flatnonzero(remaining == 0)
+        depth = 0
+        while frontier.size:
+            level[frontier] = depth
+            parents = self._parent[_gather(frontier, *self._by_child)]
+            np.subtract.at(remaining, parents, 1)
+            parents = np.unique(parents)
+            frontier = parents[remaining[parents] == 0]
+            depth += 1
+        if (level < 0).any():
+            raise BOMCycleError(self._find_cycle(level < 0))
+        return level
+
+    def _find_cycle(self, blocked: np.ndarray) -> list[str]:
+        """Return a cycle among the items of the mask ``blocked``.
+
+        Every blocked item has a blocked component, so following those from
+        any blocked item must eventually revisit one.
+        """
+        path: dict[int, None] = {}
+        node = int(np.flatnonzero(blocked)[0])
+        while node not in path:
+            path[node] = None
+            children = self._child[_gather(np.array([node]), *self._by_parent)]
+            node = int(children[blocked[children]][0])
+        nodes = list(path)
+        cycle = nodes[nodes.index(node) :] + [node]
+        return [self.items[index] for index in cycle]
+
+    def _ancestors(self, nodes: np.ndarray) -> np.ndarray:
+        """Return ``nodes`` and every item using one of them, in any depth."""
+        seen = np.zeros(len(self.items), dtype=bool)
+        seen[nodes] = True
+        frontier = np.unique(nodes)
+        while frontier.size:
+            parents = np.unique(self._parent[_gather(frontier, *self._by_child)])
+            frontier = parents[~seen[parents]]
+            seen[frontier] = True
+        return np.flatnonzero(seen)
+
+    def _recompute(self, nodes: np.ndarray) -> None:
+        """Recompute the costs of ``nodes``, components before assemblies.
+
+        The components of ``nodes`` that are not recomputed must be up to
+        date.
+        """
+        nodes = nodes[np.argsort(self._level[nodes], kind="stable")]
+        _, starts = np.unique(self._level[nodes], return_index=True)
+        for group in np.split(nodes, starts[1:]):
+            edges = _gather(group, *self._by_parent)
+            self._cost[group] = self._own[group]
+            np.add.at(
+                self._cost,
+                self._parent[edges],
+                self._qty[edges] * self._cost[self._child[edges]],
+            )
+
+    @property
+    def products(self) -> list[str]:
+        """Finished products: items that are not a component of another."""
+        used = np.bincount(self._child, minlength=len(self.items))
+        return [self.items[index] for index in np.flatnonzero(used == 0)]
+
+    def tkw(self, items: Optional[Iterable[str]] = None) -> np.ndarray:
+        """Return the rolled-up unit costs of ``items`` or of all items."""
+        if items is None:
+            return self._cost.copy()
+        return self._cost[self._indices(items)]
+
+    def update(self, koszty: Mapping[str, float]) -> dict[str, float]:
+        """Change the own costs of existing items and roll up the changes.
+
+        Only the changed items and the assemblies using them are recomputed.
+        Returns the new unit costs of the items whose cost changed.
+        ``KeyError`` is raised for unknown items.
+        """
+        changed = self._indices(koszty)
+        self._own[changed] = np.fromiter(koszty.values(), float, len(koszty))
+        affected = self._ancestors(changed)
+        old = self._cost[affected]
+        self._recompute(affected)
+        affected = affected[self._cost[affected] != old]
+        return {self.items[index]: float(self._cost[index]) for index in affected}
+
+    def ceny(
+        self, marza: ArrayLike, items: Optional[Iterable[str]] = None, **kwargs
+    ) -> np.ndarray:
+        """Return prices of ``items`` for margins ``marza``.
+
+        See :func:`batch.cena_z_marzy_batch` for ``kwargs``.
+        """
+        return cena_z_marzy_batch(self.tkw(items), marza, **kwargs)
+
+    def marze(
+        self, cena: ArrayLike, items: Optional[Iterable[str]] = None, **kwargs
+    ) -> np.ndarray:
+        """Return margins of ``items`` sold at prices ``cena``.
+
+        See :func:`batch.licz_marze_z_ceny_batch` for ``kwargs``.
+        """
+        return licz_marze_z_ceny_batch(self.tkw(items), cena, **kwargs)
+
+
+def _read_columns(
+    source: IO[str], names: Sequence[str], delimiter: str
+) -> dict[str, list[str]]:
+    """Return the columns ``names`` of the CSV in ``source``."""
+    reader = csv.reader(source, delimiter=delimiter)
+    header = [name.strip().lower() for name in next(reader, [])]
+    missing = [name for name in names if name not in header]
+    if missing:
+        raise ValueError(f"missing column: {', '.join(missing)}")
+    indices = [header.index(name) for name in names]
+    rows = [row for row in reader if row]
+    return {
+        name: [row[index].strip() if index < len(row) else "" for row in rows]
+        for name, index in zip(names, indices)
+    }
+
+
+def _numbers(cells: list[str], name: str) -> np.ndarray:
+    """Parse a numeric column; ``ValueError`` names the first invalid cell."""
+    values, valid = _to_decimal_column(cells, none_on_error=True)
+    if not valid.all():
+        raise ValueError(f"invalid {name}: {cells[int(np.argmin(valid))]!r}")
+    return values
+
+
+def read_bom(items: IO[str], edges: IO[str], *, delimiter: str = ",") -> CostRollup:
+    """Return the rollup of a BOM given as two CSV files.
+
+    ``items`` has the columns ``ITEM_COLUMNS`` (the own cost of every item)
+    and ``edges`` the columns ``EDGE_COLUMNS``. Numbers may use a decimal
+    comma; blank costs are ``0``. ``ValueError`` is raised for an item listed
+    twice.
+    """
+    pozycje = _read_columns(items, ITEM_COLUMNS, delimiter)
+    krawedzie = _read_columns(edges, EDGE_COLUMNS, delimiter)
+    koszty: dict[str, float] = {}
+    for sku, koszt in zip(pozycje["sku"], _numbers(pozycje["koszt"], "koszt").tolist()):
+        if sku in koszty:
+            raise ValueError(f"duplicate sku: {sku!r}")
+        koszty[sku] = koszt
+    return CostRollup(
+        koszty,
+        krawedzie["rodzic"],
+        krawedzie["skladnik"],
+        _numbers(krawedzie["ilosc"], "ilosc"),
+    )
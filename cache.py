@@ -0,0 +1,192 @@
+"""Bounded memoization of the calculator functions.
+
+:class:`CalculatorCache` provides memoized versions of
+:func:`calculator.licz_marze_z_ceny` and :func:`calculator.cena_z_marzy`
+under the same names, so it can be used wherever the :mod:`calculator`
+module is expected. The cache holds at most ``maxsize`` results and evicts
+the least recently used (``"lru"``) or the oldest (``"fifo"``) entry when it
+is full. Hits, misses and evictions are counted in
+:attr:`CalculatorCache.stats`.
+
+Arguments are keyed by their exact representation: ``Decimal('50')`` and
+``Decimal('50.00')`` have separate entries, as their results differ in
+trailing zeros, so a cached result is always the one the uncached call
+would return. Callers that only use the value of a result, e.g. because they
+quantize it or convert it to ``float``, can pass ``normalize=True`` to let
+equal Decimal arguments share an entry.
+
+A cache sent to another process, e.g. a worker of ``cli.py batch --workers``,
+arrives there as that process's own cache with the same configuration.
+"""
+
+import decimal
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from decimal import Decimal
+from functools import lru_cache
+from typing import Callable, Hashable
+
+try:  # Prefer relative import when installed as a package
+    from . import calculator
+except ImportError:  # Fallback for running as a standalone script
+    import calculator
+
+POLICIES = ("lru", "fifo")
+DEFAULT_CACHE_SIZE = 4096
+
+
+@dataclass
+class CacheStats:
+    """Number of cache hits, misses and evictions."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups answered from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+def _canonical(value) -> Hashable:
+    """Return the cache key of a single argument.
+
+    The type is part of the key as ``Decimal('0.5')``, ``0.5`` and ``1`` and
+    ``True`` compare equal but yield results of different types. Decimals
+    are keyed by sign, digits and exponent and floats by their hexadecimal
+    form, since equal values such as ``50`` and ``50.00`` or ``0.0`` and
+    ``-0.0`` can yield different results; this also keys NaNs, which cannot
+    be compared or, when signaling, hashed.
+    """
+    if isinstance(value, Decimal):
+        return Decimal, value.as_tuple()
+    if isinstance(value, float):
+        return float, value.hex()
+    return type(value), value
+
+
+def _normalized(value) -> Hashable:
+    """Return the key of an argument whose results are only used by value.
+
+    Finite Decimals are keyed by sign, digits without trailing zeros and the
+    matching exponent, so ``50`` and ``50.00`` share a key while ``0`` and
+    ``-0`` do not. The results of equal arguments are equal, as every step
+    of the calculator rounds the exact value; they only differ in trailing
+    zeros. Other arguments are keyed by :func:`_canonical`.
+    """
+    if not isinstance(value, Decimal) or not value.is_finite():
+        return _canonical(value)
+    sign, digits, exponent = value.as_tuple()
+    text = "".join(map(str, digits))
+    significant = text.rstrip("0")
+    if not significant:
+        return Decimal, (sign, "0", 0)
+    return Decimal, (sign, significant, exponent + len(text) - len(significant))
+
+
+class CalculatorCache:
+    """Memoized calculator functions with a bounded number of entries.
+
+    Parameters
+    ----------
+    maxsize : int
+        Maximum number of cached results.
+    policy : {"lru", "fifo"}
+        Entry evicted when the cache is full: the least recently used or the
+        oldest one.
+    normalize : bool
+        Let Decimal arguments equal in value share an entry. A cached result
+        then equals the uncached one but may differ in trailing zeros, which
+        is safe for callers that quantize results or convert them to
+        ``float``.
+
+    Examples
+    --------
+    >>> cache = CalculatorCache(maxsize=2)
+    >>> cache.licz_marze_z_ceny(Decimal('50'), Decimal('100'))
+    Decimal('0.5')
+    >>> cache.licz_marze_z_ceny(Decimal('50'), Decimal('100'))
+    Decimal('0.5')
+    >>> cache.licz_marze_z_ceny(Decimal('50.00'), Decimal('100'))
+    Decimal('0.50')
+    >>> cache.stats
+    CacheStats(hits=1, misses=2, evictions=0)
+    >>> shared = CalculatorCache(normalize=True)
+    >>> shared.cena_z_marzy(Decimal('50'), Decimal('0.2')).quantize(Decimal('0.01'))
+    Decimal('62.50')
+    >>> shared.cena_z_marzy(Decimal('50.00'), Decimal('0.20')).quantize(Decimal('0.01'))
+    Decimal('62.50')
+    >>> shared.stats
+    CacheStats(hits=1, misses=1, evictions=0)
+    """
+
+    def __init__(
+        self,
+        maxsize: int = DEFAULT_CACHE_SIZE,
+        policy: str = "lru",
+        *,
+        normalize: bool = False,
+    ):
+        if maxsize < 1:
+            raise ValueError("maxsize must be positive")
+        if policy not in POLICIES:
+            raise ValueError(f"unknown cache policy: {policy}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.normalize = normalize
+        self._key = _normalized if normalize else _canonical
+        self.stats = CacheStats()
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __reduce__(self):
+        # Worker processes receive their own cache of the same configuration.
+        return _process_cache, (self.maxsize, self.policy, self.normalize)
+
+    def licz_marze_z_ceny(self, tkw: Decimal, cena: Decimal) -> Decimal:
+        """Memoized :func:`calculator.licz_marze_z_ceny`."""
+        return self._call(calculator.licz_marze_z_ceny, tkw, cena)
+
+    def cena_z_marzy(self, tkw: Decimal, marza: Decimal) -> Decimal:
+        """Memoized :func:`calculator.cena_z_marzy`."""
+        return self._call(calculator.cena_z_marzy, tkw, marza)
+
+    def clear(self) -> None:
+        """Remove all entries and reset the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self.stats = CacheStats()
+
+    def _call(self, func: Callable, *args):
+        ctx = decimal.getcontext()
+        key = (func.__name__, ctx.prec, ctx.rounding, *map(self._key, args))
+        with self._lock:
+            try:
+                result = self._entries[key]
+            except KeyError:
+                self.stats.misses += 1
+            else:
+                self.stats.hits += 1
+                if self.policy == "lru":
+                    self._entries.move_to_end(key)
+                return result
+        # Exceptions propagate and are not cached.
+        result = func(*args)
+        with self._lock:
+            self._entries[key] = result
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+        return result
+
+
+@lru_cache(maxsize=None)
+def _process_cache(maxsize: int, policy: str, normalize: bool) -> CalculatorCache:
+    """Return the cache shared by all unpickled caches of this configuration."""
+    return CalculatorCache(maxsize, policy, normalize=normalize)
@@ -0,0 +1,148 @@
+"""Vectorized break-even analysis of uploaded product catalogs.
+
+A catalog is a CSV or XLSX table with one product per row. Column names are
+matched case-insensitively; the recognised columns are listed in
+``INPUT_COLUMNS`` and every other column (for example an SKU or a product
+name) is passed through unchanged. Numbers may use a decimal comma and
+margins are given in percent, as in the *Margin / price drop* form.
+
+All rows are evaluated at once by :func:`batch.oblicz_obnizke_batch`. Rows
+that cannot be calculated are reported in the ``blad`` column with one of the
+:mod:`discount` error codes or ``ERR_INVALID`` for unparsable numbers.
+"""
+
+import csv
+import io
+
+import numpy as np
+import pandas as pd
+
+try:  # Prefer relative import when installed as a package
+    from .batch import DiscountBatchResult, oblicz_obnizke_batch
+    from .utils import _to_decimal_column
+except ImportError:  # Fallback for running as a standalone script
+    from batch import DiscountBatchResult, oblicz_obnizke_batch
+    from utils import _to_decimal_column
+
+FORMATS = ("csv", "xlsx")
+INPUT_COLUMNS = (
+    "tkw",
+    "ilosc_stara",
+    "cena_stara",
+    "marza_stara",
+    "cena_nowa",
+    "marza_nowa",
+)
+REQUIRED_COLUMNS = ("tkw", "ilosc_stara")
+PERCENT_COLUMNS = ("marza_stara", "marza_nowa")
+ERR_INVALID = "err_invalid"
+
+
+def guess_format(name: str) -> str:
+    """Return the catalog format implied by the file name ``name``."""
+    return "xlsx" if name.lower().endswith((".xlsx", ".xlsm")) else "csv"
+
+
+def _decode(data: bytes) -> str:
+    """Decode CSV bytes saved either as UTF-8 or by a Polish Excel."""
+    try:
+        return data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return data.decode("cp1250")
+
+
+def read_catalog(data: bytes, fmt: str = "csv") -> pd.DataFrame:
+    """Return the catalog in ``data`` as a table of strings.
+
+    The CSV delimiter (comma, semicolon or tab) is detected from the header
+    line. Column names are stripped and lower-cased and empty cells become
+    empty strings. ``ValueError`` is raised for unreadable files. Reading
+    XLSX files requires ``openpyxl``.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown format: {fmt}")
+    if fmt == "xlsx":
+        # ``BadZipFile`` and openpyxl errors derive from ``Exception`` only;
+        # a missing openpyxl installation is still reported as ``ImportError``.
+        try:
+            table = pd.read_excel(io.BytesIO(data), dtype=str, na_filter=False)
+        except ImportError:
+            raise
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            raise ValueError(f"cannot read XLSX file: {exc}") from exc
+    else:
+        text = _decode(data)
+        header = text.partition("\n")[0]
+        try:
+            delimiter = csv.Sniffer().sniff(header, delimiters=",;\t").delimiter
+        except csv.Error:
+            delimiter = ","
+        try:
+            table = pd.read_csv(
+                io.StringIO(text), sep=delimiter, dtype=str, na_filter=False
+            )
+        except (pd.errors.ParserError, pd.errors.EmptyDataError) as exc:
+            raise ValueError(f"cannot read CSV file: {exc}") from exc
+    table.columns = [str(name).strip().lower() for name in table.columns]
+    return table
+
+
+def process_catalog(table: pd.DataFrame) -> pd.DataFrame:
+    """Return ``table`` extended by the break-even analysis of every row.
+
+    ``tkw`` and ``ilosc_stara`` are converted to numbers and the columns of
+    :class:`batch.DiscountBatchResult` are added, replacing input columns of
+    the same name, so missing prices and margins are filled in. Margins are
+    returned in percent. ``ValueError`` is raised when a column of
+    ``REQUIRED_COLUMNS`` is missing.
+
+    Examples
+    --------
+    >>> table = pd.DataFrame({"sku": ["A1"], "tkw": ["80"], "ilosc_stara": ["100"],
+    ...                       "cena_stara": ["120"], "marza_nowa": ["20"]})
+    >>> process_catalog(table)[["sku", "cena_nowa", "ilosc_dodatkowa"]]
+      sku  cena_nowa  ilosc_dodatkowa
+    0  A1      100.0            100.0
+    """
+    missing = [name for name in REQUIRED_COLUMNS if name not in table.columns]
+    if missing:
+        raise ValueError(f"missing column: {', '.join(missing)}")
+
+    values = {}
+    invalid = np.zeros(len(table), dtype=bool)
+    for name in INPUT_COLUMNS:
+        if name not in table.columns:
+            continue
+        cells = table[name].astype(str)
+        parsed, valid = _to_decimal_column(cells.tolist(), none_on_error=True)
+        # Blank cells mean "not given" rather than zero.
+        parsed[(cells.str.strip() == "").to_numpy()] = np.nan
+        if name in PERCENT_COLUMNS:
+            parsed /= 100
+        values[name] = parsed
+        invalid |= ~valid
+
+    wynik = oblicz_obnizke_batch(
+        values["tkw"],
+        values["ilosc_stara"],
+        cena_stara=values.get("cena_stara"),
+        marza_stara=values.get("marza_stara"),
+        cena_nowa=values.get("cena_nowa"),
+        marza_nowa=values.get("marza_nowa"),
+    )
+    result = table.copy()
+    result["tkw"] = values["tkw"]
+    result["ilosc_stara"] = values["ilosc_stara"]
+    for name in DiscountBatchResult._fields:
+        column = getattr(wynik, name)
+        if name in PERCENT_COLUMNS:
+            column = column * 100
+        result[name] = column
+    result.loc[invalid, list(DiscountBatchResult._fields)] = np.nan
+    result.loc[invalid, "blad"] = ERR_INVALID
+    return result
+
+
+def to_csv_bytes(result: pd.DataFrame) -> bytes:
+    """Return ``result`` as UTF-8 encoded CSV for downloading."""
+    return result.to_csv(index=False).encode("utf-8")
@@ -1,18 +1,425 @@
 """Command line utilities for the margin calculator."""
 
 import argparse
-from decimal import Decimal
+import csv
+import importlib
+import json
+import os
+import sys
+import tempfile
+import threading
+from decimal import Decimal, InvalidOperation
+from types import ModuleType
+from typing import TYPE_CHECKING, Optional
 
 try:  # Prefer relative import when installed as a package
     from .calculator import cena_z_marzy, licz_marze_z_ceny
 except ImportError:  # Fallback for running as a standalone script
     from calculator import cena_z_marzy, licz_marze_z_ceny
 
+if TYPE_CHECKING:  # Subcommand modules are imported lazily by their handlers
+    from .cache import CalculatorCache
+
+# Option values of the subcommands, copied from their modules so that parsing
+# the command line imports none of them; tests/test_cli.py keeps them in sync.
+POLICIES = ("lru", "fifo")  # cache.POLICIES
+FORMATS = ("csv", "jsonl")  # streaming.FORMATS
+ENGINES = ("decimal", "fixed")  # streaming.ENGINES
+DEFAULT_CHUNK_SIZE = 1000  # streaming.DEFAULT_CHUNK_SIZE
+BATCH_ENGINES = ("float", "fixed", "hybrid")  # batch.ENGINES
+INDEX_COLUMNS = ("marza", "zysk", "elastycznosc")  # index.INDEX_COLUMNS
+MODELS = ("constant", "linear")  # optimizer.MODELS
+DEFAULT_INTERVAL = 1.0  # incremental.DEFAULT_INTERVAL
+DEFAULT_HOST = "127.0.0.1"  # server.DEFAULT_HOST
+DEFAULT_PORT = 8765  # server.DEFAULT_PORT
+
+# Export formats of ``--profile``, see ``metrics.Metrics``.
+PROFILE_FORMATS = ("prometheus", "json")
+# Result columns of ``optimize``, following ``optimizer.OptimumResult``.
+OPTIMIZE_COLUMNS = (
+    "cena_opt",
+    "marza_opt",
+    "ilosc_opt",
+    "zysk_opt",
+    "zbiezne",
+    "ograniczona",
+    "iteracje",
+)
+
+
+def _lazy(name: str) -> ModuleType:
+    """Import the module ``name`` of this package when a subcommand needs it."""
+    if __package__:
+        return importlib.import_module(f".{name}", __package__)
+    return importlib.import_module(name)
+
+
+def _open(path: str, mode: str):
+    """Open ``path`` for text I/O, mapping ``-`` to stdin or stdout."""
+    if path == "-":
+        stream = sys.stdin if "r" in mode else sys.stdout
+        return open(stream.fileno(), mode, encoding="utf-8", newline="", closefd=False)
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+def _non_negative_int(value: str) -> int:
+    """Argument type accepting integers greater than or equal to ``0``."""
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must not be negative: {value}")
+    return number
+
+
+def _positive_int(value: str) -> int:
+    """Argument type accepting integers greater than ``0``."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be positive: {value}")
+    return number
+
+
+def _add_cache_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the options configuring a :class:`cache.CalculatorCache`."""
+    parser.add_argument(
+        "--cache-size",
+        type=_non_negative_int,
+        default=0,
+        help="Memoize up to N calculator results, 0 disables the cache (default: 0)",
+    )
+    parser.add_argument(
+        "--cache-policy",
+        choices=POLICIES,
+        default="lru",
+        help="Entry evicted from a full cache (default: lru)",
+    )
+
+
+def _cache(args: argparse.Namespace) -> Optional["CalculatorCache"]:
+    """Return the cache requested on the command line, if any."""
+    if not args.cache_size:
+        return None
+    return _lazy("cache").CalculatorCache(args.cache_size, args.cache_policy)
+
+
+def _calculator(args: argparse.Namespace, cache: Optional["CalculatorCache"]):
+    """Return ``cache``, timed by :data:`metrics.METRICS` with ``--profile``."""
+    if args.profile:
+        return _lazy("metrics").InstrumentedCalculator(cache)
+    return cache
+
+
+def _write_profile(fmt: str) -> None:
+    """Write the collected metrics to stderr in the ``--profile`` format."""
+    metrics = _lazy("metrics").METRICS
+    if fmt == "json":
+        text = json.dumps(metrics.snapshot(), indent=2) + "\n"
+    else:
+        text = metrics.to_prometheus()
+    sys.stderr.write(text)
+
+
+def _run_batch(args: argparse.Namespace) -> int:
+    """Execute the ``batch`` subcommand and return the exit status."""
+    streaming = _lazy("streaming")
+    fmt = args.format or streaming.guess_format(args.input)
+    workers = args.workers or os.cpu_count() or 1
+    cache = _cache(args)
+    with _open(args.input, "r") as source, _open(args.output, "w") as sink:
+        summary = streaming.process_stream(
+            source,
+            sink,
+            fmt=fmt,
+            delimiter=args.delimiter,
+            errors=sys.stderr,
+            workers=workers,
+            chunk_size=args.chunk_size,
+            engine=args.engine,
+            cache=_calculator(args, cache),
+        )
+    if args.profile:
+        _lazy("metrics").METRICS.count("batch_rows", summary.rows)
+    if cache is not None and workers == 1:
+        stats = cache.stats
+        print(
+            f"cache: {stats.hits} hits, {stats.misses} misses, "
+            f"{stats.evictions} evictions ({stats.hit_rate:.1%} hit rate)",
+            file=sys.stderr,
+        )
+    if summary.errors:
+        print(f"{summary.errors} of {summary.rows} rows failed", file=sys.stderr)
+        return 1
+    return 0
+
+
+def _run_catalog(args: argparse.Namespace) -> int:
+    """Execute the ``catalog`` subcommands and return the exit status."""
+    store = _lazy("store")
+    try:
+        if args.catalog_command == "import":
+            with _open(args.input, "r") as source:
+                summary = store.import_csv(source, args.store, delimiter=args.delimiter)
+            print(f"imported {summary.rows} rows into {args.store}", file=sys.stderr)
+            for name, count in summary.invalid.items():
+                if count:
+                    print(f"{count} invalid {name} values", file=sys.stderr)
+            return 0
+        if args.catalog_command == "index":
+            index_module = _lazy("index")
+            index = index_module.MarginIndex.from_store(store.open_store(args.store))
+            index.save(os.path.join(args.store, index_module.INDEX_DIR))
+            print(
+                f"indexed {index.indexed('marza')} of {len(index)} rows",
+                file=sys.stderr,
+            )
+            return 0
+        if args.catalog_command == "update":
+            return _update_catalog(args)
+        if args.catalog_command == "query":
+            return _query_index(args)
+        catalog = store.open_store(args.store)
+        with _open(args.output, "w") as sink:
+            summary = store.calculate_store(
+                catalog, sink, delimiter=args.delimiter, engine=args.engine
+            )
+    except ValueError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 2
+    if args.engine == "hybrid":
+        print(f"{summary.fallbacks} rows recomputed with Decimal", file=sys.stderr)
+    if summary.errors:
+        print(f"{summary.errors} of {summary.rows} rows failed", file=sys.stderr)
+        return 1
+    return 0
+
+
+def _update_catalog(args: argparse.Namespace) -> int:
+    """Execute ``catalog update`` and return the exit status."""
+    store, index_module = _lazy("store"), _lazy("index")
+    path = os.path.join(args.store, index_module.INDEX_DIR)
+    index = None
+    if os.path.exists(os.path.join(path, index_module.META_FILE)):
+        # Refuse a stale index before changing the store.
+        index = index_module.open_index(path, store.open_store(args.store))
+    with tempfile.TemporaryDirectory() as directory:
+        with _open(args.changes, "r") as source:
+            store.import_csv(source, directory, delimiter=args.delimiter)
+        rows = store.update_store(args.store, store.open_store(directory))
+    print(f"updated {len(rows)} rows of {args.store}", file=sys.stderr)
+    if index is not None:
+        index.update_from_store(store.open_store(args.store), rows)
+        index.save(path)
+        print(f"updated the index of {len(index)} rows", file=sys.stderr)
+    return 0
+
+
+def _query_index(args: argparse.Namespace) -> int:
+    """Execute ``catalog query`` and return the exit status."""
+    store, index_module = _lazy("store"), _lazy("index")
+    index = index_module.open_index(
+        os.path.join(args.store, index_module.INDEX_DIR), store.open_store(args.store)
+    )
+    if args.cut is not None:
+        if args.max_extra is None:
+            raise ValueError("--cut requires --max-extra")
+        rows = index.mozliwa_obnizka(args.cut, args.max_extra)
+    else:
+        rows = index.between(args.column, args.min, args.max)
+    table = index.table(rows)
+    with _open(args.output, "w") as sink:
+        writer = csv.writer(sink, delimiter=args.delimiter)
+        writer.writerow(["sku", *table])
+        writer.writerows(
+            zip(index.sku(rows), *(column.tolist() for column in table.values()))
+        )
+    print(f"{len(rows)} matching rows", file=sys.stderr)
+    return 0
+
+
+def _run_bom(args: argparse.Namespace) -> int:
+    """Execute the ``bom`` subcommand and return the exit status."""
+    try:
+        with _open(args.items, "r") as items, _open(args.edges, "r") as edges:
+            rollup = _lazy("bom").read_bom(items, edges, delimiter=args.delimiter)
+    except ValueError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 2
+    names = rollup.items if args.all else rollup.products
+    columns = [names, rollup.tkw(names).tolist()]
+    header = ["sku", "tkw"]
+    if args.marza is not None:
+        columns.append(rollup.ceny(args.marza, names, engine="hybrid").tolist())
+        header.append("cena")
+    with _open(args.output, "w") as sink:
+        writer = csv.writer(sink, delimiter=args.delimiter)
+        writer.writerow(header)
+        writer.writerows(zip(*columns))
+    return 0
+
+
+def _run_optimize(args: argparse.Namespace) -> int:
+    """Execute the ``optimize`` subcommand and return the exit status."""
+    import numpy as np
+
+    optimizer = _lazy("optimizer")
+    try:
+        with _open(args.input, "r") as source:
+            columns = optimizer.read_demand(source, delimiter=args.delimiter)
+    except ValueError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 2
+    marza_min = columns.get("marza_min")
+    if args.marza_min is not None:
+        marza_min = (
+            args.marza_min
+            if marza_min is None
+            else np.where(np.isnan(marza_min), args.marza_min, marza_min)
+        )
+    try:
+        wynik = optimizer.optymalna_cena(
+            columns["tkw"],
+            columns["cena"],
+            columns["ilosc"],
+            columns["elastycznosc"],
+            model=columns.get(optimizer.MODEL_COLUMN, args.model),
+            marza_min=marza_min,
+            cena_min=columns.get("cena_min"),
+            cena_max=columns.get("cena_max"),
+        )
+    except ValueError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 2
+    passed = {name: cells for name, cells in columns.items() if isinstance(cells, list)}
+    with _open(args.output, "w") as sink:
+        writer = csv.writer(sink, delimiter=args.delimiter)
+        writer.writerow([*passed, *OPTIMIZE_COLUMNS])
+        writer.writerows(
+            zip(
+                *passed.values(),
+                *(getattr(wynik, name).tolist() for name in wynik._fields),
+            )
+        )
+    failed = int(np.count_nonzero(~wynik.zbiezne))
+    rows = len(wynik.zbiezne)
+    print(f"{rows - failed} of {rows} rows optimized", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def _run_tiers(args: argparse.Namespace) -> int:
+    """Execute the ``tiers`` subcommand and return the exit status."""
+    import numpy as np
+
+    tiers = _lazy("tiers")
+    try:
+        with _open(args.input, "r") as source:
+            katalog = tiers.read_tiers(source, delimiter=args.delimiter)
+    except ValueError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 2
+    wynik = tiers.oblicz_obnizke_progowa(
+        katalog.stary, katalog.nowy, katalog.ilosc_stara
+    )
+    with _open(args.output, "w") as sink:
+        writer = csv.writer(sink, delimiter=args.delimiter)
+        writer.writerow(["sku", *wynik._fields])
+        writer.writerows(
+            zip(katalog.sku, *(getattr(wynik, name).tolist() for name in wynik._fields))
+        )
+    failed = int(np.count_nonzero(wynik.blad))
+    if failed:
+        print(f"{failed} of {len(katalog.sku)} rows failed", file=sys.stderr)
+        return 1
+    return 0
+
+
+def _run_watch(args: argparse.Namespace) -> int:
+    """Execute the ``watch`` subcommand and return the exit status."""
+    if not os.path.isdir(args.directory):
+        print(f"error: not a directory: {args.directory}", file=sys.stderr)
+        return 2
+    incremental = _lazy("incremental")
+    catalog = incremental.IncrementalCatalog()
+    if args.catalog:
+        try:
+            with _open(args.catalog, "r") as source:
+                catalog.apply(
+                    incremental.read_updates(source, delimiter=args.delimiter)
+                )
+        except ValueError as exc:
+            print(f"error: {args.catalog}: {exc}", file=sys.stderr)
+            return 2
+        print(f"loaded {len(catalog)} rows from {args.catalog}", file=sys.stderr)
+    stop = threading.Event()
+    if args.once:
+        stop.set()
+    with _open(args.output, "w") as sink:
+        try:
+            incremental.watch(
+                catalog,
+                args.directory,
+                sink,
+                interval=args.interval,
+                delimiter=args.delimiter,
+                stop=stop,
+                errors=sys.stderr,
+            )
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+def _pipe_answer(line: str, funcs: dict) -> tuple[str, bool]:
+    """Return the answer to a ``pipe`` request and whether it succeeded."""
+    command, *values = line.split()
+    func = funcs.get(command)
+    if func is None:
+        return f"error: unknown command: {command}", False
+    if len(values) != 2:
+        return f"error: {command} takes 2 arguments", False
+    try:
+        numbers = [Decimal(value) for value in values]
+    except InvalidOperation:
+        return f"error: invalid number in: {line}", False
+    try:
+        return str(func(*numbers)), True
+    except ArithmeticError as exc:  # e.g. decimal.Overflow of extreme exponents
+        return f"error: {type(exc).__name__} in: {line}", False
+
+
+def _run_pipe(args: argparse.Namespace) -> int:
+    """Execute the ``pipe`` subcommand and return the exit status."""
+    calc = _calculator(args, _cache(args))
+    funcs = {
+        "marza": licz_marze_z_ceny if calc is None else calc.licz_marze_z_ceny,
+        "cena": cena_z_marzy if calc is None else calc.cena_z_marzy,
+    }
+    failed = False
+    # readline() instead of iteration: answer every line as soon as it arrives.
+    for line in iter(sys.stdin.readline, ""):
+        line = line.strip()
+        if not line:
+            continue
+        answer, ok = _pipe_answer(line, funcs)
+        failed |= not ok
+        sys.stdout.write(answer + "\n")
+        sys.stdout.flush()
+    return 1 if failed else 0
+
 
 def main() -> None:
     parser = argparse.ArgumentParser(
         description="Command line interface for margin calculations"
     )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Collect call counts and latencies and write them to stderr on exit",
+    )
+    parser.add_argument(
+        "--profile-format",
+        choices=PROFILE_FORMATS,
+        default="prometheus",
+        help="Format of the --profile output (default: prometheus)",
+    )
     subparsers = parser.add_subparsers(dest="command", required=True)
 
     marza_parser = subparsers.add_parser(
@@ -29,12 +436,274 @@ def main() -> None:
         "marza", type=Decimal, help="Desired margin expressed as a fraction"
     )
 
+    batch_parser = subparsers.add_parser(
+        "batch", help="Calculate margins or prices for rows of CSV/JSONL input"
+    )
+    batch_parser.add_argument(
+        "input", nargs="?", default="-", help="Input file (default: stdin)"
+    )
+    batch_parser.add_argument(
+        "-o", "--output", default="-", help="Output file (default: stdout)"
+    )
+    batch_parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        help="Input format (default: guessed from the file extension, else csv)",
+    )
+    batch_parser.add_argument(
+        "--delimiter", default=",", help="CSV field delimiter (default: ',')"
+    )
+    batch_parser.add_argument(
+        "--workers",
+        type=_non_negative_int,
+        default=1,
+        help="Number of worker processes, 0 uses all CPUs (default: 1)",
+    )
+    batch_parser.add_argument(
+        "--chunk-size",
+        type=_positive_int,
+        default=DEFAULT_CHUNK_SIZE,
+        help=f"Rows per processing chunk (default: {DEFAULT_CHUNK_SIZE})",
+    )
+    batch_parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default="decimal",
+        help="Arithmetic: exact Decimal or fixed-point grosze (default: decimal)",
+    )
+    _add_cache_arguments(batch_parser)
+
+    catalog_parser = subparsers.add_parser(
+        "catalog", help="Import catalogs into a columnar store and calculate them"
+    )
+    catalog_commands = catalog_parser.add_subparsers(
+        dest="catalog_command", required=True
+    )
+    import_parser = catalog_commands.add_parser(
+        "import", help="Convert a CSV catalog into a memory-mapped store"
+    )
+    import_parser.add_argument("input", help="CSV file, - for stdin")
+    import_parser.add_argument("store", help="Directory of the store to create")
+    import_parser.add_argument(
+        "--delimiter", default=",", help="CSV field delimiter (default: ',')"
+    )
+    calc_parser = catalog_commands.add_parser(
+        "calc", help="Calculate margins or prices for every row of a store"
+    )
+    calc_parser.add_argument("store", help="Directory of the store")
+    calc_parser.add_argument(
+        "-o", "--output", default="-", help="Output CSV file (default: stdout)"
+    )
+    calc_parser.add_argument(
+        "--delimiter", default=",", help="CSV field delimiter (default: ',')"
+    )
+    calc_parser.add_argument(
+        "--engine",
+        choices=BATCH_ENGINES,
+        default="float",
+        help=(
+            "Arithmetic: float64, fixed-point grosze or float64 with Decimal "
+            "fallback (default: float)"
+        ),
+    )
+    index_parser = catalog_commands.add_parser(
+        "index", help="Build the sorted margin index of a store"
+    )
+    index_parser.add_argument("store", help="Directory of the store")
+    update_parser = catalog_commands.add_parser(
+        "update",
+        help="Apply changed rows from a CSV file to a store and its margin index",
+    )
+    update_parser.add_argument("store", help="Directory of the store")
+    update_parser.add_argument(
+        "changes", help="CSV file with a sku column and the changed values"
+    )
+    update_parser.add_argument(
+        "--delimiter", default=",", help="CSV field delimiter (default: ',')"
+    )
+    query_parser = catalog_commands.add_parser(
+        "query", help="Select rows of an indexed store by margin or profit"
+    )
+    query_parser.add_argument("store", help="Directory of the store")
+    query_parser.add_argument(
+        "--cut", type=float, help="Price cut as a fraction, e.g. 0.1"
+    )
+    query_parser.add_argument(
+        "--max-extra",
+        type=float,
+        help="With --cut: maximum extra volume as a fraction, e.g. 0.15",
+    )
+    query_parser.add_argument(
+        "--column",
+        choices=INDEX_COLUMNS,
+        default="marza",
+        help="Column bounded by --min and --max (default: marza)",
+    )
+    query_parser.add_argument("--min", type=float, help="Lower bound (inclusive)")
+    query_parser.add_argument("--max", type=float, help="Upper bound (inclusive)")
+    query_parser.add_argument(
+        "-o", "--output", default="-", help="Output CSV file (default: stdout)"
+    )
+    query_parser.add_argument(
+        "--delimiter", default=",", help="CSV field delimiter (default: ',')"
+    )
+
+    bom_parser = subparsers.add_parser(
+        "bom", help="Roll up unit costs from a bill of materials"
+    )
+    bom_parser.add_argument("items", help="CSV file with the columns sku,koszt")
+    bom_parser.add_argument(
+        "edges", help="CSV file with the columns rodzic,skladnik,ilosc"
+    )
+    bom_parser.add_argument(
+        "-o", "--output", default="-", help="Output CSV file (default: stdout)"
+    )
+    bom_parser.add_argument(
+        "--delimiter", default=",", help="CSV field delimiter (default: ',')"
+    )
+    bom_parser.add_argument(
+        "--marza", type=float, help="Add the price yielding this margin fraction"
+    )
+    bom_parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Output every item instead of the finished products only",
+    )
+
+    optimize_parser = subparsers.add_parser(
+        "optimize", help="Find profit-maximizing prices for price-elastic demand"
+    )
+    optimize_parser.add_argument(
+        "input",
+        help="CSV file with the columns tkw,cena,ilosc,elastycznosc, - for stdin",
+    )
+    optimize_parser.add_argument(
+        "-o", "--output", default="-", help="Output CSV file (default: stdout)"
+    )
+    optimize_parser.add_argument(
+        "--delimiter", default=",", help="CSV field delimiter (default: ',')"
+    )
+    optimize_parser.add_argument(
+        "--model",
+        choices=MODELS,
+        default=MODELS[0],
+        help="Demand curve of rows without a model column (default: %(default)s)",
+    )
+    optimize_parser.add_argument(
+        "--marza-min",
+        type=float,
+        help="Lowest margin fraction of rows without a marza_min value",
+    )
+
+    tiers_parser = subparsers.add_parser(
+        "tiers", help="Break-even analysis of tiered volume-discount price lists"
+    )
+    tiers_parser.add_argument(
+        "input",
+        help="CSV file with one row per tier and the columns "
+        "sku,tkw,ilosc_stara,prog,cena_stara,cena_nowa, - for stdin",
+    )
+    tiers_parser.add_argument(
+        "-o", "--output", default="-", help="Output CSV file (default: stdout)"
+    )
+    tiers_parser.add_argument(
+        "--delimiter", default=",", help="CSV field delimiter (default: ',')"
+    )
+
+    watch_parser = subparsers.add_parser(
+        "watch", help="Recompute changed catalog rows from delta files in a directory"
+    )
+    watch_parser.add_argument("directory", help="Directory receiving CSV delta files")
+    watch_parser.add_argument(
+        "--catalog", help="CSV catalog loaded as the initial state"
+    )
+    watch_parser.add_argument(
+        "-o", "--output", default="-", help="Output CSV file (default: stdout)"
+    )
+    watch_parser.add_argument(
+        "--delimiter", default=",", help="CSV field delimiter (default: ',')"
+    )
+    watch_parser.add_argument(
+        "--interval",
+        type=float,
+        default=DEFAULT_INTERVAL,
+        help=f"Seconds between directory polls (default: {DEFAULT_INTERVAL})",
+    )
+    watch_parser.add_argument(
+        "--once", action="store_true", help="Apply the files present and exit"
+    )
+
+    pipe_parser = subparsers.add_parser(
+        "pipe",
+        help="Answer marza/cena commands read line by line from stdin",
+        description="Read commands such as 'marza 50 100' or 'cena 50 0.2', one "
+        "per line, and write each result (or 'error: message') on its own line "
+        "as soon as it is calculated. Blank lines are ignored.",
+    )
+    _add_cache_arguments(pipe_parser)
+
+    serve_parser = subparsers.add_parser(
+        "serve", help="Run a local JSON-over-HTTP calculation server"
+    )
+    serve_parser.add_argument(
+        "--host",
+        default=DEFAULT_HOST,
+        help=f"Address to bind to (default: {DEFAULT_HOST})",
+    )
+    serve_parser.add_argument(
+        "--port",
+        type=_non_negative_int,
+        default=DEFAULT_PORT,
+        help=f"Port to listen on (default: {DEFAULT_PORT})",
+    )
+    serve_parser.add_argument(
+        "--verbose", action="store_true", help="Log every request to stderr"
+    )
+    _add_cache_arguments(serve_parser)
+
     args = parser.parse_args()
+    if not args.profile:
+        _dispatch(args)
+        return
+    metrics = _lazy("metrics").METRICS
+    metrics.enable()
+    try:
+        with metrics.timer(f"cli_{args.command}"):
+            _dispatch(args)
+    finally:
+        _write_profile(args.profile_format)
+
+
+def _dispatch(args: argparse.Namespace) -> None:
+    """Run the subcommand selected by ``args``."""
+    if args.command == "batch":
+        sys.exit(_run_batch(args))
+    if args.command == "catalog":
+        sys.exit(_run_catalog(args))
+    if args.command == "bom":
+        sys.exit(_run_bom(args))
+    if args.command == "optimize":
+        sys.exit(_run_optimize(args))
+    if args.command == "tiers":
+        sys.exit(_run_tiers(args))
+    if args.command == "watch":
+        sys.exit(_run_watch(args))
+    if args.command == "pipe":
+        sys.exit(_run_pipe(args))
+    if args.command == "serve":
+        print(f"Serving on http://{args.host}:{args.port}", file=sys.stderr)
+        _lazy("server").serve(
+            args.host, args.port, quiet=not args.verbose, cache=_cache(args)
+        )
+        return
 
+    calc = _calculator(args, None)
     if args.command == "marza":
-        result = licz_marze_z_ceny(args.tkw, args.cena)
+        func = licz_marze_z_ceny if calc is None else calc.licz_marze_z_ceny
+        result = func(args.tkw, args.cena)
     else:  # "cena"
-        result = cena_z_marzy(args.tkw, args.marza)
+        func = cena_z_marzy if calc is None else calc.cena_z_marzy
+        result = func(args.tkw, args.marza)
 
     print(result)
 
@@ -0,0 +1,148 @@
+"""Asyncio micro-batching of concurrent single calculations.
+
+Concurrent callers awaiting :meth:`MicroBatcher.licz_marze_z_ceny` or
+:meth:`MicroBatcher.cena_z_marzy` are queued and evaluated together by the
+vectorized functions of :mod:`batch`. A queue is flushed when it holds
+``max_batch`` requests or ``max_delay_ms`` after its first request arrived,
+whichever comes first, so no caller waits longer than ``max_delay_ms`` plus
+the time needed to evaluate one batch.
+
+Results are ``float`` values produced by the selected batch ``engine``.
+"""
+
+import asyncio
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Callable, Optional, Union
+
+import numpy as np
+
+try:  # Prefer relative import when installed as a package
+    from .batch import ENGINES, cena_z_marzy_batch, licz_marze_z_ceny_batch
+except ImportError:  # Fallback for running as a standalone script
+    from batch import ENGINES, cena_z_marzy_batch, licz_marze_z_ceny_batch
+
+Number = Union[Decimal, float, int]
+
+
+@dataclass
+class CoalescerStats:
+    """Number of requests and flushed batches."""
+
+    requests: int = 0
+    batches: int = 0
+
+
+class _Queue:
+    """Pending requests of one batch function."""
+
+    def __init__(self, func: Callable[..., np.ndarray]):
+        self.func = func
+        self.first: list[float] = []
+        self.second: list[float] = []
+        self.futures: list[asyncio.Future] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class MicroBatcher:
+    """Coalesce concurrent single calculations into vectorized batches.
+
+    Parameters
+    ----------
+    max_batch : int
+        Number of queued requests that triggers an immediate flush.
+    max_delay_ms : float
+        Maximum time a request waits for other requests to join its batch.
+    engine : {"float", "fixed", "hybrid"}
+        Engine passed to the batch functions.
+
+    Examples
+    --------
+    >>> async def main():
+    ...     batcher = MicroBatcher(max_delay_ms=1)
+    ...     return await asyncio.gather(
+    ...         batcher.licz_marze_z_ceny(50, 100), batcher.cena_z_marzy(50, 0.2)
+    ...     )
+    >>> asyncio.run(main())
+    [0.5, 62.5]
+    """
+
+    def __init__(
+        self, *, max_batch: int = 1024, max_delay_ms: float = 2.0, engine: str = "float"
+    ):
+        if max_batch < 1:
+            raise ValueError("max_batch must be positive")
+        if engine not in ENGINES:
+            raise ValueError(f"unknown engine: {engine}")
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self.engine = engine
+        self.stats = CoalescerStats()
+        self._queues = {
+            "marza": _Queue(licz_marze_z_ceny_batch),
+            "cena": _Queue(cena_z_marzy_batch),
+        }
+
+    async def licz_marze_z_ceny(self, tkw: Number, cena: Number) -> float:
+        """Return the margin for ``tkw`` and ``cena`` once its batch is done."""
+        return await self._submit("marza", tkw, cena)
+
+    async def cena_z_marzy(self, tkw: Number, marza: Number) -> float:
+        """Return the price for ``tkw`` and ``marza`` once its batch is done."""
+        return await self._submit("cena", tkw, marza)
+
+    def flush(self) -> None:
+        """Evaluate all queued requests immediately."""
+        for name in self._queues:
+            self._flush(name)
+
+    def _submit(self, name: str, first: Number, second: Number) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        queue = self._queues[name]
+        queue.first.append(float(first))
+        queue.second.append(float(second))
+        queue.futures.append(future)
+        self.stats.requests += 1
+        if len(queue.futures) >= self.max_batch:
+            self._flush(name)
+        elif queue.timer is None:
+            queue.timer = loop.call_later(self.max_delay, self._flush, name)
+        return future
+
+    def _flush(self, name: str) -> None:
+        queue = self._queues[name]
+        if queue.timer is not None:
+            queue.timer.cancel()
+            queue.timer = None
+        if not queue.futures:
+            return
+        first, second, futures = queue.first, queue.second, queue.futures
+        queue.first, queue.second, queue.futures = [], [], []
+        self.stats.batches += 1
+        try:
+            results = queue.func(first, second, engine=self.engine).tolist()
+        except (ValueError, ArithmeticError):
+            # Isolate the failing requests instead of failing the whole batch.
+            for args in zip(first, second, futures):
+                self._evaluate_single(queue.func, *args)
+            return
+        except Exception as exc:
+            # The futures are off the queue; fail them rather than leave them.
+            for future in futures:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for future, result in zip(futures, results):
+            if not future.done():
+                future.set_result(result)
+
+    def _evaluate_single(
+        self, func: Callable[..., np.ndarray], first: float, second: float, future
+    ) -> None:
+        if future.done():
+            return
+        try:
+            future.set_result(func([first], [second], engine=self.engine).item())
+        except Exception as exc:
+            future.set_exception(exc)
@@ -0,0 +1,133 @@
+"""Break-even analysis for margin or price reductions.
+
+The functions answer the question asked on the "discount" tab of the
+Streamlit app: how many extra units must be sold after a price cut to keep
+the total profit unchanged. Margins are expressed as fractions, like in
+:mod:`calculator`.
+"""
+
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Optional, Union
+
+try:  # Prefer relative import when installed as a package
+    from .calculator import cena_z_marzy, licz_marze_z_ceny
+except ImportError:  # Fallback for running as a standalone script
+    from calculator import cena_z_marzy, licz_marze_z_ceny
+
+GROSZ = Decimal("0.01")
+
+ERR_FILL = "err_fill"
+ERR_PAIR_OLD = "err_pair_old"
+ERR_PAIR_NEW = "err_pair_new"
+ERR_LOSS = "err_loss"
+
+
+class DiscountError(ValueError):
+    """Raised when the break-even analysis cannot be performed.
+
+    ``code`` is one of ``ERR_FILL``, ``ERR_PAIR_OLD``, ``ERR_PAIR_NEW`` or
+    ``ERR_LOSS`` and matches the error keys of the app translations.
+    """
+
+    def __init__(self, code: str):
+        super().__init__(code)
+        self.code = code
+
+
+@dataclass(frozen=True)
+class DiscountResult:
+    """Outcome of :func:`oblicz_obnizke`."""
+
+    cena_stara: Decimal
+    marza_stara: Decimal
+    cena_nowa: Decimal
+    marza_nowa: Decimal
+    zysk_stary: Decimal
+    zysk_nowy: Decimal
+    strata: Decimal
+    ilosc_dodatkowa: int
+    ilosc_nowych: Decimal
+
+
+def _cena_i_marza(
+    tkw: Decimal, cena: Optional[Decimal], marza: Optional[Decimal], code: str
+) -> tuple[Decimal, Decimal]:
+    """Return ``(cena, marza)`` derived from whichever of the two is given.
+
+    A given ``marza`` takes precedence; the derived price is rounded to
+    ``0.01``.
+    """
+    if marza is not None:
+        return cena_z_marzy(tkw, marza).quantize(GROSZ), marza
+    if cena is None:
+        raise DiscountError(code)
+    return cena, licz_marze_z_ceny(tkw, cena)
+
+
+def oblicz_obnizke(
+    tkw: Optional[Decimal],
+    ilosc_stara: Optional[Union[Decimal, int]],
+    *,
+    cena_stara: Optional[Decimal] = None,
+    marza_stara: Optional[Decimal] = None,
+    cena_nowa: Optional[Decimal] = None,
+    marza_nowa: Optional[Decimal] = None,
+) -> DiscountResult:
+    """Return the extra sales needed to compensate a price reduction.
+
+    Parameters
+    ----------
+    tkw : Decimal
+        Unit production cost.
+    ilosc_stara : Decimal or int
+        Quantity sold at the old price.
+    cena_stara, marza_stara : Decimal, optional
+        Old price or old margin. When the margin is given the price is
+        derived from it and rounded to ``0.01``.
+    cena_nowa, marza_nowa : Decimal, optional
+        New price or new margin, following the same rules.
+
+    Returns
+    -------
+    DiscountResult
+        Prices, margins, unit profits before and after the change, the total
+        loss at the old quantity and the extra and total quantities needed.
+
+    Raises
+    ------
+    DiscountError
+        When ``tkw`` or ``ilosc_stara`` is missing, when neither value of a
+        price/margin pair is given or when the new unit profit is not
+        positive.
+
+    Examples
+    --------
+    >>> oblicz_obnizke(Decimal('80'), 100, cena_stara=Decimal('120'),
+    ...                cena_nowa=Decimal('100')).ilosc_dodatkowa
+    100
+    """
+    if tkw is None or ilosc_stara is None:
+        raise DiscountError(ERR_FILL)
+    cena_stara, marza_stara = _cena_i_marza(tkw, cena_stara, marza_stara, ERR_PAIR_OLD)
+    cena_nowa, marza_nowa = _cena_i_marza(tkw, cena_nowa, marza_nowa, ERR_PAIR_NEW)
+
+    zysk_stary = cena_stara - tkw
+    zysk_nowy = cena_nowa - tkw
+    strata = (zysk_stary - zysk_nowy) * ilosc_stara
+
+    if zysk_nowy <= 0:
+        raise DiscountError(ERR_LOSS)
+
+    ilosc_dodatkowa = round(strata / zysk_nowy)
+    return DiscountResult(
+        cena_stara=cena_stara,
+        marza_stara=marza_stara,
+        cena_nowa=cena_nowa,
+        marza_nowa=marza_nowa,
+        zysk_stary=zysk_stary,
+        zysk_nowy=zysk_nowy,
+        strata=strata,
+        ilosc_dodatkowa=ilosc_dodatkowa,
+        ilosc_nowych=ilosc_stara + ilosc_dodatkowa,
+    )
@@ -0,0 +1,113 @@
+"""Fixed-point integer variants of the helpers in :mod:`calculator`.
+
+Money is represented as an integer number of grosze (hundredths) and margins
+as integers scaled by ``MARGIN_SCALE``. All divisions are exact integer
+divisions rounded half to even, which is the rounding applied by
+``Decimal.quantize`` in the default context.
+
+For in-range inputs -- amounts with at most two decimal places and an
+absolute value below ``MAX_GROSZE`` grosze, margins with at most six decimal
+places between ``MIN_MARGIN`` and ``1`` -- the results are identical to
+rounding the ``Decimal`` results of :mod:`calculator` to the same number of
+decimal places. Every intermediate product stays below ``2**63`` so the
+vectorized ``int64`` variants in :mod:`batch` are exact as well.
+"""
+
+from decimal import Decimal
+
+GROSZE_SCALE = 100
+MARGIN_SCALE = 10**6
+MAX_GROSZE = 10**11
+MIN_MARGIN = -1000 * MARGIN_SCALE
+
+
+def _scaled(value: Decimal, scale: int, name: str) -> int:
+    """Return ``value * scale`` as ``int`` or raise ``ValueError``."""
+    scaled = value * scale
+    if not scaled.is_finite() or scaled != scaled.to_integral_value():
+        raise ValueError(f"{name} not representable at scale {scale}: {value}")
+    return int(scaled)
+
+
+def do_groszy(value: Decimal) -> int:
+    """Return the amount ``value`` as an integer number of grosze.
+
+    ``ValueError`` is raised for amounts with more than two decimal places or
+    outside of the supported range.
+
+    Examples
+    --------
+    >>> do_groszy(Decimal('62.5'))
+    6250
+    """
+    grosze = _scaled(value, GROSZE_SCALE, "amount")
+    if abs(grosze) >= MAX_GROSZE:
+        raise ValueError(f"amount out of range: {value}")
+    return grosze
+
+
+def z_groszy(grosze: int) -> Decimal:
+    """Return ``grosze`` as a ``Decimal`` amount with two decimal places."""
+    return Decimal(grosze).scaleb(-2)
+
+
+def marza_do_int(value: Decimal) -> int:
+    """Return the margin fraction ``value`` scaled by ``MARGIN_SCALE``.
+
+    ``ValueError`` is raised for margins with more than six decimal places or
+    below ``MIN_MARGIN``. Margins of ``1`` and more are accepted as they all
+    yield a price of ``0``.
+    """
+    marza = _scaled(value, MARGIN_SCALE, "margin")
+    if marza <= MIN_MARGIN:
+        raise ValueError(f"margin out of range: {value}")
+    return min(marza, MARGIN_SCALE)
+
+
+def marza_z_int(marza: int, scale: int = MARGIN_SCALE) -> Decimal:
+    """Return the scaled margin ``marza`` as a ``Decimal`` fraction."""
+    return Decimal(marza) / scale
+
+
+def _div_half_even(num: int, den: int) -> int:
+    """Return ``num / den`` rounded half to even. ``den`` must be positive."""
+    quot, rem = divmod(num, den)
+    twice = 2 * rem
+    if twice > den or (twice == den and quot % 2):
+        quot += 1
+    return quot
+
+
+def licz_marze_z_ceny_gr(tkw: int, cena: int, scale: int = MARGIN_SCALE) -> int:
+    """Return the margin for amounts in grosze, scaled by ``scale``.
+
+    The result equals ``licz_marze_z_ceny`` rounded half to even to
+    ``1 / scale``. Use ``scale=10**4`` to obtain the margin in percent with
+    two decimal places in a single rounding step.
+
+    Examples
+    --------
+    >>> licz_marze_z_ceny_gr(8000, 12000, scale=10**4)
+    3333
+    """
+    if cena == 0:
+        return 0
+    if cena < 0:
+        tkw, cena = -tkw, -cena
+    return _div_half_even((cena - tkw) * scale, cena)
+
+
+def cena_z_marzy_gr(tkw: int, marza: int) -> int:
+    """Return the price in grosze achieving the scaled margin ``marza``.
+
+    The result equals ``cena_z_marzy(...).quantize(Decimal("0.01"))``.
+    ``0`` is returned for margins greater than or equal to ``1``.
+
+    Examples
+    --------
+    >>> cena_z_marzy_gr(5000, 200000)
+    6250
+    """
+    if marza >= MARGIN_SCALE:
+        return 0
+    return _div_half_even(tkw * MARGIN_SCALE, MARGIN_SCALE - marza)
@@ -0,0 +1,295 @@
+"""Incremental break-even analysis driven by catalog change feeds.
+
+:class:`IncrementalCatalog` keeps the inputs of every product indexed by SKU
+together with the results of the break-even analysis of :mod:`discount`.
+Updates change only some inputs of some products -- typically new unit
+costs for a few hundred SKUs -- and :meth:`IncrementalCatalog.apply`
+recomputes just those rows, returning the rows whose results changed.
+
+Updates are mappings with an ``sku`` key and any of ``INPUT_COLUMNS``, for
+example the rows of a CSV file read by :func:`read_updates`. Blank values
+leave the stored input unchanged. Prices and margins are alternatives, so
+setting one value of a pair such as ``cena_stara``/``marza_stara`` clears
+the other; an update giving both keeps the margin, which takes precedence in
+:func:`discount.oblicz_obnizke` as well. Margins are fractions like in
+:mod:`calculator`.
+
+:func:`watch` applies delta files dropped into a directory as they appear and
+writes the changed results to a CSV stream.
+"""
+
+import csv
+import threading
+from dataclasses import asdict, fields
+from decimal import Decimal
+from pathlib import Path
+from typing import IO, Iterable, Mapping, Optional, Union
+
+try:  # Prefer relative import when installed as a package
+    from .discount import (
+        ERR_FILL,
+        ERR_PAIR_NEW,
+        ERR_PAIR_OLD,
+        DiscountError,
+        DiscountResult,
+        _cena_i_marza,
+        oblicz_obnizke,
+    )
+    from .utils import _decimal_field
+except ImportError:  # Fallback for running as a standalone script
+    from discount import (
+        ERR_FILL,
+        ERR_PAIR_NEW,
+        ERR_PAIR_OLD,
+        DiscountError,
+        DiscountResult,
+        _cena_i_marza,
+        oblicz_obnizke,
+    )
+    from utils import _decimal_field
+
+SKU_COLUMN = "sku"
+INPUT_COLUMNS = (
+    "tkw",
+    "ilosc_stara",
+    "cena_stara",
+    "marza_stara",
+    "cena_nowa",
+    "marza_nowa",
+)
+RESULT_COLUMNS = ("tkw", "ilosc_stara") + tuple(
+    field.name for field in fields(DiscountResult)
+)
+ERROR_COLUMN = "blad"
+OUTPUT_COLUMNS = (SKU_COLUMN, *RESULT_COLUMNS, ERROR_COLUMN)
+DEFAULT_INTERVAL = 1.0
+# Error code of rows whose values are too large or too small to calculate.
+ERR_CALC = "err_calc"
+
+# The other value of every price/margin pair.
+_PAIRS = {
+    "cena_stara": "marza_stara",
+    "marza_stara": "cena_stara",
+    "cena_nowa": "marza_nowa",
+    "marza_nowa": "cena_nowa",
+}
+
+Inputs = dict[str, Optional[Decimal]]
+Result = dict[str, Union[Decimal, int, str, None]]
+
+
+def oblicz_wiersz(wiersz: Mapping[str, Optional[Decimal]]) -> Result:
+    """Return the break-even analysis of one catalog row.
+
+    The result maps ``RESULT_COLUMNS`` to the inputs ``tkw`` and
+    ``ilosc_stara`` and the values of :class:`discount.DiscountResult`, and
+    ``ERROR_COLUMN`` to an empty string, the :mod:`discount` error code of
+    the row or ``ERR_CALC`` when the calculation overflows. Values that could
+    be determined before an error, such as the margins of a row without a
+    quantity, are kept; the others are ``None``.
+
+    Examples
+    --------
+    >>> wynik = oblicz_wiersz({"tkw": Decimal("80"), "cena_stara": Decimal("100")})
+    >>> wynik["marza_stara"], wynik["blad"]
+    (Decimal('0.2'), 'err_pair_new')
+    """
+    wynik: Result = dict.fromkeys(RESULT_COLUMNS)
+    tkw = wynik["tkw"] = wiersz.get("tkw")
+    wynik["ilosc_stara"] = wiersz.get("ilosc_stara")
+    ceny_i_marze = {
+        name: wiersz.get(name)
+        for name in ("cena_stara", "marza_stara", "cena_nowa", "marza_nowa")
+    }
+    try:
+        if tkw is None:
+            raise DiscountError(ERR_FILL)
+        wynik["cena_stara"], wynik["marza_stara"] = _cena_i_marza(
+            tkw, ceny_i_marze["cena_stara"], ceny_i_marze["marza_stara"], ERR_PAIR_OLD
+        )
+        wynik["cena_nowa"], wynik["marza_nowa"] = _cena_i_marza(
+            tkw, ceny_i_marze["cena_nowa"], ceny_i_marze["marza_nowa"], ERR_PAIR_NEW
+        )
+        wynik.update(
+            asdict(oblicz_obnizke(tkw, wiersz.get("ilosc_stara"), **ceny_i_marze))
+        )
+    except DiscountError as exc:
+        wynik[ERROR_COLUMN] = exc.code
+    except ArithmeticError:
+        wynik[ERROR_COLUMN] = ERR_CALC
+    else:
+        wynik[ERROR_COLUMN] = ""
+    return wynik
+
+
+def _parse_update(update: Mapping) -> tuple[str, Inputs]:
+    """Return the SKU and the non-blank inputs of ``update``."""
+    sku = str(update.get(SKU_COLUMN) or "").strip()
+    if not sku:
+        raise ValueError("missing sku")
+    values = {name: _decimal_field(update, name) for name in INPUT_COLUMNS}
+    for name, value in values.items():
+        if value is not None and not value.is_finite():
+            raise ValueError(f"invalid {name}: {update[name]!r}")
+    return sku, {name: value for name, value in values.items() if value is not None}
+
+
+class IncrementalCatalog:
+    """Catalog inputs and break-even results indexed by SKU.
+
+    Examples
+    --------
+    >>> katalog = IncrementalCatalog()
+    >>> zmiany = katalog.apply([
+    ...     {"sku": "A", "tkw": "80", "ilosc_stara": "100",
+    ...      "cena_stara": "120", "cena_nowa": "100"},
+    ...     {"sku": "B", "tkw": "80", "ilosc_stara": "100",
+    ...      "cena_stara": "120", "marza_nowa": "0.2"},
+    ... ])
+    >>> zmiany["A"]["ilosc_dodatkowa"], len(katalog)
+    (100, 2)
+    >>> zmiany = katalog.apply([{"sku": "B", "tkw": "80.00"},
+    ...                         {"sku": "A", "tkw": "90"}])
+    >>> list(zmiany), zmiany["A"]["ilosc_dodatkowa"]
+    (['A'], 200)
+    """
+
+    def __init__(self) -> None:
+        self._inputs: dict[str, Inputs] = {}
+        self._results: dict[str, Result] = {}
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def __contains__(self, sku: str) -> bool:
+        return sku in self._results
+
+    def __getitem__(self, sku: str) -> Result:
+        return self._results[sku]
+
+    def inputs(self, sku: str) -> Inputs:
+        """Return a copy of the current inputs of ``sku``."""
+        return dict(self._inputs[sku])
+
+    def apply(self, updates: Iterable[Mapping]) -> dict[str, Result]:
+        """Apply ``updates`` and return the results that changed, by SKU.
+
+        Unknown SKUs are added. Only the updated rows are recomputed, each
+        once however often it occurs in ``updates``. The updates are
+        validated before any of them is applied; ``ValueError`` is raised
+        for a missing SKU or an unparsable or non-finite value. The returned
+        dictionaries are the stored results and must not be modified.
+        """
+        parsed = []
+        for number, update in enumerate(updates, start=1):
+            try:
+                parsed.append(_parse_update(update))
+            except ValueError as exc:
+                raise ValueError(f"update {number}: {exc}") from exc
+
+        # Compute every row before storing anything, so that an exception
+        # leaves the catalog unchanged.
+        inputs: dict[str, Inputs] = {}
+        for sku, values in parsed:
+            if sku not in inputs:
+                inputs[sku] = dict(
+                    self._inputs.get(sku) or dict.fromkeys(INPUT_COLUMNS)
+                )
+            wiersz = inputs[sku]
+            for name, value in values.items():
+                wiersz[name] = value
+                if name in _PAIRS:
+                    wiersz[_PAIRS[name]] = None
+        results = {sku: oblicz_wiersz(wiersz) for sku, wiersz in inputs.items()}
+
+        self._inputs.update(inputs)
+        changed = {}
+        for sku, wynik in results.items():
+            if self._results.get(sku) != wynik:
+                self._results[sku] = changed[sku] = wynik
+        return changed
+
+
+def read_updates(source: IO[str], *, delimiter: str = ",") -> list[dict[str, str]]:
+    """Return the rows of the CSV delta in ``source`` with lower-case keys."""
+    return [
+        {name.strip().lower(): value for name, value in row.items() if name}
+        for row in csv.DictReader(source, delimiter=delimiter)
+    ]
+
+
+def _cell(value: Union[Decimal, int, str, None]) -> str:
+    """Return a result value as CSV text with ``None`` as an empty cell."""
+    return "" if value is None else str(value)
+
+
+def write_results(
+    changes: Mapping[str, Result], sink: IO[str], *, delimiter: str = ","
+) -> None:
+    """Write ``changes`` to ``sink`` as CSV rows of ``OUTPUT_COLUMNS``."""
+    csv.writer(sink, delimiter=delimiter).writerows(
+        [sku, *(_cell(wynik[name]) for name in OUTPUT_COLUMNS[1:])]
+        for sku, wynik in changes.items()
+    )
+
+
+def new_delta_files(directory: Path, seen: set[str]) -> list[Path]:
+    """Return the CSV files of ``directory`` not in ``seen``, oldest first.
+
+    Names starting with ``.`` are skipped, so producers can write a delta to a
+    hidden file and rename it once it is complete.
+    """
+    files = []
+    for path in directory.iterdir():
+        if path.name in seen or path.name.startswith("."):
+            continue
+        if path.suffix.lower() != ".csv":
+            continue
+        try:
+            files.append((path.stat().st_mtime_ns, path.name, path))
+        except FileNotFoundError:  # removed since listing the directory
+            continue
+    return [path for *_, path in sorted(files)]
+
+
+def watch(
+    catalog: IncrementalCatalog,
+    directory: Union[str, Path],
+    sink: IO[str],
+    *,
+    interval: float = DEFAULT_INTERVAL,
+    delimiter: str = ",",
+    stop: Optional[threading.Event] = None,
+    errors: Optional[IO[str]] = None,
+) -> None:
+    """Apply delta files appearing in ``directory`` until ``stop`` is set.
+
+    The directory is polled every ``interval`` seconds. Every new CSV file is
+    applied to ``catalog`` once and the changed results are written to
+    ``sink`` as CSV with a header of ``OUTPUT_COLUMNS``, flushed after each
+    file. Files that cannot be read or contain invalid updates are skipped
+    and reported to ``errors``. Files present at the start are applied too.
+    With a ``stop`` event that is already set the directory is processed
+    once.
+    """
+    directory = Path(directory)
+    stop = stop or threading.Event()
+    seen: set[str] = set()
+    csv.writer(sink, delimiter=delimiter).writerow(OUTPUT_COLUMNS)
+    sink.flush()
+    while True:
+        for path in new_delta_files(directory, seen):
+            seen.add(path.name)
+            try:
+                with open(path, encoding="utf-8-sig", newline="") as source:
+                    changes = catalog.apply(read_updates(source, delimiter=delimiter))
+            except (OSError, UnicodeDecodeError, ValueError, ArithmeticError) as exc:
+                if errors is not None:
+                    print(f"{path.name}: {exc}", file=errors)
+                continue
+            write_results(changes, sink, delimiter=delimiter)
+            sink.flush()
+            if errors is not None:
+                print(f"{path.name}: {len(changes)} changed rows", file=errors)
+        if stop.wait(interval):
+            return
@@ -0,0 +1,306 @@
+"""Sorted index of catalog margins for range and threshold queries.
+
+:class:`MarginIndex` keeps, for every column of ``INDEX_COLUMNS``, the row
+numbers of a catalog sorted by that column:
+
+``marza``
+    Margin ``(cena - tkw) / cena``.
+``zysk``
+    Unit profit ``cena - tkw``.
+``elastycznosc``
+    Break-even elasticity of a small price cut, ``1 / marza``: the relative
+    increase in volume per relative price cut that keeps the total profit
+    unchanged. Rows with a margin that is not positive cannot break even and
+    get ``inf``.
+
+Range queries bisect the sorted values, so they take logarithmic time plus
+the size of the output. Cutting the price by the fraction ``d`` requires the
+extra volume ``x = d / (marza - d)``, so "which SKUs can take a cut of ``d``
+needing less than ``x`` extra volume" is the range query
+``marza > d * (1 + 1 / x)`` answered by :meth:`MarginIndex.mozliwa_obnizka`.
+
+An index can be saved next to a :mod:`store` and reopened through memory
+maps, so queries do not need to read the catalog. A saved index records which
+import or update of the store it was built from, and :func:`open_index`
+refuses an index of an earlier one. :meth:`MarginIndex.update` applies
+changed costs and prices without sorting the whole catalog again, and
+:meth:`MarginIndex.update_from_store` does so for the rows changed by
+:func:`store.update_store`, keeping the index valid for the updated store.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Iterable, Optional, Sequence, Union
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+try:  # Prefer relative import when installed as a package
+    from .store import META_FILE as STORE_META_FILE
+    from .store import SKU_COLUMN, CatalogStore, PathLike, calculate_chunk
+except ImportError:  # Fallback for running as a standalone script
+    from store import META_FILE as STORE_META_FILE
+    from store import SKU_COLUMN, CatalogStore, PathLike, calculate_chunk
+
+INDEX_VERSION = 1
+INDEX_DIR = "index"
+INDEX_COLUMNS = ("marza", "zysk", "elastycznosc")
+META_FILE = "index.json"
+# What identifies the store import an index was built from.
+Fingerprint = dict[str, Union[int, str, None]]
+# Arrays of a saved index, each stored as ``<name>.npy``.
+_ARRAYS = ("sku", "tkw", "cena") + tuple(
+    f"{column}.{kind}" for column in INDEX_COLUMNS for kind in ("values", "rows")
+)
+
+
+def _columns(tkw: np.ndarray, cena: np.ndarray) -> dict[str, np.ndarray]:
+    """Return the values of ``INDEX_COLUMNS``; ``NaN`` where a row has no price."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        marza = np.where(cena != 0, (cena - tkw) / cena, np.nan)
+        elastycznosc = np.where(marza > 0, 1 / marza, np.inf)
+    elastycznosc[np.isnan(marza)] = np.nan
+    return {"marza": marza, "zysk": cena - tkw, "elastycznosc": elastycznosc}
+
+
+def _fingerprint(store: CatalogStore) -> Fingerprint:
+    """Return the import identifier, row count and time of ``meta.json``."""
+    path = store.path / STORE_META_FILE
+    meta = json.loads(path.read_text(encoding="utf-8"))
+    return {
+        "import": meta.get("import"),
+        "rows": len(store),
+        "mtime_ns": path.stat().st_mtime_ns,
+    }
+
+
+def _prices(columns: dict[str, np.ndarray]) -> tuple[list[str], np.ndarray, np.ndarray]:
+    """Return the SKUs, costs and prices of store ``columns``.
+
+    Rows without a SKU column are numbered.
+    """
+    cena, _, _, _ = calculate_chunk(columns)
+    if SKU_COLUMN in columns:
+        sku = [value.decode() for value in columns[SKU_COLUMN].tolist()]
+    else:
+        sku = [str(row) for row in range(len(cena))]
+    return sku, columns["tkw"], cena
+
+
+def _encode(skus: Iterable[str]) -> np.ndarray:
+    """Return ``skus`` as fixed-width UTF-8 bytes like the store SKU column."""
+    return np.array([str(sku).encode() for sku in skus], dtype="S")
+
+
+class MarginIndex:
+    """Catalog rows sorted by margin, unit profit and break-even elasticity.
+
+    Parameters
+    ----------
+    sku : sequence of str
+        Unique SKU of every row.
+    tkw, cena : array_like
+        Unit cost and current price of every row. Rows with a missing or zero
+        price are kept but not indexed.
+
+    Examples
+    --------
+    >>> index = MarginIndex(["A", "B", "C"], [80, 50, 95], [100, 100, 100])
+    >>> index.sku(index.between("marza", 0.1, 0.5))
+    ['A', 'B']
+    >>> index.sku(index.mozliwa_obnizka(0.1, 0.5))
+    ['B']
+    """
+
+    def __init__(self, sku: Sequence[str], tkw: ArrayLike, cena: ArrayLike):
+        self._sku = _encode(sku)
+        self._tkw = np.asarray(tkw, dtype=np.float64).reshape(-1)
+        self._cena = np.asarray(cena, dtype=np.float64).reshape(-1)
+        if not len(self._sku) == len(self._tkw) == len(self._cena):
+            raise ValueError("sku, tkw and cena differ in length")
+        if len(set(self._sku.tolist())) != len(self._sku):
+            raise ValueError("duplicate sku")
+        self._positions: Optional[dict[bytes, int]] = None
+        self._store: Optional[Fingerprint] = None
+        self._values: dict[str, np.ndarray] = {}
+        self._rows: dict[str, np.ndarray] = {}
+        for name, values in _columns(self._tkw, self._cena).items():
+            rows = np.flatnonzero(~np.isnan(values))
+            order = np.argsort(values[rows], kind="stable")
+            self._rows[name] = rows[order]
+            self._values[name] = values[rows][order]
+
+    @classmethod
+    def _restore(
+        cls, arrays: dict[str, np.ndarray], store: Optional[Fingerprint]
+    ) -> "MarginIndex":
+        """Return an index of the arrays and store fingerprint saved by :meth:`save`."""
+        index = cls.__new__(cls)
+        index._sku, index._tkw, index._cena = (
+            arrays["sku"],
+            arrays["tkw"],
+            arrays["cena"],
+        )
+        index._positions = None
+        index._store = store
+        index._values = {name: arrays[f"{name}.values"] for name in INDEX_COLUMNS}
+        index._rows = {name: arrays[f"{name}.rows"] for name in INDEX_COLUMNS}
+        return index
+
+    @classmethod
+    def from_store(cls, store: CatalogStore) -> "MarginIndex":
+        """Return the index of a :mod:`store` catalog.
+
+        Prices missing in the store are derived from its margins like in
+        ``cli.py catalog calc``; rows without a SKU column are numbered.
+        """
+        index = cls(*_prices(store.columns))
+        index._store = _fingerprint(store)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._sku)
+
+    def indexed(self, column: str) -> int:
+        """Return the number of rows with a value of ``column``."""
+        return len(self._values[column])
+
+    def between(
+        self, column: str, low: Optional[float] = None, high: Optional[float] = None
+    ) -> np.ndarray:
+        """Return the rows with ``low <= column <= high``, sorted by ``column``.
+
+        Either bound may be omitted. ``KeyError`` is raised for columns not
+        in ``INDEX_COLUMNS``.
+        """
+        values = self._values[column]
+        start = 0 if low is None else np.searchsorted(values, low, "left")
+        stop = len(values) if high is None else np.searchsorted(values, high, "right")
+        return np.asarray(self._rows[column][start:stop])
+
+    def mozliwa_obnizka(self, obnizka: float, max_wzrost: float) -> np.ndarray:
+        """Return the rows that can take a price cut with limited extra volume.
+
+        A row qualifies when cutting its price by the fraction ``obnizka``
+        keeps the total profit with less than ``max_wzrost`` relative extra
+        volume, i.e. when its margin exceeds
+        ``obnizka * (1 + 1 / max_wzrost)``. Rows are sorted by margin.
+        """
+        if not 0 <= obnizka < 1:
+            raise ValueError("obnizka must be at least 0 and below 1")
+        if max_wzrost <= 0:
+            raise ValueError("max_wzrost must be positive")
+        values = self._values["marza"]
+        start = np.searchsorted(values, obnizka * (1 + 1 / max_wzrost), "right")
+        return np.asarray(self._rows["marza"][start:])
+
+    def sku(self, rows: Iterable[int]) -> list[str]:
+        """Return the SKUs of ``rows``."""
+        return [self._sku[row].decode() for row in rows]
+
+    def table(self, rows: ArrayLike) -> dict[str, np.ndarray]:
+        """Return ``tkw``, ``cena`` and ``INDEX_COLUMNS`` of ``rows``."""
+        rows = np.asarray(rows, dtype=np.int64)
+        tkw, cena = self._tkw[rows], self._cena[rows]
+        return {"tkw": tkw, "cena": cena, **_columns(tkw, cena)}
+
+    def update(self, sku: Sequence[str], tkw: ArrayLike, cena: ArrayLike) -> None:
+        """Set the cost and price of ``sku``, adding unknown SKUs.
+
+        Only the updated rows are re-sorted: their old entries are removed
+        and the new ones merged into the sorted columns, which takes time
+        linear in the size of the index instead of a full sort.
+        """
+        encoded = _encode(sku)
+        tkw = np.broadcast_to(np.asarray(tkw, dtype=np.float64), encoded.shape)
+        cena = np.broadcast_to(np.asarray(cena, dtype=np.float64), encoded.shape)
+        if self._positions is None:
+            self._positions = {key: row for row, key in enumerate(self._sku.tolist())}
+        rows = np.empty(len(encoded), dtype=np.int64)
+        new = []
+        for position, key in enumerate(encoded.tolist()):
+            row = self._positions.get(key)
+            if row is None:
+                row = self._positions[key] = len(self._sku) + len(new)
+                new.append(key)
+            rows[position] = row
+        if new:
+            width = max(self._sku.dtype.itemsize, encoded.dtype.itemsize)
+            self._sku = np.concatenate([self._sku, np.array(new, dtype="S")]).astype(
+                f"S{width}"
+            )
+        size = len(self._sku)
+        self._tkw = np.resize(self._tkw, size)
+        self._cena = np.resize(self._cena, size)
+        self._tkw[rows] = tkw
+        self._cena[rows] = cena
+
+        rows = np.unique(rows)
+        stale = np.zeros(size, dtype=bool)
+        stale[rows] = True
+        changed = _columns(self._tkw[rows], self._cena[rows])
+        for name, values in changed.items():
+            keep = ~stale[self._rows[name]]
+            old_values, old_rows = self._values[name][keep], self._rows[name][keep]
+            valid = ~np.isnan(values)
+            order = np.argsort(values[valid], kind="stable")
+            new_values, new_rows = values[valid][order], rows[valid][order]
+            positions = np.searchsorted(old_values, new_values, "right")
+            self._values[name] = np.insert(old_values, positions, new_values)
+            self._rows[name] = np.insert(old_rows, positions, new_rows)
+
+    def update_from_store(self, store: CatalogStore, rows: ArrayLike) -> None:
+        """Apply the changed ``rows`` of ``store``, e.g. of :func:`store.update_store`.
+
+        ``store`` is the updated catalog the index was built from. The index
+        then equals one rebuilt by :meth:`from_store` and records the current
+        import of ``store``, so :func:`open_index` accepts it for the store.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        if SKU_COLUMN not in store:
+            raise ValueError("store has no sku column")
+        self.update(*_prices({name: col[rows] for name, col in store.columns.items()}))
+        self._store = _fingerprint(store)
+
+    def save(self, path: PathLike) -> None:
+        """Write the index to the directory ``path``, e.g. inside a store.
+
+        Every array is written to a temporary file and renamed, so an index
+        opened through memory maps can be saved over the files it maps.
+        """
+        target = Path(path)
+        target.mkdir(parents=True, exist_ok=True)
+        (target / META_FILE).unlink(missing_ok=True)
+        arrays = {"sku": self._sku, "tkw": self._tkw, "cena": self._cena}
+        for name in INDEX_COLUMNS:
+            arrays[f"{name}.values"] = self._values[name]
+            arrays[f"{name}.rows"] = self._rows[name]
+        for name, array in arrays.items():
+            temporary = target / f".{name}.npy"
+            with open(temporary, "wb") as fh:
+                np.save(fh, np.ascontiguousarray(array))
+            os.replace(temporary, target / f"{name}.npy")
+        meta = {"version": INDEX_VERSION, "rows": len(self), "store": self._store}
+        (target / META_FILE).write_text(json.dumps(meta) + "\n", encoding="utf-8")
+
+
+def open_index(path: PathLike, store: Optional[CatalogStore] = None) -> MarginIndex:
+    """Open an index written by :meth:`MarginIndex.save` through memory maps.
+
+    Queries read only the pages of the sorted columns they bisect and of the
+    rows they return. ``ValueError`` is raised when ``path`` holds no index
+    of a supported version, or when ``store`` is given and the index was not
+    built from its current import.
+    """
+    source = Path(path)
+    try:
+        meta = json.loads((source / META_FILE).read_text(encoding="utf-8"))
+    except (FileNotFoundError, NotADirectoryError) as exc:
+        raise ValueError(f"no margin index in {source}") from exc
+    if meta.get("version") != INDEX_VERSION:
+        raise ValueError(f"unsupported index version: {meta.get('version')}")
+    if store is not None and meta.get("store") != _fingerprint(store):
+        raise ValueError(f"margin index in {source} is out of date; rebuild it")
+    arrays = {name: np.load(source / f"{name}.npy", mmap_mode="r") for name in _ARRAYS}
+    return MarginIndex._restore(arrays, meta.get("store"))
@@ -0,0 +1,397 @@
+"""Batch calculations on pandas and Arrow columns without copying them.
+
+:func:`licz_marze_z_ceny_column` and :func:`cena_z_marzy_column` are the
+counterparts of :func:`batch.licz_marze_z_ceny_batch` and
+:func:`batch.cena_z_marzy_batch` for data that already lives in a pipeline.
+They accept pandas ``Series``, ``pyarrow`` arrays and chunked arrays, NumPy
+arrays and scalars and return the result as a new column of the same kind:
+a ``Series`` with the index of the input, an Arrow array with the chunks of
+the input or a NumPy array.
+
+Numeric columns are viewed through the buffer protocol, so ``float64``
+columns without nulls are not copied and chunked arrays are processed chunk
+by chunk. ``decimal128`` columns are never converted to ``Decimal`` objects:
+their 128-bit integers are read directly from the Arrow buffer and evaluated
+by the integer engine of :mod:`fixed`, the default engine for decimal input.
+Only rows with more decimal places than the integer engine keeps -- prices
+finer than grosze, margins finer than ``batch.MARGIN_DECIMALS`` places -- are
+recomputed with :mod:`calculator`, so no input is rounded. The results are
+then ``decimal128`` columns with ``PRICE_DECIMALS`` places for prices and
+``batch.MARGIN_DECIMALS`` places for margins, equal to the quantized results
+of :mod:`calculator`. Nulls stay null in the result.
+
+Arrow columns require the optional ``pyarrow`` package
+(``pip install margin_calculator[arrow]``).
+"""
+
+from decimal import Decimal
+from typing import Callable, NamedTuple, Optional, Union
+
+import numpy as np
+import pandas as pd
+from numpy.typing import ArrayLike
+
+try:  # Prefer relative import when installed as a package
+    from .batch import (
+        MARGIN_DECIMALS,
+        _check_engine,
+        _to_scaled,
+        cena_z_marzy_batch,
+        cena_z_marzy_gr_batch,
+        licz_marze_z_ceny_batch,
+        licz_marze_z_ceny_gr_batch,
+    )
+    from .calculator import cena_z_marzy, licz_marze_z_ceny
+    from .fixed import MARGIN_SCALE
+except ImportError:  # Fallback for running as a standalone script
+    from batch import (
+        MARGIN_DECIMALS,
+        _check_engine,
+        _to_scaled,
+        cena_z_marzy_batch,
+        cena_z_marzy_gr_batch,
+        licz_marze_z_ceny_batch,
+        licz_marze_z_ceny_gr_batch,
+    )
+    from calculator import cena_z_marzy, licz_marze_z_ceny
+    from fixed import MARGIN_SCALE
+
+try:
+    import pyarrow as pa
+except ImportError:  # Arrow columns cannot be passed without pyarrow
+    pa = None
+
+PRICE_DECIMALS = 2  # decimal places of fixed.GROSZE_SCALE
+DECIMAL_PRECISION = 38  # precision of the decimal128 results
+
+Column = Union[ArrayLike, pd.Series, "pa.Array", "pa.ChunkedArray"]
+
+
+class _Values(NamedTuple):
+    """Values of an input column.
+
+    ``values`` holds ``float64`` numbers or, when ``scale`` is not ``None``,
+    the unscaled integers of a decimal column with ``scale`` decimal places.
+    Null rows hold ``0`` and are ``False`` in ``valid``, which is ``None``
+    for columns without nulls.
+    """
+
+    values: np.ndarray
+    scale: Optional[int]
+    valid: Optional[np.ndarray]
+
+
+def _is_arrow(column) -> bool:
+    """Return whether ``column`` is an Arrow array or chunked array."""
+    return pa is not None and isinstance(column, (pa.Array, pa.ChunkedArray))
+
+
+def _is_decimal(column) -> bool:
+    """Return whether ``column`` is an Arrow column of a decimal type."""
+    return _is_arrow(column) and pa.types.is_decimal(column.type)
+
+
+def _unwrap(column):
+    """Return the Arrow or NumPy data of a pandas ``Series``."""
+    if not isinstance(column, pd.Series):
+        return column
+    if isinstance(column.dtype, pd.ArrowDtype):
+        return pa.array(column.array)
+    if isinstance(column.dtype, np.dtype):
+        return column.to_numpy()
+    # Masked extension types such as ``Float64`` keep nulls in a separate mask.
+    return column.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def _values(column) -> _Values:
+    """Return the values of an Arrow array, a NumPy array or a scalar."""
+    if not _is_arrow(column):
+        return _Values(np.asarray(column, dtype=np.float64), None, None)
+    valid = None
+    if column.null_count:
+        valid = column.is_valid().to_numpy(zero_copy_only=False)
+    if not pa.types.is_decimal(column.type):
+        values = np.asarray(column.to_numpy(zero_copy_only=False), dtype=np.float64)
+        return _Values(
+            values if valid is None else np.where(valid, values, 0), None, valid
+        )
+    if not pa.types.is_decimal128(column.type):
+        column = column.cast(pa.decimal128(DECIMAL_PRECISION, column.type.scale))
+    # Little-endian two's complement 128-bit integers, viewed as pairs of words.
+    words = np.frombuffer(column.buffers()[1], dtype="<i8").reshape(-1, 2)
+    words = words[column.offset : column.offset + len(column)]
+    low, high = words[:, 0], words[:, 1]
+    if valid is not None:
+        low, high = np.where(valid, low, 0), np.where(valid, high, 0)
+    if np.any(high != low >> 63):
+        raise ValueError("decimal value out of fixed-point range")
+    return _Values(low, column.type.scale, valid)
+
+
+def _floats(column: _Values) -> np.ndarray:
+    """Return the values of ``column`` as ``float64`` numbers."""
+    if column.scale is None:
+        return column.values
+    return column.values / 10.0**column.scale
+
+
+def _scaled(column: _Values, decimals: int) -> np.ndarray:
+    """Return the values of ``column`` as ``int64`` with ``decimals`` places.
+
+    Decimal values with more places are truncated; they are the rows of
+    :func:`_finer` and must be recomputed by :func:`_recompute`.
+    """
+    if column.scale is None:
+        return _to_scaled(column.values, 10**decimals)
+    shift = decimals - column.scale
+    if shift == 0:
+        return column.values
+    if shift > 0:
+        factor = 10**shift
+        limit = np.iinfo(np.int64).max // factor
+        if column.values.size and np.abs(column.values).max() > limit:
+            raise ValueError("decimal value out of fixed-point range")
+        return column.values * factor
+    if -shift > 18:  # every value that is not zero is finer
+        return np.zeros_like(column.values)
+    return column.values // np.int64(10**-shift)
+
+
+def _finer(column: _Values, decimals: int) -> np.ndarray:
+    """Return the rows of a decimal column with more than ``decimals`` places."""
+    if column.scale is None or column.scale <= decimals:
+        return np.zeros(np.shape(column.values), dtype=bool)
+    excess = column.scale - decimals
+    if excess > 18:  # int64 values are below 10**19
+        return column.values != 0
+    return column.values % np.int64(10**excess) != 0
+
+
+def _exact(column: _Values, decimals: int, rows: np.ndarray) -> list[Decimal]:
+    """Return the values of ``rows`` of ``column`` as exact ``Decimal`` numbers.
+
+    Float values are taken with ``decimals`` places like in :func:`_scaled`.
+    """
+    if column.scale is None:
+        values, scale = _scaled(column, decimals), decimals
+    else:
+        values, scale = column.values, column.scale
+    values = np.broadcast_to(values, rows.shape)[rows]
+    return [Decimal(value).scaleb(-scale) for value in values.tolist()]
+
+
+def _recompute(
+    result: np.ndarray,
+    decimals: int,
+    func: Callable[[Decimal, Decimal], Decimal],
+    first: tuple[_Values, int],
+    second: tuple[_Values, int],
+) -> np.ndarray:
+    """Return ``result`` with the :func:`_finer` rows recomputed by ``func``.
+
+    ``first`` and ``second`` are the inputs with the decimal places the
+    integer engine keeps of them; ``func`` is evaluated on their exact
+    values and quantized to ``decimals`` places.
+    """
+    rows = _finer(*first) | _finer(*second)
+    if not rows.any():
+        return result
+    rows = np.broadcast_to(rows, result.shape)
+    result = np.array(result, dtype=np.int64)
+    quantum = Decimal(1).scaleb(-decimals)
+    limit = np.iinfo(np.int64).max
+    pairs = zip(_exact(*first, rows), _exact(*second, rows))
+    for row, (a, b) in zip(np.flatnonzero(rows), pairs):
+        value = int(func(a, b).quantize(quantum).scaleb(decimals))
+        if abs(value) > limit:
+            raise ValueError("result out of fixed-point range")
+        result.flat[row] = value
+    return result
+
+
+# Evaluates two columns with an engine; returns the values and their decimal
+# places, ``None`` for ``float64`` values.
+Evaluate = Callable[[_Values, _Values, str], tuple[np.ndarray, Optional[int]]]
+
+
+def _marza(tkw: _Values, cena: _Values, engine: str) -> tuple:
+    """Return the margins of ``tkw`` and ``cena``; see :data:`Evaluate`."""
+    if engine == "fixed" and (tkw.scale is not None or cena.scale is not None):
+        marze = licz_marze_z_ceny_gr_batch(
+            _scaled(tkw, PRICE_DECIMALS), _scaled(cena, PRICE_DECIMALS)
+        )
+        marze = _recompute(
+            marze,
+            MARGIN_DECIMALS,
+            licz_marze_z_ceny,
+            (tkw, PRICE_DECIMALS),
+            (cena, PRICE_DECIMALS),
+        )
+        return marze, MARGIN_DECIMALS
+    return licz_marze_z_ceny_batch(_floats(tkw), _floats(cena), engine=engine), None
+
+
+def _cena(tkw: _Values, marza: _Values, engine: str) -> tuple:
+    """Return the prices of ``tkw`` and ``marza``; see :data:`Evaluate`."""
+    if engine == "fixed" and (tkw.scale is not None or marza.scale is not None):
+        marza_int = _scaled(marza, MARGIN_DECIMALS)
+        ceny = cena_z_marzy_gr_batch(
+            _scaled(tkw, PRICE_DECIMALS), np.minimum(marza_int, MARGIN_SCALE)
+        )
+        ceny = _recompute(
+            ceny,
+            PRICE_DECIMALS,
+            cena_z_marzy,
+            (tkw, PRICE_DECIMALS),
+            (marza, MARGIN_DECIMALS),
+        )
+        return ceny, PRICE_DECIMALS
+    return cena_z_marzy_batch(_floats(tkw), _floats(marza), engine=engine), None
+
+
+def _valid(first: _Values, second: _Values) -> Optional[np.ndarray]:
+    """Return the rows valid in both columns, ``None`` when all are."""
+    if first.valid is None:
+        return second.valid
+    if second.valid is None:
+        return first.valid
+    return first.valid & second.valid
+
+
+def _to_arrow(
+    values: np.ndarray, decimals: Optional[int], valid: Optional[np.ndarray]
+) -> "pa.Array":
+    """Return ``values`` as an Arrow array, nulls where ``valid`` is ``False``."""
+    if decimals is None:
+        return pa.array(values, mask=None if valid is None else ~valid)
+    words = np.empty((len(values), 2), dtype="<i8")
+    words[:, 0] = values
+    words[:, 1] = values >> 63
+    bitmap = None
+    if valid is not None:
+        bitmap = pa.py_buffer(np.packbits(valid, bitorder="little"))
+    return pa.Array.from_buffers(
+        pa.decimal128(DECIMAL_PRECISION, decimals),
+        len(values),
+        [bitmap, pa.py_buffer(words)],
+    )
+
+
+def _chunks(first, second) -> list[tuple[int, Optional[int]]]:
+    """Return ``(start, length)`` of the chunks of the first chunked column.
+
+    Unchunked input is one chunk of length ``None``, i.e. all rows.
+    """
+    for column in (first, second):
+        if _is_arrow(column) and isinstance(column, pa.ChunkedArray):
+            if column.num_chunks > 1:
+                lengths = [len(chunk) for chunk in column.chunks]
+                starts = np.cumsum([0, *lengths[:-1]]).tolist()
+                return list(zip(starts, lengths))
+    return [(0, None)]
+
+
+def _slice(column, start: int, length: Optional[int]):
+    """Return the rows ``start:start + length`` of ``column`` without copying.
+
+    Chunked arrays whose chunks do not line up with the slice are combined.
+    """
+    if _is_arrow(column):
+        if length is not None:
+            column = column.slice(start, length)
+        if isinstance(column, pa.ChunkedArray):
+            return (
+                column.chunk(0) if column.num_chunks == 1 else column.combine_chunks()
+            )
+        return column
+    if length is None or not np.ndim(column):
+        return column
+    return np.asarray(column)[start : start + length]
+
+
+def _apply(
+    evaluate: Evaluate, first: Column, second: Column, engine: Optional[str], name: str
+):
+    """Evaluate two columns and return the result like the inputs."""
+    series = next((c for c in (first, second) if isinstance(c, pd.Series)), None)
+    first, second = _unwrap(first), _unwrap(second)
+    if engine is None:
+        engine = "fixed" if _is_decimal(first) or _is_decimal(second) else "float"
+    _check_engine(engine)
+
+    if not (_is_arrow(first) or _is_arrow(second)):
+        result, _ = evaluate(_values(first), _values(second), engine)
+    else:
+        pieces = []
+        for start, length in _chunks(first, second):
+            a = _values(_slice(first, start, length))
+            b = _values(_slice(second, start, length))
+            values, decimals = evaluate(a, b, engine)
+            pieces.append(_to_arrow(np.atleast_1d(values), decimals, _valid(a, b)))
+        chunked = any(isinstance(c, pa.ChunkedArray) for c in (first, second))
+        result = pa.chunked_array(pieces) if chunked else pieces[0]
+        if series is not None:
+            result = pd.arrays.ArrowExtensionArray(result)
+    if series is None:
+        return result
+    return pd.Series(result, index=series.index, name=name, copy=False)
+
+
+def licz_marze_z_ceny_column(
+    tkw: Column, cena: Column, *, engine: Optional[str] = None
+):
+    """Return the margins of columns of costs and prices as a new column.
+
+    Parameters
+    ----------
+    tkw, cena : Series, pyarrow.Array, pyarrow.ChunkedArray or array_like
+        Unit production costs and selling prices; a scalar is used for all
+        rows.
+    engine : {"float", "fixed", "hybrid"}, optional
+        Engine of :func:`batch.licz_marze_z_ceny_batch`. Defaults to
+        ``"fixed"`` when an input is a decimal column and to ``"float"``
+        otherwise.
+
+    Returns
+    -------
+    Series, pyarrow.Array, pyarrow.ChunkedArray or numpy.ndarray
+        Margins named ``marza``, as a ``decimal128`` column for decimal input
+        and the ``"fixed"`` engine and as ``float64`` values otherwise.
+
+    Examples
+    --------
+    >>> ceny = pd.Series([100.0, 0.0], index=["A", "B"])
+    >>> licz_marze_z_ceny_column(50, ceny)
+    A    0.5
+    B    0.0
+    Name: marza, dtype: float64
+    """
+    return _apply(_marza, tkw, cena, engine, "marza")
+
+
+def cena_z_marzy_column(tkw: Column, marza: Column, *, engine: Optional[str] = None):
+    """Return the prices of columns of costs and margins as a new column.
+
+    Parameters
+    ----------
+    tkw, marza : Series, pyarrow.Array, pyarrow.ChunkedArray or array_like
+        Unit production costs and desired margins as fractions; a scalar is
+        used for all rows.
+    engine : {"float", "fixed", "hybrid"}, optional
+        Engine of :func:`batch.cena_z_marzy_batch`, chosen as in
+        :func:`licz_marze_z_ceny_column`.
+
+    Returns
+    -------
+    Series, pyarrow.Array, pyarrow.ChunkedArray or numpy.ndarray
+        Prices named ``cena``; decimal input yields ``decimal128`` prices
+        with ``PRICE_DECIMALS`` places.
+
+    Examples
+    --------
+    >>> cena_z_marzy_column(pd.Series([50.0, 10.0]), 0.2)
+    0    62.5
+    1    12.5
+    Name: cena, dtype: float64
+    """
+    return _apply(_cena, tkw, marza, engine, "cena")
@@ -0,0 +1,232 @@
+"""Counters and latency histograms of the calculator hot paths.
+
+:data:`METRICS` collects, per operation name, call counts and latency
+histograms together with plain counters such as the number of input values
+that could not be parsed. Collection is off unless the environment variable
+``MARGIN_CALC_PROFILE`` is set to a non-empty value other than ``0``, or
+:meth:`Metrics.enable` is called, e.g. by ``cli.py --profile``.
+
+Instrumentation costs nothing while it is disabled: the calculator functions
+are only timed when they are called through an :class:`InstrumentedCalculator`,
+which can be used wherever the :mod:`calculator` module or a
+:class:`cache.CalculatorCache` is expected and is only put in place when
+profiling is enabled. Other call sites check :attr:`Metrics.enabled` on their
+slow or failure paths only.
+
+A snapshot is exported as JSON (:meth:`Metrics.snapshot`) or in the
+Prometheus text exposition format (:meth:`Metrics.to_prometheus`).
+"""
+
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+from typing import Iterator, Optional
+
+try:  # Prefer relative import when installed as a package
+    from . import calculator
+    from .cache import CalculatorCache
+except ImportError:  # Fallback for running as a standalone script
+    import calculator
+    from cache import CalculatorCache
+
+ENV_VAR = "MARGIN_CALC_PROFILE"
+PREFIX = "margin_calc"
+# Upper bounds of the latency histogram buckets in seconds.
+BUCKETS = (
+    1e-6,
+    5e-6,
+    1e-5,
+    5e-5,
+    1e-4,
+    5e-4,
+    1e-3,
+    5e-3,
+    0.01,
+    0.05,
+    0.1,
+    0.5,
+    1.0,
+    5.0,
+    float("inf"),
+)
+
+
+class Metrics:
+    """Thread-safe registry of counters and latency histograms.
+
+    Examples
+    --------
+    >>> metrics = Metrics(enabled=True)
+    >>> metrics.observe("cena_z_marzy", 2e-6)
+    >>> metrics.count("parse_errors")
+    >>> snapshot = metrics.snapshot()
+    >>> snapshot["counters"], snapshot["histograms"]["cena_z_marzy"]["count"]
+    ({'parse_errors': 1}, 1)
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters: dict[str, int] = {}
+        # Per operation: bucket counts, sum of the observations and errors.
+        self._histograms: dict[str, list] = {}
+
+    def enable(self) -> None:
+        """Start collecting."""
+        self.enabled = True
+
+    def disable(self) -> None:
+        """Stop collecting; collected values are kept."""
+        self.enabled = False
+
+    def reset(self) -> None:
+        """Remove all collected values."""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def count(self, name: str, value: int = 1) -> None:
+        """Add ``value`` to the counter ``name`` when enabled."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name: str, seconds: float, *, error: bool = False) -> None:
+        """Record a call of the operation ``name`` taking ``seconds``."""
+        if not self.enabled:
+            return
+        bucket = bisect.bisect_left(BUCKETS, seconds)
+        with self._lock:
+            entry = self._histograms.get(name)
+            if entry is None:
+                entry = self._histograms[name] = [[0] * len(BUCKETS), 0.0, 0]
+            entry[0][bucket] += 1
+            entry[1] += seconds
+            entry[2] += error
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """Time the block as a call of ``name``; exceptions count as errors.
+
+        ``SystemExit`` and ``KeyboardInterrupt`` are timed but not errors.
+        """
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        error = False
+        try:
+            yield
+        except Exception:
+            error = True
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, error=error)
+
+    def merge(self, snapshot: dict) -> None:
+        """Add the values of a :meth:`snapshot`, e.g. of a worker process."""
+        if not self.enabled:
+            return
+        with self._lock:
+            for name, value in snapshot["counters"].items():
+                self._counters[name] = self._counters.get(name, 0) + value
+            for name, values in snapshot["histograms"].items():
+                entry = self._histograms.get(name)
+                if entry is None:
+                    entry = self._histograms[name] = [[0] * len(BUCKETS), 0.0, 0]
+                previous = 0
+                for bucket, cumulative in enumerate(values["buckets"].values()):
+                    entry[0][bucket] += cumulative - previous
+                    previous = cumulative
+                entry[1] += values["sum"]
+                entry[2] += values["errors"]
+
+    def snapshot(self) -> dict:
+        """Return the collected values as JSON-serializable data.
+
+        Histograms map every operation to its call ``count``, ``errors``, the
+        ``sum`` of the latencies in seconds and the cumulative call counts of
+        ``buckets`` keyed by their upper bound.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {
+                name: (list(buckets), total, errors)
+                for name, (buckets, total, errors) in self._histograms.items()
+            }
+        result = {}
+        for name, (buckets, total, errors) in sorted(histograms.items()):
+            cumulative, running = {}, 0
+            for bound, calls in zip(BUCKETS, buckets):
+                running += calls
+                cumulative["+Inf" if bound == float("inf") else repr(bound)] = running
+            result[name] = {
+                "count": running,
+                "errors": errors,
+                "sum": total,
+                "buckets": cumulative,
+            }
+        return {"counters": dict(sorted(counters.items())), "histograms": result}
+
+    def to_prometheus(self) -> str:
+        """Return the collected values in the Prometheus text format."""
+        snapshot = self.snapshot()
+        lines = []
+        for name, value in snapshot["counters"].items():
+            metric = f"{PREFIX}_{name}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        if snapshot["histograms"]:
+            metric = f"{PREFIX}_duration_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            for name, entry in snapshot["histograms"].items():
+                for bound, calls in entry["buckets"].items():
+                    lines.append(f'{metric}_bucket{{op="{name}",le="{bound}"}} {calls}')
+                lines.append(f'{metric}_sum{{op="{name}"}} {entry["sum"]!r}')
+                lines.append(f'{metric}_count{{op="{name}"}} {entry["count"]}')
+            metric = f"{PREFIX}_errors_total"
+            lines.append(f"# TYPE {metric} counter")
+            for name, entry in snapshot["histograms"].items():
+                lines.append(f'{metric}{{op="{name}"}} {entry["errors"]}')
+        return "".join(line + "\n" for line in lines)
+
+
+def _from_environment() -> bool:
+    """Return whether ``MARGIN_CALC_PROFILE`` enables profiling."""
+    return os.environ.get(ENV_VAR, "").strip() not in ("", "0")
+
+
+METRICS = Metrics(enabled=_from_environment())
+
+
+class InstrumentedCalculator:
+    """Calculator functions timed in :data:`METRICS`.
+
+    Calls are forwarded to ``cache`` or, without one, to the :mod:`calculator`
+    module, and recorded under the function name.
+    """
+
+    def __init__(
+        self, cache: Optional[CalculatorCache] = None, metrics: Metrics = METRICS
+    ):
+        self.cache = cache
+        self.metrics = metrics
+        self._calc = calculator if cache is None else cache
+
+    def __reduce__(self):
+        # Worker processes record into their own global registry, which
+        # streaming merges back into the parent one.
+        return InstrumentedCalculator, (self.cache,)
+
+    def licz_marze_z_ceny(self, tkw: Decimal, cena: Decimal) -> Decimal:
+        """Timed :func:`calculator.licz_marze_z_ceny`."""
+        with self.metrics.timer("licz_marze_z_ceny"):
+            return self._calc.licz_marze_z_ceny(tkw, cena)
+
+    def cena_z_marzy(self, tkw: Decimal, marza: Decimal) -> Decimal:
+        """Timed :func:`calculator.cena_z_marzy`."""
+        with self.metrics.timer("cena_z_marzy"):
+            return self._calc.cena_z_marzy(tkw, marza)
@@ -0,0 +1,275 @@
+"""Profit-maximizing prices under price-elastic demand.
+
+:func:`cena_z_marzy` maps a target margin to a price. :func:`optymalna_cena`
+instead finds, for every SKU of a catalog, the price maximizing the total
+profit ``(cena - tkw) * ilosc(cena)`` for a demand curve through the current
+price and quantity:
+
+``"constant"``
+    Constant elasticity, ``ilosc(p) = ilosc * (p / cena) ** -e``. The
+    optimum is finite only for ``e > 1``; otherwise profit keeps growing with
+    the price and only ``cena_max`` bounds it. A cost that is not positive
+    makes the profit grow as the price falls to zero instead.
+``"linear"``
+    Linear demand with the elasticity ``e`` at the current price,
+    ``ilosc(p) = ilosc * (1 - e * (p / cena - 1))``, falling to zero at the
+    choke price ``cena * (1 + 1 / e)``.
+
+Both profit curves rise up to their optimum and fall after it, so the
+optimum under the constraints ``marza_min``, ``cena_min`` and ``cena_max`` is
+the unconstrained one moved to the nearest feasible price. All rows are
+solved together by a safeguarded Newton iteration on the sign of the
+marginal profit: Newton steps leaving the bracket of a row are replaced by
+bisection, and every row stops once its step or bracket is small enough, so
+the number of iterations and the convergence are reported per row.
+"""
+
+import csv
+from typing import IO, NamedTuple, Optional, Union
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+try:  # Prefer relative import when installed as a package
+    from .utils import _to_decimal_column
+except ImportError:  # Fallback for running as a standalone script
+    from utils import _to_decimal_column
+
+MODELS = ("constant", "linear")
+INPUT_COLUMNS = ("tkw", "cena", "ilosc", "elastycznosc")
+BOUND_COLUMNS = ("marza_min", "cena_min", "cena_max")
+MODEL_COLUMN = "model"
+DEFAULT_TOLERANCE = 1e-10
+DEFAULT_MAX_ITER = 100
+# Doublings of the upper end of the bracket searched for an unbounded row.
+_MAX_EXPANSIONS = 64
+
+
+class OptimumResult(NamedTuple):
+    """Result of :func:`optymalna_cena`.
+
+    ``cena``, ``marza``, ``ilosc`` and ``zysk`` are the optimal price, its
+    margin and the demand and total profit at that price; they are ``NaN``
+    for rows that did not converge. ``ograniczona`` marks rows whose optimum
+    is set by a constraint and ``iteracje`` counts the solver iterations of
+    every row.
+    """
+
+    cena: np.ndarray
+    marza: np.ndarray
+    ilosc: np.ndarray
+    zysk: np.ndarray
+    zbiezne: np.ndarray
+    ograniczona: np.ndarray
+    iteracje: np.ndarray
+
+
+def _bound(value: Optional[ArrayLike], shape: tuple, default: float) -> np.ndarray:
+    """Return a constraint as an array with ``None`` and ``NaN`` as ``default``."""
+    if value is None:
+        return np.full(shape, default)
+    array = np.broadcast_to(np.asarray(value, dtype=np.float64), shape)
+    return np.where(np.isnan(array), default, array)
+
+
+def optymalna_cena(
+    tkw: ArrayLike,
+    cena: ArrayLike,
+    ilosc: ArrayLike,
+    elastycznosc: ArrayLike,
+    *,
+    model: Union[str, ArrayLike] = "constant",
+    marza_min: Optional[ArrayLike] = None,
+    cena_min: Optional[ArrayLike] = None,
+    cena_max: Optional[ArrayLike] = None,
+    tol: float = DEFAULT_TOLERANCE,
+    max_iter: int = DEFAULT_MAX_ITER,
+) -> OptimumResult:
+    """Return the profit-maximizing price of every row.
+
+    Parameters
+    ----------
+    tkw : array_like
+        Unit production cost.
+    cena, ilosc : array_like
+        Current price and the quantity sold at it, the reference point of
+        the demand curve.
+    elastycznosc : array_like
+        Price elasticity of demand at the current price as a positive
+        number: ``2`` means a 1% price cut sells 2% more.
+    model : str or array_like of str
+        Demand curve of every row, one of ``MODELS``.
+    marza_min, cena_min, cena_max : array_like, optional
+        Lowest margin (a fraction), lowest and highest price. ``NaN`` leaves
+        a row unconstrained.
+    tol : float
+        Relative width of the bracket at which a row has converged.
+    max_iter : int
+        Iterations after which the remaining rows are reported as not
+        converged.
+
+    Returns
+    -------
+    OptimumResult
+        Arrays with the broadcast shape of the inputs. Rows with invalid
+        input (a price or elasticity that is not positive, a negative
+        quantity), infeasible constraints or an unbounded optimum are not
+        converged. Under constant elasticity the optimum is unbounded below
+        for a cost that is not positive, so such rows converge only with a
+        positive ``cena_min``; a margin bound allows any positive price there.
+
+    Examples
+    --------
+    >>> wynik = optymalna_cena([60, 60], [100, 100], [1000, 1000], [3, 3],
+    ...                        model=["constant", "linear"])
+    >>> wynik.cena.round(2), wynik.zbiezne
+    (array([90.  , 96.67]), array([ True,  True]))
+    >>> optymalna_cena(60, 100, 1000, 3, marza_min=0.5).cena
+    array(120.)
+    """
+    arrays = np.broadcast_arrays(
+        *(np.asarray(v, dtype=np.float64) for v in (tkw, cena, ilosc, elastycznosc))
+    )
+    shape = arrays[0].shape
+    c, p0, q0, e = (array.reshape(-1) for array in arrays)
+    models = np.broadcast_to(np.asarray(model, dtype=str), shape).reshape(-1)
+    unknown = set(np.unique(models).tolist()) - set(MODELS)
+    if unknown:
+        raise ValueError(f"unknown demand model: {', '.join(sorted(unknown))}")
+    linear = models == "linear"
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        m_min = _bound(marza_min, shape, -np.inf).reshape(-1)
+        lo = np.where(m_min < 1, c / (1 - m_min), np.inf)
+        lo = np.fmax(lo, _bound(cena_min, shape, 0).reshape(-1))
+        hi = _bound(cena_max, shape, np.inf).reshape(-1)
+        choke = p0 * (1 + 1 / e)
+    valid = (
+        (p0 > 0) & (q0 >= 0) & (e > 0) & np.isfinite(c) & np.isfinite(lo) & (lo <= hi)
+    )
+    # Under constant elasticity a free product earns the most at a price
+    # approaching zero, so it has an optimum only above a positive bound.
+    valid &= linear | (c > 0) | (lo > 0)
+    # The optimum lies above the cost: the marginal profit is positive there.
+    start = np.where(valid, np.fmax(lo, np.fmax(c, 0)), np.nan)
+
+    def marginal(p: np.ndarray, rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Return a function with the sign of the marginal profit and its slope.
+
+        Constant elasticity uses the marginal profit divided by the demand,
+        ``1 - e + e * tkw / p``; linear demand the marginal profit divided by
+        the slope of the demand curve, ``choke - 2 * p + tkw``. Both have the
+        root of the marginal profit and decrease in ``p``.
+        """
+        lin, cost, elast = linear[rows], c[rows], e[rows]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            value = np.where(
+                lin, choke[rows] - 2 * p + cost, 1 - elast + elast * cost / p
+            )
+            slope = np.where(lin, -2.0, -elast * cost / (p * p))
+        return value, slope
+
+    cena_opt = np.full(c.shape, np.nan)
+    zbiezne = np.zeros(c.shape, dtype=bool)
+    ograniczona = np.zeros(c.shape, dtype=bool)
+    iteracje = np.zeros(c.shape, dtype=np.int64)
+
+    # Linear demand is zero beyond the choke price, so it bounds the search.
+    top = np.where(linear, np.fmin(hi, np.fmax(choke, start)), hi)
+    rows = np.flatnonzero(valid)
+    g_lo, _ = marginal(start[rows], rows)
+    at_lo = g_lo <= 0
+    cena_opt[rows[at_lo]] = start[rows[at_lo]]
+    ograniczona[rows[at_lo]] = start[rows[at_lo]] > np.fmax(c[rows[at_lo]], 0)
+    zbiezne[rows[at_lo]] = True
+    rows = rows[~at_lo]
+
+    # Find an upper end with a negative marginal profit for unbounded rows.
+    upper = top[rows].copy()
+    unbounded = ~np.isfinite(upper)
+    upper[unbounded] = 2 * np.fmax(start[rows[unbounded]], 1)
+    for _ in range(_MAX_EXPANSIONS):
+        if not unbounded.any():
+            break
+        g, _ = marginal(upper[unbounded], rows[unbounded])
+        still = g > 0
+        grow = np.flatnonzero(unbounded)[still]
+        upper[grow] *= 2
+        unbounded[np.flatnonzero(unbounded)[~still]] = False
+    rows, upper = rows[~unbounded], upper[~unbounded]
+    g_hi, _ = marginal(upper, rows)
+    at_hi = g_hi >= 0
+    cena_opt[rows[at_hi]] = upper[at_hi]
+    ograniczona[rows[at_hi]] = g_hi[at_hi] > 0
+    zbiezne[rows[at_hi]] = True
+    rows, b = rows[~at_hi], upper[~at_hi]
+
+    # Safeguarded Newton iteration on rows bracketed by a < root < b.
+    # The marginal profit functions are convex, so Newton steps from the lower
+    # end approach the root from below without overshooting it.
+    a = start[rows]
+    x = a.copy()
+    for _ in range(max_iter):
+        if not rows.size:
+            break
+        iteracje[rows] += 1
+        g, slope = marginal(x, rows)
+        a = np.where(g > 0, x, a)
+        b = np.where(g < 0, x, b)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = x - g / slope
+        scale = tol * np.fmax(np.abs(x), 1)
+        done = (g == 0) | (b - a <= scale) | (np.abs(step - x) <= scale)
+        cena_opt[rows[done]] = x[done]
+        zbiezne[rows[done]] = True
+        keep = ~done
+        rows, a, b, x, step = rows[keep], a[keep], b[keep], x[keep], step[keep]
+        x = np.where((step > a) & (step < b), step, (a + b) / 2)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ilosc_opt = np.where(
+            linear,
+            np.fmax(q0 * (1 - e * (cena_opt / p0 - 1)), 0),
+            q0 * (cena_opt / p0) ** -e,
+        )
+        marza = (cena_opt - c) / cena_opt
+    return OptimumResult(
+        cena=cena_opt.reshape(shape),
+        marza=marza.reshape(shape),
+        ilosc=ilosc_opt.reshape(shape),
+        zysk=((cena_opt - c) * ilosc_opt).reshape(shape),
+        zbiezne=zbiezne.reshape(shape),
+        ograniczona=ograniczona.reshape(shape),
+        iteracje=iteracje.reshape(shape),
+    )
+
+
+def read_demand(source: IO[str], *, delimiter: str = ",") -> dict[str, np.ndarray]:
+    """Return the columns of a CSV catalog for :func:`optymalna_cena`.
+
+    ``INPUT_COLUMNS`` are required; ``BOUND_COLUMNS`` and ``MODEL_COLUMN``
+    are optional and blank cells leave a row unconstrained or use the
+    ``"constant"`` model. Numbers may use a decimal comma. Other columns,
+    such as an SKU, are returned as lists of strings.
+    """
+    reader = csv.reader(source, delimiter=delimiter)
+    header = [name.strip().lower() for name in next(reader, [])]
+    rows = [row for row in reader if row]
+    missing = [name for name in INPUT_COLUMNS if name not in header]
+    if missing:
+        raise ValueError(f"missing column: {', '.join(missing)}")
+    columns: dict = {}
+    for index, name in enumerate(header):
+        cells = [row[index].strip() if index < len(row) else "" for row in rows]
+        if name == MODEL_COLUMN:
+            columns[name] = np.array([cell or "constant" for cell in cells])
+        elif name in INPUT_COLUMNS or name in BOUND_COLUMNS:
+            values, valid = _to_decimal_column(cells, none_on_error=True)
+            if not valid.all():
+                raise ValueError(f"invalid {name}: {cells[int(np.argmin(valid))]!r}")
+            if name in BOUND_COLUMNS:
+                values[[not cell for cell in cells]] = np.nan
+            columns[name] = values
+        else:
+            columns[name] = cells
+    return columns
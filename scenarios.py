@@ -0,0 +1,134 @@
+"""Sensitivity grids of the break-even analysis.
+
+:func:`siatka_obnizki` evaluates the question of the "discount" tab -- how
+many extra units are needed after a price cut -- for a whole range of new
+prices or margins at once, optionally combined with a range of relative
+changes of the unit cost. The grid is computed by broadcasting a column of
+new prices or margins against a row of unit costs, so a 1000 x 1000 grid
+takes a few array operations instead of a million scalar calculations.
+"""
+
+from decimal import Decimal
+from typing import NamedTuple, Optional, Union
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+try:  # Prefer relative import when installed as a package
+    from .batch import _cena_i_marza_batch, cena_z_marzy_batch, licz_marze_z_ceny_batch
+    from .discount import ERR_FILL, ERR_PAIR_NEW, ERR_PAIR_OLD, DiscountError
+except ImportError:  # Fallback for running as a standalone script
+    from batch import _cena_i_marza_batch, cena_z_marzy_batch, licz_marze_z_ceny_batch
+    from discount import ERR_FILL, ERR_PAIR_NEW, ERR_PAIR_OLD, DiscountError
+
+Number = Union[Decimal, float, int]
+
+
+class ScenarioGrid(NamedTuple):
+    """Result of :func:`siatka_obnizki`.
+
+    Rows follow the swept new prices or margins and columns the unit costs in
+    ``tkw_nowe``. ``ilosc_dodatkowa`` and ``ilosc_nowych`` are ``NaN`` where
+    the new unit profit is not positive.
+    """
+
+    tkw_nowe: np.ndarray
+    cena_nowa: np.ndarray
+    marza_nowa: np.ndarray
+    zysk_nowy: np.ndarray
+    strata: np.ndarray
+    ilosc_dodatkowa: np.ndarray
+    ilosc_nowych: np.ndarray
+
+
+def _optional(value: Optional[Number]) -> float:
+    """Return ``value`` as ``float`` with ``None`` mapped to ``NaN``."""
+    return np.nan if value is None else float(value)
+
+
+def siatka_obnizki(
+    tkw: Optional[Number],
+    ilosc_stara: Optional[Number],
+    *,
+    cena_stara: Optional[Number] = None,
+    marza_stara: Optional[Number] = None,
+    cena_nowa: Optional[ArrayLike] = None,
+    marza_nowa: Optional[ArrayLike] = None,
+    zmiana_tkw: ArrayLike = 0.0,
+) -> ScenarioGrid:
+    """Return the break-even analysis for a grid of price-drop scenarios.
+
+    Parameters
+    ----------
+    tkw : Decimal or float
+        Current unit production cost.
+    ilosc_stara : Decimal or float
+        Quantity sold at the old price.
+    cena_stara, marza_stara : Decimal or float, optional
+        Old price or old margin; a given margin takes precedence and the
+        derived price is rounded to ``0.01``.
+    cena_nowa, marza_nowa : array_like, optional
+        One-dimensional range of new prices or new margins forming the rows
+        of the grid. A given ``marza_nowa`` takes precedence.
+    zmiana_tkw : array_like
+        Relative changes of the unit cost after the price change forming the
+        columns of the grid, e.g. ``[-0.05, 0, 0.05]``. New prices derived
+        from margins use the changed cost.
+
+    Returns
+    -------
+    ScenarioGrid
+        New unit costs and ``(rows, columns)`` arrays of new prices, margins,
+        unit profits, total losses and extra and total quantities.
+
+    Raises
+    ------
+    DiscountError
+        When ``tkw`` or ``ilosc_stara`` is missing or when neither value of a
+        price/margin pair is given.
+
+    Examples
+    --------
+    >>> grid = siatka_obnizki(80, 100, cena_stara=120, cena_nowa=[100, 110],
+    ...                       zmiana_tkw=[0, -0.1])
+    >>> grid.ilosc_dodatkowa
+    array([[100.,  43.],
+           [ 33.,   5.]])
+    """
+    if tkw is None or ilosc_stara is None:
+        raise DiscountError(ERR_FILL)
+    tkw = float(tkw)
+    cena_s, _, brak_starej = _cena_i_marza_batch(
+        np.float64(tkw),
+        np.float64(_optional(cena_stara)),
+        np.float64(_optional(marza_stara)),
+    )
+    if brak_starej:
+        raise DiscountError(ERR_PAIR_OLD)
+    if cena_nowa is None and marza_nowa is None:
+        raise DiscountError(ERR_PAIR_NEW)
+
+    tkw_nowe = tkw * (1 + np.atleast_1d(np.asarray(zmiana_tkw, dtype=np.float64)))
+    if marza_nowa is not None:
+        marza = np.asarray(marza_nowa, dtype=np.float64).reshape(-1, 1)
+        cena = cena_z_marzy_batch(tkw_nowe, marza, engine="hybrid")
+        marza = np.broadcast_to(marza, cena.shape)
+    else:
+        cena = np.asarray(cena_nowa, dtype=np.float64).reshape(-1, 1)
+        marza = licz_marze_z_ceny_batch(tkw_nowe, cena)
+        cena = np.broadcast_to(cena, marza.shape)
+
+    zysk_nowy = cena - tkw_nowe
+    strata = (float(cena_s) - tkw - zysk_nowy) * float(ilosc_stara)
+    ilosc_dodatkowa = np.full(strata.shape, np.nan)
+    np.divide(strata, zysk_nowy, out=ilosc_dodatkowa, where=zysk_nowy > 0)
+    np.rint(ilosc_dodatkowa, out=ilosc_dodatkowa)
+    return ScenarioGrid(
+        tkw_nowe=tkw_nowe,
+        cena_nowa=cena,
+        marza_nowa=marza,
+        zysk_nowy=zysk_nowy,
+        strata=strata,
+        ilosc_dodatkowa=ilosc_dodatkowa,
+        ilosc_nowych=ilosc_dodatkowa + float(ilosc_stara),
+    )
@@ -0,0 +1,222 @@
+"""Local JSON-over-HTTP server exposing the calculator functions.
+
+Every endpoint accepts ``POST`` requests whose body is either a single JSON
+object or a list of objects. A list is answered with a list of results in the
+same order; items that cannot be calculated yield ``{"error": message}``
+without affecting the others. Numbers may be sent as JSON numbers or strings
+and results are returned as strings so that no precision is lost.
+
+``POST /marza``
+    ``{"tkw": ..., "cena": ...}`` -> ``{"marza": ...}``
+``POST /cena``
+    ``{"tkw": ..., "marza": ...}`` -> ``{"cena": ...}``
+``POST /obnizka``
+    Arguments of :func:`discount.oblicz_obnizke` -> its result fields.
+``GET /health``
+    ``{"status": "ok"}``, plus hit, miss and eviction counts when the server
+    uses a :class:`cache.CalculatorCache`
+``GET /metrics``, ``GET /metrics.json``
+    Request and calculator latencies collected in :data:`metrics.METRICS` in
+    the Prometheus text format or as JSON; only while profiling is enabled
+
+Requests are served by one thread per connection and connections are kept
+alive, so a single process handles hundreds of requests per second.
+"""
+
+import json
+from dataclasses import asdict
+from decimal import Decimal
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import ModuleType
+from typing import Callable, Optional, Union
+
+try:  # Prefer relative import when installed as a package
+    from . import calculator
+    from .cache import CalculatorCache
+    from .discount import DiscountError, oblicz_obnizke
+    from .metrics import METRICS, InstrumentedCalculator
+    from .utils import _decimal_field
+except ImportError:  # Fallback for running as a standalone script
+    import calculator
+    from cache import CalculatorCache
+    from discount import DiscountError, oblicz_obnizke
+    from metrics import METRICS, InstrumentedCalculator
+    from utils import _decimal_field
+
+# The ``calculator`` module or a :class:`cache.CalculatorCache` or
+# :class:`metrics.InstrumentedCalculator` in its place.
+Calculator = Union[ModuleType, CalculatorCache, InstrumentedCalculator]
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+
+def _required(item: dict, name: str) -> Decimal:
+    """Return the ``Decimal`` value of ``item[name]`` or raise ``ValueError``."""
+    value = _decimal_field(item, name)
+    if value is None:
+        raise ValueError(f"missing {name}")
+    return value
+
+
+def _marza(item: dict, calc: Calculator) -> dict:
+    """Endpoint wrapping :func:`calculator.licz_marze_z_ceny`."""
+    marza = calc.licz_marze_z_ceny(_required(item, "tkw"), _required(item, "cena"))
+    return {"marza": str(marza)}
+
+
+def _cena(item: dict, calc: Calculator) -> dict:
+    """Endpoint wrapping :func:`calculator.cena_z_marzy`."""
+    cena = calc.cena_z_marzy(_required(item, "tkw"), _required(item, "marza"))
+    return {"cena": str(cena)}
+
+
+def _obnizka(item: dict, _calc: Calculator) -> dict:
+    """Endpoint wrapping :func:`discount.oblicz_obnizke`.
+
+    Failures are reported with the :class:`discount.DiscountError` code.
+    """
+    try:
+        wynik = oblicz_obnizke(
+            _decimal_field(item, "tkw"),
+            _decimal_field(item, "ilosc_stara"),
+            cena_stara=_decimal_field(item, "cena_stara"),
+            marza_stara=_decimal_field(item, "marza_stara"),
+            cena_nowa=_decimal_field(item, "cena_nowa"),
+            marza_nowa=_decimal_field(item, "marza_nowa"),
+        )
+    except DiscountError as exc:
+        raise ValueError(exc.code) from exc
+    return {
+        name: value if isinstance(value, int) else str(value)
+        for name, value in vars(wynik).items()
+    }
+
+
+ENDPOINTS: dict[str, Callable[[dict, Calculator], dict]] = {
+    "/marza": _marza,
+    "/cena": _cena,
+    "/obnizka": _obnizka,
+}
+
+
+def handle_item(
+    endpoint: Callable[[dict, Calculator], dict], item, calc: Calculator = calculator
+) -> dict:
+    """Return the result of ``endpoint`` for ``item`` or an error object."""
+    if not isinstance(item, dict):
+        return {"error": "item is not a JSON object"}
+    try:
+        return endpoint(item, calc)
+    except (ValueError, ArithmeticError) as exc:
+        return {"error": str(exc) or type(exc).__name__}
+
+
+class CalculatorHandler(BaseHTTPRequestHandler):
+    """Request handler dispatching JSON bodies to ``ENDPOINTS``."""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without TCP_NODELAY every
+    # keep-alive response would stall on the peer's delayed ACK.
+    disable_nagle_algorithm = True
+    quiet = True
+    cache: Optional[CalculatorCache] = None
+
+    def _send_json(self, status: HTTPStatus, payload) -> None:
+        body = json.dumps(payload, ensure_ascii=False)
+        self._send(status, body, "application/json; charset=utf-8")
+
+    def _send(self, status: HTTPStatus, text: str, content_type: str) -> None:
+        body = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        """Answer health checks and, while profiling, metrics scrapes."""
+        if self.path == "/health":
+            status = {"status": "ok"}
+            if self.cache is not None:
+                status["cache"] = {**asdict(self.cache.stats), "size": len(self.cache)}
+            self._send_json(HTTPStatus.OK, status)
+        elif self.path == "/metrics" and METRICS.enabled:
+            text = METRICS.to_prometheus()
+            self._send(HTTPStatus.OK, text, "text/plain; version=0.0.4; charset=utf-8")
+        elif self.path == "/metrics.json" and METRICS.enabled:
+            self._send_json(HTTPStatus.OK, METRICS.snapshot())
+        else:
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "not found"})
+
+    def do_POST(self) -> None:  # pylint: disable=invalid-name
+        """Calculate a single item or a list of items."""
+        endpoint = ENDPOINTS.get(self.path)
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = True
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": "invalid Content-Length"})
+            return
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            self._send_json(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "too large"})
+            return
+        body = self.rfile.read(length)
+        if endpoint is None:
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "not found"})
+            return
+        try:
+            payload = json.loads(body)
+        except ValueError as exc:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": f"invalid JSON: {exc}"})
+            return
+        calc = calculator if self.cache is None else self.cache
+        if METRICS.enabled:
+            calc = InstrumentedCalculator(self.cache)
+        with METRICS.timer(f"http{self.path.replace('/', '_')}"):
+            if isinstance(payload, list):
+                result = [handle_item(endpoint, item, calc) for item in payload]
+            else:
+                result = handle_item(endpoint, payload, calc)
+        self._send_json(HTTPStatus.OK, result)
+
+    def log_message(self, format, *args) -> None:  # pylint: disable=redefined-builtin
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+def make_server(
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    *,
+    quiet: bool = True,
+    cache: Optional[CalculatorCache] = None,
+) -> ThreadingHTTPServer:
+    """Return a server bound to ``host``/``port``; ``0`` picks a free port.
+
+    ``/marza`` and ``/cena`` are answered through ``cache`` when one is given
+    and ``/health`` then reports its statistics.
+    """
+    attrs = {"quiet": quiet, "cache": cache}
+    handler = type("Handler", (CalculatorHandler,), attrs)
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def serve(
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    *,
+    quiet: bool = True,
+    cache: Optional[CalculatorCache] = None,
+) -> None:
+    """Serve requests until interrupted."""
+    with make_server(host, port, quiet=quiet, cache=cache) as server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
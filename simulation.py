@@ -0,0 +1,254 @@
+"""Monte Carlo risk analysis of a price cut.
+
+:func:`oblicz_obnizke` answers the break-even question for known values.
+:func:`symuluj_obnizke` treats the unit cost, the new price and the demand
+uplift -- the relative increase in volume after the cut -- as random
+variables described by :class:`Distribution` and estimates
+
+* the probability that the cut breaks even, i.e. that the total profit at
+  the new price and volume is at least the profit at the old price, and
+* percentiles of the total loss ``zysk_stary - zysk_nowy`` (negative values
+  are gains).
+
+Draws are evaluated in vectorized chunks, so memory does not grow with the
+number of draws, and the chunks can be spread over a process pool. Every
+chunk has its own random stream spawned from one ``numpy.random.SeedSequence``,
+so a given ``seed`` yields the same result for any number of workers.
+"""
+
+import math
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import NamedTuple, Optional, Sequence, Union
+
+import numpy as np
+
+try:  # Prefer relative import when installed as a package
+    from .batch import cena_z_marzy_hybrid
+    from .discount import ERR_FILL, ERR_PAIR_NEW, ERR_PAIR_OLD, DiscountError
+except ImportError:  # Fallback for running as a standalone script
+    from batch import cena_z_marzy_hybrid
+    from discount import ERR_FILL, ERR_PAIR_NEW, ERR_PAIR_OLD, DiscountError
+
+DISTRIBUTIONS = {"const": 1, "normal": 2, "uniform": 2, "triangular": 3}
+DEFAULT_DRAWS = 1_000_000
+DEFAULT_CHUNK_SIZE = 100_000
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+# Draws kept for the percentiles; larger simulations keep a uniform subsample.
+MAX_SAMPLES = 1_000_000
+
+
+@dataclass(frozen=True)
+class Distribution:
+    """Distribution of a simulated input.
+
+    ``kind`` is one of ``DISTRIBUTIONS`` with the parameters
+
+    * ``"const"``: ``(value,)``
+    * ``"normal"``: ``(mean, standard_deviation)``
+    * ``"uniform"``: ``(low, high)``
+    * ``"triangular"``: ``(low, mode, high)``
+
+    Examples
+    --------
+    >>> Distribution("uniform", (0.1, 0.3)).mean
+    0.2
+    """
+
+    kind: str
+    params: tuple[float, ...]
+
+    def __post_init__(self) -> None:
+        if self.kind not in DISTRIBUTIONS:
+            raise ValueError(f"unknown distribution: {self.kind}")
+        if len(self.params) != DISTRIBUTIONS[self.kind]:
+            raise ValueError(f"{self.kind} takes {DISTRIBUTIONS[self.kind]} parameters")
+        if not all(math.isfinite(p) for p in self.params):
+            raise ValueError("distribution parameters must be finite")
+        if self.kind == "normal" and self.params[1] < 0:
+            raise ValueError("standard deviation must not be negative")
+        if self.kind in ("uniform", "triangular") and list(self.params) != sorted(
+            self.params
+        ):
+            raise ValueError(f"{self.kind} parameters must be in ascending order")
+
+    @property
+    def mean(self) -> float:
+        """Expected value of the distribution."""
+        if self.kind == "normal":
+            return self.params[0]
+        return sum(self.params) / len(self.params)
+
+    def sample(self, rng: np.random.Generator, size: int) -> np.ndarray:
+        """Return ``size`` draws from the distribution."""
+        if self.kind == "const":
+            return np.full(size, self.params[0])
+        if self.kind == "normal":
+            return rng.normal(*self.params, size)
+        if self.kind == "uniform":
+            return rng.uniform(*self.params, size)
+        low, mode, high = self.params
+        if low == high:
+            return np.full(size, low)
+        return rng.triangular(low, mode, high, size)
+
+
+Input = Union[Distribution, float]
+
+
+def _distribution(value: Input) -> Distribution:
+    """Return ``value`` as a distribution; numbers are constants."""
+    if isinstance(value, Distribution):
+        return value
+    return Distribution("const", (float(value),))
+
+
+class SimulationResult(NamedTuple):
+    """Result of :func:`symuluj_obnizke`.
+
+    ``percentyle_straty`` maps the requested percentiles to the total loss;
+    a negative loss is a gain.
+    """
+
+    proby: int
+    prawdopodobienstwo: float
+    strata_srednia: float
+    percentyle_straty: dict[float, float]
+
+
+class _Spec(NamedTuple):
+    """Inputs of one simulation shared by all chunks."""
+
+    tkw: Distribution
+    cena_nowa: Distribution
+    wzrost: Distribution
+    ilosc_stara: float
+    cena_stara: float
+
+
+def _chunk(
+    spec: _Spec, seed: np.random.SeedSequence, size: int, keep: int
+) -> tuple[int, float, np.ndarray]:
+    """Simulate ``size`` draws.
+
+    Returns the number of draws breaking even, the sum of the losses and
+    the losses of the first ``keep`` draws.
+    """
+    rng = np.random.default_rng(seed)
+    tkw = spec.tkw.sample(rng, size)
+    zysk_stary = (spec.cena_stara - tkw) * spec.ilosc_stara
+    ilosc_nowa = spec.wzrost.sample(rng, size)
+    ilosc_nowa += 1
+    ilosc_nowa *= spec.ilosc_stara
+    strata = spec.cena_nowa.sample(rng, size)
+    strata -= tkw
+    strata *= ilosc_nowa
+    np.subtract(zysk_stary, strata, out=strata)
+    return int(np.count_nonzero(strata <= 0)), float(strata.sum()), strata[:keep]
+
+
+def symuluj_obnizke(
+    tkw: Optional[Input],
+    ilosc_stara: Optional[float],
+    *,
+    cena_stara: Optional[float] = None,
+    marza_stara: Optional[float] = None,
+    cena_nowa: Optional[Input] = None,
+    wzrost_sprzedazy: Input = 0.0,
+    proby: int = DEFAULT_DRAWS,
+    seed: int = 0,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    workers: int = 1,
+    percentyle: Sequence[float] = DEFAULT_PERCENTILES,
+) -> SimulationResult:
+    """Estimate the break-even probability and loss percentiles of a price cut.
+
+    Parameters
+    ----------
+    tkw : Distribution or float
+        Unit production cost, the same before and after the cut.
+    ilosc_stara : float
+        Quantity sold at the old price.
+    cena_stara, marza_stara : float, optional
+        Old price or old margin; a given margin takes precedence and the
+        price is derived from the mean of ``tkw`` and rounded to ``0.01``.
+    cena_nowa : Distribution or float
+        New price.
+    wzrost_sprzedazy : Distribution or float
+        Relative increase of the quantity sold at the new price, e.g.
+        ``Distribution("triangular", (0.1, 0.2, 0.4))``.
+    proby : int
+        Number of draws.
+    seed : int
+        Seed of the random streams; equal seeds give equal results.
+    chunk_size : int
+        Draws evaluated at once, bounding the memory used per worker.
+    workers : int
+        Number of worker processes; ``1`` evaluates the chunks in this
+        process.
+    percentyle : sequence of float
+        Percentiles of the total loss to report, between 0 and 100.
+
+    Returns
+    -------
+    SimulationResult
+        The number of draws, the fraction of draws breaking even, the mean
+        loss and the requested loss percentiles. Percentiles of more than
+        ``MAX_SAMPLES`` draws are estimated from a uniform subsample.
+
+    Raises
+    ------
+    DiscountError
+        When ``tkw`` or ``ilosc_stara`` is missing or when neither value of
+        the old pair or no new price is given.
+
+    Examples
+    --------
+    >>> wynik = symuluj_obnizke(80, 100, cena_stara=120, cena_nowa=100,
+    ...                         wzrost_sprzedazy=Distribution("uniform", (0, 2)),
+    ...                         proby=10_000)
+    >>> round(wynik.prawdopodobienstwo, 1)
+    0.5
+    >>> wynik.percentyle_straty[5] < 0 < wynik.percentyle_straty[95]
+    True
+    """
+    if tkw is None or ilosc_stara is None:
+        raise DiscountError(ERR_FILL)
+    tkw = _distribution(tkw)
+    if marza_stara is not None:
+        cena_stara = float(cena_z_marzy_hybrid(tkw.mean, marza_stara).values)
+    if cena_stara is None:
+        raise DiscountError(ERR_PAIR_OLD)
+    if cena_nowa is None:
+        raise DiscountError(ERR_PAIR_NEW)
+    if proby < 1 or chunk_size < 1 or workers < 1:
+        raise ValueError("proby, chunk_size and workers must be positive")
+    spec = _Spec(
+        tkw=tkw,
+        cena_nowa=_distribution(cena_nowa),
+        wzrost=_distribution(wzrost_sprzedazy),
+        ilosc_stara=float(ilosc_stara),
+        cena_stara=float(cena_stara),
+    )
+
+    sizes = [min(chunk_size, proby - start) for start in range(0, proby, chunk_size)]
+    keeps = [min(size, math.ceil(MAX_SAMPLES * size / proby)) for size in sizes]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    evaluate = partial(_chunk, spec)
+    if workers == 1 or len(sizes) == 1:
+        results = list(map(evaluate, seeds, sizes, keeps))
+    else:
+        with ProcessPoolExecutor(min(workers, len(sizes))) as pool:
+            results = list(pool.map(evaluate, seeds, sizes, keeps))
+
+    oplacalne = sum(result[0] for result in results)
+    suma = math.fsum(result[1] for result in results)
+    probka = np.concatenate([result[2] for result in results])
+    wartosci = np.percentile(probka, percentyle) if len(percentyle) else []
+    return SimulationResult(
+        proby=proby,
+        prawdopodobienstwo=oplacalne / proby,
+        strata_srednia=suma / proby,
+        percentyle_straty=dict(zip(map(float, percentyle), map(float, wartosci))),
+    )
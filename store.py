@@ -0,0 +1,400 @@
+"""Columnar on-disk catalog store read through memory maps.
+
+A store is a directory holding one raw little-endian file per column and a
+``meta.json`` file describing them::
+
+    catalog/
+        meta.json     {"version": 1, "rows": N, "import": ID, "columns": {...}}
+        sku.bin       fixed-width UTF-8 bytes (NumPy ``S<width>``)
+        tkw.bin       float64
+        cena.bin      float64
+        ...
+
+Numeric columns are ``float64`` with ``NaN`` for blank or unparsable cells.
+``import`` is a random identifier of the import or update that last wrote
+the store, so derived data such as the margin index of :mod:`index` can tell
+that the catalog changed. :func:`update_store` applies changed rows by SKU.
+:func:`import_csv` converts a CSV file once, chunk by chunk, so arbitrarily
+large inputs are imported with bounded memory. :func:`open_store` only reads
+``meta.json`` and maps the column files, so reopening a catalog takes
+milliseconds regardless of its size and the columns can be passed to the
+functions of :mod:`batch` without copying.
+"""
+
+import csv
+import itertools
+import json
+import math
+import os
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Iterator, Optional, Union
+
+import numpy as np
+
+try:  # Prefer relative import when installed as a package
+    from .batch import (
+        ENGINES,
+        _fixed_rejected,
+        cena_z_marzy_batch,
+        cena_z_marzy_hybrid,
+        licz_marze_z_ceny_batch,
+        licz_marze_z_ceny_hybrid,
+    )
+    from .fixed import GROSZE_SCALE, MARGIN_SCALE, MAX_GROSZE, MIN_MARGIN
+    from .streaming import ERROR_COLUMN, BatchSummary
+    from .utils import _to_decimal_column
+except ImportError:  # Fallback for running as a standalone script
+    from batch import (
+        ENGINES,
+        _fixed_rejected,
+        cena_z_marzy_batch,
+        cena_z_marzy_hybrid,
+        licz_marze_z_ceny_batch,
+        licz_marze_z_ceny_hybrid,
+    )
+    from fixed import GROSZE_SCALE, MARGIN_SCALE, MAX_GROSZE, MIN_MARGIN
+    from streaming import ERROR_COLUMN, BatchSummary
+    from utils import _to_decimal_column
+
+STORE_VERSION = 1
+META_FILE = "meta.json"
+SKU_COLUMN = "sku"
+NUMERIC_COLUMNS = ("tkw", "cena", "marza", "ilosc")
+FLOAT_DTYPE = "<f8"
+DEFAULT_CHUNK_SIZE = 100_000
+# The other column of the price/margin pair.
+_PAIRS = {"cena": "marza", "marza": "cena"}
+
+PathLike = Union[str, os.PathLike]
+
+
+@dataclass
+class ImportSummary:
+    """Number of imported rows and of unparsable cells per column."""
+
+    rows: int = 0
+    invalid: dict[str, int] = field(default_factory=dict)
+
+
+def _column_file(path: Path, name: str) -> Path:
+    """Return the file holding column ``name`` of the store at ``path``."""
+    return path / f"{name}.bin"
+
+
+def _blank_mask(cells: list[str]) -> np.ndarray:
+    """Return a mask of cells that are empty or contain only whitespace."""
+    return np.fromiter((not c or c.isspace() for c in cells), bool, len(cells))
+
+
+def _widen_sku(path: Path, chunks: list[tuple[int, int]]) -> int:
+    """Rewrite the SKU chunks of ``chunks`` (rows, width) to a common width."""
+    width = max((w for _, w in chunks), default=1)
+    source = _column_file(path, SKU_COLUMN)
+    if all(w == width for _, w in chunks):
+        return width
+    target = source.with_suffix(".tmp")
+    with open(source, "rb") as src, open(target, "wb") as dst:
+        for rows, w in chunks:
+            np.fromfile(src, dtype=f"S{w}", count=rows).astype(f"S{width}").tofile(dst)
+    os.replace(target, source)
+    return width
+
+
+def import_csv(
+    source: IO[str],
+    path: PathLike,
+    *,
+    delimiter: str = ",",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> ImportSummary:
+    """Import CSV rows from ``source`` into a new store at ``path``.
+
+    Column names are matched case-insensitively. ``SKU_COLUMN`` and those of
+    ``NUMERIC_COLUMNS`` that are present are stored; other columns are
+    skipped. Numbers may use a decimal comma. ``ValueError`` is raised when
+    the input has no numeric column.
+
+    ``meta.json`` is written last, so an interrupted import leaves no store
+    that :func:`open_store` would accept.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be positive")
+    reader = csv.reader(source, delimiter=delimiter)
+    header = [name.strip().lower() for name in next(reader, [])]
+    numeric = [name for name in NUMERIC_COLUMNS if name in header]
+    if not numeric:
+        raise ValueError(f"no column of {', '.join(NUMERIC_COLUMNS)} found")
+    has_sku = SKU_COLUMN in header
+    names = numeric + ([SKU_COLUMN] if has_sku else [])
+    indices = {name: header.index(name) for name in names}
+
+    store = Path(path)
+    store.mkdir(parents=True, exist_ok=True)
+    (store / META_FILE).unlink(missing_ok=True)
+    summary = ImportSummary(invalid=dict.fromkeys(numeric, 0))
+    sku_chunks: list[tuple[int, int]] = []
+    files = {name: open(_column_file(store, name), "wb") for name in indices}
+    try:
+        while True:
+            records = [r for r in itertools.islice(reader, chunk_size) if r]
+            if not records:
+                break
+            for name, index in indices.items():
+                cells = [r[index] if index < len(r) else "" for r in records]
+                if name == SKU_COLUMN:
+                    column = np.array([c.encode() for c in cells], dtype="S")
+                    sku_chunks.append((len(cells), column.dtype.itemsize))
+                else:
+                    column, valid = _to_decimal_column(cells, none_on_error=True)
+                    blank = _blank_mask(cells)
+                    column[blank] = np.nan
+                    summary.invalid[name] += int((~valid & ~blank).sum())
+                    column = column.astype(FLOAT_DTYPE, copy=False)
+                column.tofile(files[name])
+            summary.rows += len(records)
+    finally:
+        for fh in files.values():
+            fh.close()
+
+    columns = {name: {"dtype": FLOAT_DTYPE} for name in numeric}
+    if has_sku:
+        columns[SKU_COLUMN] = {"dtype": f"S{_widen_sku(store, sku_chunks)}"}
+    _write_meta(store, summary.rows, columns)
+    return summary
+
+
+def _write_meta(path: Path, rows: int, columns: dict[str, dict]) -> None:
+    """Write ``meta.json`` with a new import identifier."""
+    meta = {
+        "version": STORE_VERSION,
+        "rows": rows,
+        "import": uuid.uuid4().hex,
+        "columns": columns,
+    }
+    (path / META_FILE).write_text(json.dumps(meta, indent=2) + "\n", encoding="utf-8")
+
+
+class CatalogStore:
+    """Columns of a store opened by :func:`open_store`.
+
+    Columns are read-only ``numpy.memmap`` arrays indexed by name; only the
+    pages that are accessed are read from disk.
+    """
+
+    def __init__(self, path: Path, rows: int, columns: dict[str, np.ndarray]):
+        self.path = path
+        self.rows = rows
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.columns
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def chunks(self, size: int) -> Iterator[dict[str, np.ndarray]]:
+        """Yield consecutive slices of at most ``size`` rows of every column."""
+        for start in range(0, self.rows, size):
+            yield {
+                name: col[start : start + size] for name, col in self.columns.items()
+            }
+
+
+def open_store(path: PathLike) -> CatalogStore:
+    """Open the store at ``path`` by mapping its column files.
+
+    ``ValueError`` is raised when ``path`` does not contain a complete store
+    of a supported version.
+    """
+    store = Path(path)
+    try:
+        meta = json.loads((store / META_FILE).read_text(encoding="utf-8"))
+    except FileNotFoundError as exc:
+        raise ValueError(f"not a catalog store: {store}") from exc
+    if meta.get("version") != STORE_VERSION:
+        raise ValueError(f"unsupported store version: {meta.get('version')}")
+    rows = meta["rows"]
+    columns = {}
+    for name, spec in meta["columns"].items():
+        dtype = np.dtype(spec["dtype"])
+        if rows:
+            columns[name] = np.memmap(
+                _column_file(store, name), dtype=dtype, mode="r", shape=(rows,)
+            )
+        else:  # empty files cannot be mapped
+            columns[name] = np.empty(0, dtype=dtype)
+    return CatalogStore(store, rows, columns)
+
+
+def update_store(path: PathLike, changes: "CatalogStore") -> np.ndarray:
+    """Apply the rows of the store ``changes`` to the store at ``path``.
+
+    Rows are matched by SKU, so both stores need a SKU column; unknown SKUs
+    are appended and columns the store lacks are added. Blank cells of ``changes`` keep the stored value, and a
+    new price clears the stored margin of its row and vice versa, like the
+    updates of :mod:`incremental`. Returns the numbers of the changed rows
+    in the updated store, in the order of ``changes``.
+
+    Every column is rewritten to a temporary file and renamed, so stores
+    opened before the update keep reading the old values. ``meta.json`` is
+    written last with a new import identifier.
+    """
+    store = open_store(path)
+    if SKU_COLUMN not in store or SKU_COLUMN not in changes:
+        raise ValueError("store and changes need a sku column")
+    keys = changes[SKU_COLUMN].tolist()
+    if len(set(keys)) != len(keys):
+        raise ValueError("duplicate sku in changes")
+    positions = {key: row for row, key in enumerate(store[SKU_COLUMN].tolist())}
+    rows = np.array([positions.get(key, -1) for key in keys], dtype=np.int64)
+    new = rows < 0
+    rows[new] = store.rows + np.arange(np.count_nonzero(new))
+    size = store.rows + int(np.count_nonzero(new))
+
+    target = Path(path)
+    (target / META_FILE).unlink()
+    columns = {}
+    added = [name for name in changes.columns if name not in store]
+    for name in [*store.columns, *added]:
+        if name == SKU_COLUMN:
+            width = max(store[name].dtype.itemsize, changes[name].dtype.itemsize)
+            column = np.concatenate([store[name], changes[name][new]]).astype(
+                f"S{width}"
+            )
+            columns[name] = {"dtype": f"S{width}"}
+        else:
+            column = np.full(size, np.nan)
+            if name in store:
+                column[: store.rows] = store[name]
+            if name in changes:
+                given = ~np.isnan(changes[name])
+                column[rows[given]] = changes[name][given]
+            other = _PAIRS.get(name)
+            if other in changes:
+                cleared = ~np.isnan(changes[other])
+                if name in changes:
+                    cleared &= np.isnan(changes[name])
+                column[rows[cleared]] = np.nan
+            column = column.astype(FLOAT_DTYPE, copy=False)
+            columns[name] = {"dtype": FLOAT_DTYPE}
+        temporary = _column_file(target, name).with_suffix(".tmp")
+        column.tofile(temporary)
+        os.replace(temporary, _column_file(target, name))
+    _write_meta(target, size, columns)
+    return rows
+
+
+def calculate_chunk(
+    columns: dict[str, np.ndarray], engine: str = "float"
+) -> tuple[np.ndarray, np.ndarray, list[Optional[str]], int]:
+    """Return prices, margins and error messages for a chunk of columns.
+
+    Like ``cli.py batch``, every row needs ``tkw`` and exactly one of
+    ``cena`` or ``marza``. Rows that cannot be calculated get ``NaN`` results
+    and an error message, other rows ``None``. The last item is the number of
+    rows the ``"hybrid"`` engine recomputed with ``Decimal``.
+    """
+    tkw = columns["tkw"]
+    nan = np.full(len(tkw), np.nan)
+    cena = np.array(columns.get("cena", nan), dtype=np.float64)
+    marza = np.array(columns.get("marza", nan), dtype=np.float64)
+
+    ma_tkw = ~np.isnan(tkw)
+    ma_cene = ~np.isnan(cena)
+    ma_marze = ~np.isnan(marza)
+    z_ceny = ma_tkw & ma_cene & ~ma_marze
+    z_marzy = ma_tkw & ma_marze & ~ma_cene
+    errors: list[Optional[str]] = [None] * len(tkw)
+    if engine == "fixed":
+        # Rows the integer engine cannot evaluate exactly fail on their own.
+        checks = (
+            ("tkw", tkw, z_ceny | z_marzy, GROSZE_SCALE, -MAX_GROSZE, MAX_GROSZE),
+            ("cena", cena, z_ceny, GROSZE_SCALE, -MAX_GROSZE, MAX_GROSZE),
+            ("marza", np.minimum(marza, 1), z_marzy, MARGIN_SCALE, MIN_MARGIN, np.inf),
+        )
+        for name, values, rows, scale, low, high in checks:
+            rejected = rows & _fixed_rejected(values, scale, low, high)
+            for index in np.flatnonzero(rejected):
+                errors[index] = (
+                    errors[index] or f"{name} not representable in fixed point"
+                )
+            z_ceny &= ~rejected
+            z_marzy &= ~rejected
+    cena[~(z_ceny | z_marzy)] = np.nan
+    marza[~(z_ceny | z_marzy)] = np.nan
+    fallbacks = 0
+    if engine == "hybrid":
+        wynik = licz_marze_z_ceny_hybrid(tkw[z_ceny], cena[z_ceny])
+        marza[z_ceny] = wynik.values
+        fallbacks += int(wynik.fallback.sum())
+        wynik = cena_z_marzy_hybrid(tkw[z_marzy], marza[z_marzy])
+        cena[z_marzy] = wynik.values
+        fallbacks += int(wynik.fallback.sum())
+    else:
+        if z_ceny.any():
+            marza[z_ceny] = licz_marze_z_ceny_batch(
+                tkw[z_ceny], cena[z_ceny], engine=engine
+            )
+        if z_marzy.any():
+            cena[z_marzy] = cena_z_marzy_batch(
+                tkw[z_marzy], marza[z_marzy], engine=engine
+            )
+
+    for index in np.flatnonzero(~(z_ceny | z_marzy)):
+        errors[index] = errors[index] or (
+            "missing tkw" if not ma_tkw[index] else "provide either cena or marza"
+        )
+    return cena, marza, errors, fallbacks
+
+
+def _cell(value: float) -> str:
+    """Return ``value`` as CSV text with ``NaN`` as an empty cell."""
+    return "" if math.isnan(value) else repr(value)
+
+
+def calculate_store(
+    store: CatalogStore,
+    sink: IO[str],
+    *,
+    delimiter: str = ",",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    engine: str = "float",
+) -> BatchSummary:
+    """Calculate every row of ``store`` and write the results to ``sink``.
+
+    The output is CSV with the stored SKU, ``tkw``, ``cena``, ``marza`` and
+    ``error`` columns. Rows are processed in chunks of ``chunk_size`` so the
+    memory used for results does not depend on the size of the catalog.
+    ``BatchSummary.fallbacks`` counts the rows the ``"hybrid"`` engine
+    recomputed with ``Decimal``.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"unknown engine: {engine}")
+    if "tkw" not in store:
+        raise ValueError("store has no tkw column")
+    has_sku = SKU_COLUMN in store
+    writer = csv.writer(sink, delimiter=delimiter)
+    writer.writerow(
+        ([SKU_COLUMN] if has_sku else []) + ["tkw", "cena", "marza", ERROR_COLUMN]
+    )
+    summary = BatchSummary()
+    for chunk in store.chunks(chunk_size):
+        cena, marza, errors, fallbacks = calculate_chunk(chunk, engine)
+        columns = [
+            map(_cell, chunk["tkw"].tolist()),
+            map(_cell, cena.tolist()),
+            map(_cell, marza.tolist()),
+            (message or "" for message in errors),
+        ]
+        if has_sku:
+            columns.insert(0, (sku.decode() for sku in chunk[SKU_COLUMN].tolist()))
+        writer.writerows(zip(*columns))
+        summary.rows += len(errors)
+        summary.errors += len(errors) - errors.count(None)
+        summary.fallbacks += fallbacks
+    return summary
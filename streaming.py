@@ -0,0 +1,290 @@
+"""Streaming batch processing of CSV and JSON Lines input."""
+
+import csv
+import io
+import itertools
+import json
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import IO, Callable, Iterable, Iterator, Optional
+
+try:  # Prefer relative import when installed as a package
+    from .cache import CalculatorCache
+    from .calculator import cena_z_marzy, licz_marze_z_ceny
+    from .fixed import (
+        cena_z_marzy_gr,
+        do_groszy,
+        licz_marze_z_ceny_gr,
+        marza_do_int,
+        marza_z_int,
+        z_groszy,
+    )
+    from .metrics import METRICS
+    from .utils import _decimal_field
+except ImportError:  # Fallback for running as a standalone script
+    from cache import CalculatorCache
+    from calculator import cena_z_marzy, licz_marze_z_ceny
+    from fixed import (
+        cena_z_marzy_gr,
+        do_groszy,
+        licz_marze_z_ceny_gr,
+        marza_do_int,
+        marza_z_int,
+        z_groszy,
+    )
+    from metrics import METRICS
+    from utils import _decimal_field
+
+FORMATS = ("csv", "jsonl")
+ENGINES = ("decimal", "fixed")
+COLUMNS = ("tkw", "cena", "marza")
+ERROR_COLUMN = "error"
+DEFAULT_CHUNK_SIZE = 1000
+
+# Output text, number of rows and ``(line_number, message)`` of failed rows.
+_ChunkResult = tuple[str, int, list[tuple[int, str]]]
+
+
+@dataclass
+class BatchSummary:
+    """Number of processed and failed rows.
+
+    ``fallbacks`` counts the rows the ``"hybrid"`` engine of :mod:`batch`
+    recomputed with ``Decimal``.
+    """
+
+    rows: int = 0
+    errors: int = 0
+    fallbacks: int = 0
+
+
+def guess_format(path: str) -> str:
+    """Return the input format implied by the extension of ``path``."""
+    return "jsonl" if path.lower().endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def calculate_row(
+    row: dict, engine: str = "decimal", cache: Optional[CalculatorCache] = None
+) -> dict:
+    """Fill in the missing ``cena`` or ``marza`` of a single row.
+
+    The row must provide ``tkw`` and exactly one of ``cena`` or ``marza``.
+    A new dictionary with all three values converted to strings is returned;
+    other keys are passed through unchanged. ``ValueError`` or
+    ``ArithmeticError`` is raised for rows that cannot be calculated.
+
+    With ``engine="fixed"`` the row is evaluated by the integer engine of
+    :mod:`fixed`: prices are rounded to ``0.01`` and margins to six decimal
+    places, and values outside of its range are rejected. The ``"decimal"``
+    engine uses the memoized functions of ``cache`` when one is given.
+    """
+    tkw = _decimal_field(row, "tkw")
+    cena = _decimal_field(row, "cena")
+    marza = _decimal_field(row, "marza")
+    if tkw is None:
+        raise ValueError("missing tkw")
+    if (cena is None) == (marza is None):
+        raise ValueError("provide either cena or marza")
+    if engine == "fixed":
+        tkw_gr = do_groszy(tkw)
+        if cena is not None:
+            marza = marza_z_int(licz_marze_z_ceny_gr(tkw_gr, do_groszy(cena)))
+        else:
+            cena = z_groszy(cena_z_marzy_gr(tkw_gr, marza_do_int(marza)))
+    elif cena is not None:
+        calc = licz_marze_z_ceny if cache is None else cache.licz_marze_z_ceny
+        marza = calc(tkw, cena)
+    else:
+        calc = cena_z_marzy if cache is None else cache.cena_z_marzy
+        cena = calc(tkw, marza)
+    return {**row, "tkw": str(tkw), "cena": str(cena), "marza": str(marza)}
+
+
+def _process(
+    row: dict, engine: str, cache: Optional[CalculatorCache]
+) -> tuple[dict, Optional[str]]:
+    """Return the calculated row and an error message, if any."""
+    try:
+        return {**calculate_row(row, engine, cache), ERROR_COLUMN: ""}, None
+    except (ValueError, ArithmeticError) as exc:
+        message = str(exc) or type(exc).__name__
+        return {**row, ERROR_COLUMN: message}, message
+
+
+def _jsonl_chunk(
+    engine: str, cache: Optional[CalculatorCache], lines: list[tuple[int, str]]
+) -> _ChunkResult:
+    """Calculate a chunk of JSON Lines input.
+
+    Returns the output text and ``(line_number, message)`` pairs of the rows
+    that failed.
+    """
+    out, failed = [], []
+    for line_no, line in lines:
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            row, message = {}, f"invalid JSON: {exc}"
+        else:
+            message = None if isinstance(row, dict) else "row is not a JSON object"
+        if message is None:
+            result, message = _process(row, engine, cache)
+        else:
+            result = {ERROR_COLUMN: message}
+        out.append(json.dumps(result, ensure_ascii=False) + "\n")
+        if message is not None:
+            failed.append((line_no, message))
+    return "".join(out), len(lines), failed
+
+
+def _csv_chunk(
+    engine: str,
+    cache: Optional[CalculatorCache],
+    fieldnames: list[str],
+    out_fieldnames: list[str],
+    delimiter: str,
+    records: list[tuple[int, list[str]]],
+) -> _ChunkResult:
+    """Calculate a chunk of CSV records parsed by ``csv.reader``.
+
+    Records are mapped to dictionaries the same way ``csv.DictReader`` does.
+    """
+    buf = io.StringIO()
+    writer = csv.DictWriter(
+        buf, fieldnames=out_fieldnames, delimiter=delimiter, extrasaction="ignore"
+    )
+    failed = []
+    width = len(fieldnames)
+    for line_no, fields in records:
+        row = dict(zip(fieldnames, fields))
+        for name in fieldnames[len(fields) :]:
+            row[name] = None
+        if len(fields) > width:
+            row[None] = fields[width:]
+        result, message = _process(row, engine, cache)
+        writer.writerow(result)
+        if message is not None:
+            failed.append((line_no, message))
+    return buf.getvalue(), len(records), failed
+
+
+def _chunks(items: Iterable, size: int) -> Iterator[list]:
+    """Yield lists of up to ``size`` consecutive ``items``."""
+    iterator = iter(items)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+def _measured(
+    func: Callable[[list], _ChunkResult], profile: bool, chunk: list
+) -> tuple[_ChunkResult, Optional[dict]]:
+    """Return ``func(chunk)`` and, with ``profile``, the metrics it recorded.
+
+    Runs in a worker process, whose :data:`metrics.METRICS` is not the
+    registry of the parent process.
+    """
+    if not profile:
+        return func(chunk), None
+    METRICS.enable()
+    METRICS.reset()
+    return func(chunk), METRICS.snapshot()
+
+
+def _merged(future: Future) -> _ChunkResult:
+    """Return the result of :func:`_measured`, merging its metrics."""
+    result, snapshot = future.result()
+    if snapshot is not None:
+        METRICS.merge(snapshot)
+    return result
+
+
+def _ordered_map(
+    func: Callable[[list], _ChunkResult], chunks: Iterable[list], workers: int
+) -> Iterator[_ChunkResult]:
+    """Apply ``func`` to ``chunks`` and yield the results in input order.
+
+    With more than one worker the chunks are processed by a process pool and
+    the metrics the workers record while profiling are merged into
+    :data:`metrics.METRICS`. At most ``2 * workers`` chunks are in flight at
+    any time, which keeps the memory usage bounded for arbitrarily long input.
+    """
+    if workers <= 1:
+        yield from map(func, chunks)
+        return
+    task = partial(_measured, func, METRICS.enabled)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending: deque[Future] = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(task, chunk))
+            if len(pending) >= 2 * workers:
+                yield _merged(pending.popleft())
+        while pending:
+            yield _merged(pending.popleft())
+
+
+def _numbered_records(reader) -> Iterator[tuple[int, list[str]]]:
+    """Yield non-empty CSV records with the line number they end on."""
+    for fields in reader:
+        if fields:
+            yield reader.line_num, fields
+
+
+def process_stream(
+    source: IO[str],
+    sink: IO[str],
+    *,
+    fmt: str = "csv",
+    delimiter: str = ",",
+    errors: Optional[IO[str]] = None,
+    workers: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    engine: str = "decimal",
+    cache: Optional[CalculatorCache] = None,
+) -> BatchSummary:
+    """Calculate every row read from ``source`` and write it to ``sink``.
+
+    Input is processed in chunks of ``chunk_size`` rows so memory usage does
+    not depend on the input size. When ``workers`` is greater than ``1`` the
+    chunks are calculated in parallel by that many processes and written in
+    their original order. ``engine`` selects the arithmetic used for every
+    row, see :func:`calculate_row`, and ``cache`` memoizes the ``"decimal"``
+    engine; worker processes use a cache of their own. Rows that cannot be
+    calculated are written with their ``error`` column filled and, when
+    ``errors`` is given, reported there as ``line N: message``.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"unsupported format: {fmt}")
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be positive")
+    if engine not in ENGINES:
+        raise ValueError(f"unsupported engine: {engine}")
+
+    if fmt == "jsonl":
+        lines = (
+            (line_no, line)
+            for line_no, line in enumerate(source, start=1)
+            if line.strip()
+        )
+        func = partial(_jsonl_chunk, engine, cache)
+        chunks = _chunks(lines, chunk_size)
+    else:
+        reader = csv.reader(source, delimiter=delimiter)
+        fieldnames = next(reader, [])
+        out_fieldnames = fieldnames + [
+            c for c in (*COLUMNS, ERROR_COLUMN) if c not in fieldnames
+        ]
+        csv.writer(sink, delimiter=delimiter).writerow(out_fieldnames)
+        func = partial(_csv_chunk, engine, cache, fieldnames, out_fieldnames, delimiter)
+        chunks = _chunks(_numbered_records(reader), chunk_size)
+
+    summary = BatchSummary()
+    for text, rows, failed in _ordered_map(func, chunks, workers):
+        sink.write(text)
+        summary.rows += rows
+        summary.errors += len(failed)
+        if errors is not None:
+            for line_no, message in failed:
+                errors.write(f"line {line_no}: {message}\n")
+    return summary
@@ -0,0 +1,92 @@
+import array
+import unittest
+from decimal import Decimal
+
+import numpy as np
+
+from margin_calculator.batch import (
+    cena_z_marzy_batch,
+    cena_z_marzy_hybrid,
+    licz_marze_z_ceny_batch,
+    licz_marze_z_ceny_hybrid,
+)
+from margin_calculator.calculator import cena_z_marzy, licz_marze_z_ceny
+
+
+class TestBatchFunctions(unittest.TestCase):
+    def test_licz_marze_batch_basic(self):
+        result = licz_marze_z_ceny_batch([50, 80, 50], [100, 60, 50])
+        np.testing.assert_allclose(result, [0.5, -1 / 3, 0.0])
+
+    def test_licz_marze_batch_zero_price(self):
+        result = licz_marze_z_ceny_batch(np.array([50.0, 10.0]), np.array([0.0, 20.0]))
+        np.testing.assert_array_equal(result, [0.0, 0.5])
+
+    def test_cena_z_marzy_batch_basic(self):
+        result = cena_z_marzy_batch([50, 10], [0.2, 0])
+        np.testing.assert_allclose(result, [62.5, 10.0])
+
+    def test_cena_z_marzy_batch_over_one(self):
+        result = cena_z_marzy_batch([10, 10, 10], [1, 1.5, 0.5])
+        np.testing.assert_array_equal(result, [0.0, 0.0, 20.0])
+
+    def test_accepts_buffers_and_broadcasts(self):
+        ceny = array.array("d", [100.0, 200.0, 0.0])
+        result = licz_marze_z_ceny_batch(50, memoryview(ceny))
+        np.testing.assert_allclose(result, [0.5, 0.75, 0.0])
+
+    def test_out_parameter_is_reused(self):
+        out = np.full(2, 99.0)
+        result = cena_z_marzy_batch([50, 10], [0.2, 1], out=out)
+        self.assertIs(result, out)
+        np.testing.assert_allclose(out, [62.5, 0.0])
+
+    def test_matches_scalar_functions(self):
+        rng = np.random.default_rng(0)
+        tkw = np.round(rng.uniform(0, 500, 200), 2)
+        cena = np.round(rng.uniform(0, 800, 200), 2)
+        marza = np.round(rng.uniform(-1, 2, 200), 4)
+        marze = licz_marze_z_ceny_batch(tkw, cena)
+        ceny = cena_z_marzy_batch(tkw, marza)
+        for i in range(200):
+            t = Decimal(str(tkw[i]))
+            expected_marza = licz_marze_z_ceny(t, Decimal(str(cena[i])))
+            expected_cena = cena_z_marzy(t, Decimal(str(marza[i])))
+            self.assertAlmostEqual(marze[i], float(expected_marza), places=9)
+            self.assertAlmostEqual(ceny[i], float(expected_cena), places=9)
+
+
+class TestHybridFunctions(unittest.TestCase):
+    def test_matches_quantized_decimal(self):
+        rng = np.random.default_rng(1)
+        tkw = np.round(rng.uniform(0, 1000, 2000), 3)
+        cena = np.round(tkw * rng.uniform(0.5, 3, 2000), 2)
+        marza = np.round(rng.uniform(-0.5, 0.999, 2000), 3)
+        ceny = cena_z_marzy_hybrid(tkw, marza)
+        marze = licz_marze_z_ceny_hybrid(tkw, cena, decimals=4)
+        self.assertTrue(ceny.fallback.any())
+        self.assertLess(ceny.fallback.mean(), 0.1)
+        for i in range(2000):
+            t = Decimal(str(tkw[i]))
+            expected_cena = cena_z_marzy(t, Decimal(str(marza[i])))
+            expected_marza = licz_marze_z_ceny(t, Decimal(str(cena[i])))
+            self.assertEqual(
+                ceny.values[i], float(expected_cena.quantize(Decimal('0.01')))
+            )
+            self.assertEqual(
+                marze.values[i], float(expected_marza.quantize(Decimal('0.0001')))
+            )
+
+    def test_ties_fall_back_to_decimal(self):
+        # 0.9 / 0.8 = 1.125 and 1.3 / 0.8 = 1.625 round half to even.
+        result = cena_z_marzy_hybrid([0.9, 1.3, np.nan], [0.2, 0.2, 0.2])
+        np.testing.assert_array_equal(result.values[:2], [1.12, 1.62])
+        self.assertEqual(result.fallback.tolist(), [True, True, False])
+        self.assertTrue(np.isnan(result.values[2]))
+        np.testing.assert_array_equal(
+            cena_z_marzy_batch([0.9, 10], [0.2, 1], engine='hybrid'), [1.12, 0.0]
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import io
+
+import numpy as np
+import pytest
+
+from margin_calculator.bom import BOMCycleError, CostRollup, read_bom
+
+
+def _naive(koszty, edges, item):
+    return koszty.get(item, 0) + sum(
+        ilosc * _naive(koszty, edges, skladnik)
+        for rodzic, skladnik, ilosc in edges
+        if rodzic == item
+    )
+
+
+def test_rollup_matches_recursive_walk_and_updates_dependents_only():
+    rng = np.random.default_rng(0)
+    koszty = {f'c{i}': float(i + 1) for i in range(20)}
+    edges = []
+    for level in range(1, 4):
+        for j in range(5):
+            item = f'a{level}{j}'
+            lower = [k for k in koszty if not k.startswith(f'a{level}')]
+            lower += [e[0] for e in edges]
+            for skladnik in rng.choice(sorted(set(lower)), 3, replace=False):
+                edges.append((item, str(skladnik), float(rng.integers(1, 4))))
+    bom = CostRollup(koszty, *zip(*edges))
+    for item in bom.items:
+        assert bom.tkw([item])[0] == pytest.approx(_naive(koszty, edges, item))
+
+    before = {item: _naive(koszty, edges, item) for item in bom.items}
+    koszty['c3'] = 100.0
+    after = {item: _naive(koszty, edges, item) for item in bom.items}
+    changes = bom.update({'c3': 100.0})
+    assert set(changes) == {item for item in bom.items if after[item] != before[item]}
+    for item in bom.items:
+        assert bom.tkw([item])[0] == pytest.approx(after[item])
+
+
+def test_cycles_are_reported():
+    with pytest.raises(BOMCycleError) as exc:
+        CostRollup({'s': 1}, ['a', 'b', 'c', 'b'], ['s', 'c', 'b', 'a'], [1, 1, 1, 1])
+    assert exc.value.cycle == ['b', 'c', 'b']
+    with pytest.raises(ValueError, match='no cost for component x'):
+        CostRollup({'s': 1}, ['a'], ['x'], [1])
+
+
+def test_read_bom_feeds_price_calculations():
+    bom = read_bom(
+        io.StringIO('SKU;Koszt\nsruba;0,5\nplyta;20\nszafka;15\n'),
+        io.StringIO('rodzic;skladnik;ilosc\nszafka;plyta;3\nszafka;sruba;12\n'
+                    'zestaw;szafka;2\nzestaw;sruba;4\n'),
+        delimiter=';',
+    )
+    assert bom.products == ['zestaw']
+    np.testing.assert_array_equal(bom.ceny(0.2, ['szafka', 'zestaw']), [101.25, 205])
+    np.testing.assert_array_equal(bom.marze([164], ['zestaw']), [0])
+
+
+def test_read_bom_rejects_duplicate_items():
+    with pytest.raises(ValueError, match="duplicate sku: 'b'"):
+        read_bom(io.StringIO('sku,koszt\na,2\nb,1\nb,3\n'),
+                 io.StringIO('rodzic,skladnik,ilosc\na,b,1\n'))
@@ -0,0 +1,90 @@
+import pickle
+from decimal import Decimal
+
+import pytest
+
+from margin_calculator.cache import CalculatorCache
+from margin_calculator.calculator import cena_z_marzy, licz_marze_z_ceny
+
+
+def test_equal_arguments_share_entries():
+    cache = CalculatorCache()
+    assert cache.cena_z_marzy(Decimal('50'), Decimal('0.2')) == Decimal('62.5')
+    assert cache.cena_z_marzy(Decimal('50'), Decimal('0.2')) == Decimal('62.5')
+    assert cache.licz_marze_z_ceny(50, 100) == 0.5
+    assert len(cache) == 2
+    assert (cache.stats.hits, cache.stats.misses) == (1, 2)
+    assert cache.stats.hit_rate == pytest.approx(1 / 3)
+
+
+def test_cached_results_are_identical_to_uncached():
+    values = ['50', '50.00', '5E+1', '-0', '0', '0.00', '100', '100.0', 'NaN']
+    calls = [
+        (func, Decimal(first), Decimal(second))
+        for func in (licz_marze_z_ceny, cena_z_marzy)
+        for first in values
+        for second in values + ['0.2', '0.20']
+    ]
+    for order in (calls, calls[::-1]):
+        cache = CalculatorCache()
+        for func, first, second in order:
+            try:
+                expected = str(func(first, second))
+            except ArithmeticError as exc:
+                expected = type(exc).__name__
+            try:
+                cached = str(getattr(cache, func.__name__)(first, second))
+            except ArithmeticError as exc:
+                cached = type(exc).__name__
+            assert cached == expected, (func.__name__, first, second)
+
+
+def test_normalized_keys_share_entries_with_equal_values():
+    values = ['50', '50.00', '5E+1', '-0', '0', '0.00', '100', '100.0', '0.2',
+              '0.20', '1', '1.000', '123.4500', '1.0000000000000000000000000000001']
+    calls = [
+        (func, Decimal(first), Decimal(second))
+        for func in (licz_marze_z_ceny, cena_z_marzy)
+        for first in values
+        for second in values
+    ]
+    quantum = Decimal('0.000001')
+    for order in (calls, calls[::-1]):
+        cache = CalculatorCache(normalize=True)
+        for func, first, second in order:
+            expected = func(first, second)
+            cached = getattr(cache, func.__name__)(first, second)
+            assert cached == expected, (func.__name__, first, second)
+            assert str(cached.quantize(quantum)) == str(expected.quantize(quantum))
+    cache = CalculatorCache(normalize=True)
+    cache.cena_z_marzy(Decimal('50'), Decimal('0.2'))
+    cache.cena_z_marzy(Decimal('50.00'), Decimal('0.20'))
+    cache.cena_z_marzy(Decimal('-0'), Decimal('0.2'))
+    cache.cena_z_marzy(Decimal('0.00'), Decimal('0.2'))
+    assert (len(cache), cache.stats.hits) == (3, 1)
+    assert pickle.loads(pickle.dumps(cache)).normalize
+
+
+def test_eviction_policies():
+    lru = CalculatorCache(maxsize=2)
+    fifo = CalculatorCache(maxsize=2, policy='fifo')
+    for cache in (lru, fifo):
+        for marza in ('0.1', '0.2', '0.1', '0.3', '0.1'):
+            cache.cena_z_marzy(Decimal(10), Decimal(marza))
+    # LRU keeps the recently used 0.1, FIFO evicts it as the oldest entry.
+    assert (lru.stats.hits, lru.stats.evictions) == (2, 1)
+    assert (fifo.stats.hits, fifo.stats.evictions) == (1, 2)
+
+
+def test_errors_are_not_cached_and_pickling_gives_process_cache():
+    cache = CalculatorCache(maxsize=8, policy='fifo')
+    with pytest.raises(ArithmeticError):
+        cache.licz_marze_z_ceny(Decimal('sNaN'), Decimal(1))
+    assert len(cache) == 0
+    copy = pickle.loads(pickle.dumps(cache))
+    assert copy is not cache
+    assert (copy.maxsize, copy.policy) == (8, 'fifo')
+    assert pickle.loads(pickle.dumps(cache)) is copy
+    assert copy.cena_z_marzy(Decimal(50), Decimal('0.2')) == cena_z_marzy(
+        Decimal(50), Decimal('0.2')
+    )
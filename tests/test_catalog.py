@@ -0,0 +1,55 @@
+import io
+import math
+
+import pytest
+
+from margin_calculator.catalog import (
+    ERR_INVALID,
+    guess_format,
+    process_catalog,
+    read_catalog,
+    to_csv_bytes,
+)
+
+
+def test_read_catalog_detects_semicolon_and_normalizes_headers():
+    data = 'SKU; TKW ;Ilosc_Stara\nA;80,5;100\nB;;\n'.encode('cp1250')
+    table = read_catalog(data)
+    assert list(table.columns) == ['sku', 'tkw', 'ilosc_stara']
+    assert table['tkw'].tolist() == ['80,5', '']
+
+
+def test_process_catalog_fills_pairs_and_reports_errors():
+    data = (
+        'sku,tkw,ilosc_stara,cena_stara,marza_stara,cena_nowa,marza_nowa\n'
+        'A,80,100,120,,100,\n'
+        'B,80,100,,40,,20\n'
+        'C,80,100,120,,,\n'
+        'D,abc,100,120,,100,\n'
+        'E,80,100,120,,80,\n'
+    ).encode()
+    result = process_catalog(read_catalog(data))
+    assert result['ilosc_dodatkowa'].tolist()[:2] == [100, 167]
+    assert result.loc[1, 'cena_stara'] == pytest.approx(133.33)
+    assert result.loc[0, 'marza_nowa'] == pytest.approx(20)
+    assert result['blad'].tolist() == ['', '', 'err_pair_new', ERR_INVALID, 'err_loss']
+    assert math.isnan(result.loc[3, 'strata'])
+
+
+def test_process_catalog_requires_columns():
+    with pytest.raises(ValueError, match='ilosc_stara'):
+        process_catalog(read_catalog(b'tkw,cena_stara\n1,2\n'))
+
+
+def test_catalog_xlsx_roundtrip():
+    pd = pytest.importorskip('pandas')
+    pytest.importorskip('openpyxl')
+    buffer = io.BytesIO()
+    pd.DataFrame(
+        {'SKU': ['A'], 'TKW': [80], 'ilosc_stara': [100], 'cena_stara': [120],
+         'cena_nowa': [100]}
+    ).to_excel(buffer, index=False)
+    assert guess_format('katalog.XLSX') == 'xlsx'
+    result = process_catalog(read_catalog(buffer.getvalue(), 'xlsx'))
+    assert result.loc[0, 'ilosc_nowych'] == 200
+    assert to_csv_bytes(result).startswith(b'sku,tkw,ilosc_stara')
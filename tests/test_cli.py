@@ -1,5 +1,7 @@
+import json
 import sys
 import subprocess
+import time
 from pathlib import Path
 
 
@@ -26,3 +28,274 @@ def test_cli_cena():
     assert result.returncode == 0
     assert result.stdout.strip() == '62.5'
 
+
+
+def test_cli_batch_csv_reports_bad_rows():
+    repo_parent = Path(__file__).resolve().parents[2]
+    result = subprocess.run(
+        [sys.executable, '-m', 'margin_calculator.cli', 'batch'],
+        input='sku,tkw,cena,marza\nA,50,100,\nB,x,100,\nC,50,,0.2\n',
+        capture_output=True,
+        text=True,
+        cwd=repo_parent,
+    )
+    assert result.returncode == 1
+    lines = result.stdout.splitlines()
+    assert lines[0] == 'sku,tkw,cena,marza,error'
+    assert lines[1] == 'A,50,100,0.5,'
+    assert lines[2].startswith('B,x,100,,invalid tkw')
+    assert lines[3] == 'C,50,62.5,0.2,'
+    assert 'line 3: invalid tkw' in result.stderr
+
+
+def test_cli_batch_workers():
+    repo_parent = Path(__file__).resolve().parents[2]
+    rows = ''.join(f'{{"tkw": 50, "cena": {100 + i}}}\n' for i in range(20))
+    result = subprocess.run(
+        [
+            sys.executable, '-m', 'margin_calculator.cli', 'batch',
+            '--format', 'jsonl', '--workers', '2', '--chunk-size', '3',
+        ],
+        input=rows,
+        capture_output=True,
+        text=True,
+        cwd=repo_parent,
+    )
+    assert result.returncode == 0
+    prices = [line.split('"cena": "')[1].split('"')[0] for line in result.stdout.splitlines()]
+    assert prices == [str(100 + i) for i in range(20)]
+
+
+def test_cli_catalog_import_and_calc(tmp_path):
+    repo_parent = Path(__file__).resolve().parents[2]
+    source = tmp_path / 'catalog.csv'
+    source.write_text('sku,tkw,cena\nA,50,100\n', encoding='utf-8')
+    command = [sys.executable, '-m', 'margin_calculator.cli', 'catalog']
+    imported = subprocess.run(
+        command + ['import', str(source), str(tmp_path / 'store')],
+        capture_output=True,
+        text=True,
+        cwd=repo_parent,
+    )
+    assert imported.returncode == 0
+    result = subprocess.run(
+        command + ['calc', str(tmp_path / 'store')],
+        capture_output=True,
+        text=True,
+        cwd=repo_parent,
+    )
+    assert result.returncode == 0
+    assert result.stdout.splitlines()[1] == 'A,50.0,100.0,0.5,'
+
+
+def test_cli_catalog_index_is_refused_after_reimport(tmp_path):
+    repo_parent = Path(__file__).resolve().parents[2]
+    store = str(tmp_path / 'store')
+    first, second = tmp_path / 'first.csv', tmp_path / 'second.csv'
+    first.write_text('sku,tkw,cena\nA,80,100\n', encoding='utf-8')
+    second.write_text('sku,tkw,cena\nA,10,100\n', encoding='utf-8')
+    changes = tmp_path / 'changes.csv'
+    changes.write_text('sku,tkw,marza\nB,10,0.5\n', encoding='utf-8')
+    command = [sys.executable, '-m', 'margin_calculator.cli', 'catalog']
+
+    def run(*arguments):
+        return subprocess.run(command + list(arguments), capture_output=True,
+                              text=True, cwd=repo_parent)
+
+    assert run('import', str(first), store).returncode == 0
+    assert run('index', store).returncode == 0
+    assert run('import', str(second), store).returncode == 0
+    stale = run('query', store, '--min', '0.5')
+    assert stale.returncode == 2
+    assert 'out of date' in stale.stderr
+    assert run('index', store).returncode == 0
+    assert run('update', store, str(changes)).returncode == 0
+    result = run('query', store, '--min', '0.5')
+    assert result.returncode == 0
+    assert [line.split(',')[0] for line in result.stdout.splitlines()] == [
+        'sku', 'B', 'A']
+    calculated = run('calc', store)
+    assert calculated.stdout.splitlines()[1:] == ['A,10.0,100.0,0.9,',
+                                                  'B,10.0,20.0,0.5,']
+    # The updated index still belongs to the store and survives a rebuild.
+    assert run('index', store).returncode == 0
+    assert run('query', store, '--min', '0.5').stdout == result.stdout
+
+
+def test_cli_watch_once(tmp_path):
+    repo_parent = Path(__file__).resolve().parents[2]
+    base = tmp_path / 'base.csv'
+    base.write_text('sku,tkw,cena_stara,marza_nowa\nA,50,100,0.2\n', encoding='utf-8')
+    deltas = tmp_path / 'deltas'
+    deltas.mkdir()
+    (deltas / 'costs.csv').write_text('sku,tkw\nA,40\n', encoding='utf-8')
+    result = subprocess.run(
+        [sys.executable, '-m', 'margin_calculator.cli', 'watch', str(deltas),
+         '--catalog', str(base), '--once'],
+        capture_output=True,
+        text=True,
+        cwd=repo_parent,
+    )
+    assert result.returncode == 0
+    lines = result.stdout.splitlines()
+    assert len(lines) == 2
+    assert lines[1].startswith('A,40,,100,0.6,50.00,0.2,')
+    assert 'loaded 1 rows' in result.stderr
+
+
+def test_cli_optimize(tmp_path):
+    repo_parent = Path(__file__).resolve().parents[2]
+    source = tmp_path / 'demand.csv'
+    source.write_text(
+        'sku,tkw,cena,ilosc,elastycznosc,model\nA,60,100,1000,3,\n'
+        'B,60,100,1000,3,linear\nC,60,100,1000,0.5,\n',
+        encoding='utf-8',
+    )
+    result = subprocess.run(
+        [sys.executable, '-m', 'margin_calculator.cli', 'optimize', str(source)],
+        capture_output=True,
+        text=True,
+        cwd=repo_parent,
+    )
+    assert result.returncode == 1
+    lines = result.stdout.splitlines()
+    assert lines[0].startswith('sku,cena_opt,marza_opt,')
+    assert round(float(lines[1].split(',')[1]), 6) == 90
+    assert lines[3].startswith('C,nan,')
+    assert '2 of 3 rows optimized' in result.stderr
+
+
+def test_cli_tiers(tmp_path):
+    repo_parent = Path(__file__).resolve().parents[2]
+    source = tmp_path / 'tiers.csv'
+    source.write_text(
+        'sku,tkw,ilosc_stara,prog,cena_stara,cena_nowa\n'
+        'A,80,200,0,120,120\nA,,,100,,100\n',
+        encoding='utf-8',
+    )
+    result = subprocess.run(
+        [sys.executable, '-m', 'margin_calculator.cli', 'tiers', str(source)],
+        capture_output=True,
+        text=True,
+        cwd=repo_parent,
+    )
+    assert result.returncode == 0
+    assert result.stdout.splitlines()[1] == 'A,8000.0,6000.0,2000.0,100.0,300.0,'
+
+
+def test_cli_profile_json():
+    repo_parent = Path(__file__).resolve().parents[2]
+    result = subprocess.run(
+        [
+            sys.executable,
+            '-m',
+            'margin_calculator.cli',
+            '--profile',
+            '--profile-format',
+            'json',
+            'batch',
+            '--workers',
+            '1',
+        ],
+        input='tkw,cena\n50,100\nx,100\n',
+        capture_output=True,
+        text=True,
+        cwd=repo_parent,
+    )
+    assert result.returncode == 1
+    profile = json.loads(result.stderr[result.stderr.index('{') :])
+    assert profile['counters'] == {'batch_rows': 2, 'parse_errors': 1}
+    assert profile['histograms']['licz_marze_z_ceny']['count'] == 1
+    assert profile['histograms']['cli_batch']['errors'] == 0
+
+
+def test_cli_profile_merges_worker_metrics():
+    repo_parent = Path(__file__).resolve().parents[2]
+    rows = ''.join(f'{tkw},100\n' for tkw in range(1, 21))
+    result = subprocess.run(
+        [sys.executable, '-m', 'margin_calculator.cli', '--profile',
+         '--profile-format', 'json', 'batch', '--workers', '2',
+         '--chunk-size', '3'],
+        input='tkw,cena\n' + rows + 'x,100\n',
+        capture_output=True,
+        text=True,
+        cwd=repo_parent,
+    )
+    assert result.returncode == 1
+    profile = json.loads(result.stderr[result.stderr.index('{') :])
+    assert profile['counters'] == {'batch_rows': 21, 'parse_errors': 1}
+    assert profile['histograms']['licz_marze_z_ceny']['count'] == 20
+
+
+def test_cli_pipe_answers_each_line_immediately():
+    repo_parent = Path(__file__).resolve().parents[2]
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'margin_calculator.cli', 'pipe'],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True,
+        cwd=repo_parent,
+    )
+    answers = []
+    for line in ['marza 50 100', 'cena 50 0.2', 'cena x 1', 'obnizka 1 2',
+                 'marza 1e999999999 1e-999999999', 'cena 50 0.5']:
+        process.stdin.write(line + '\n')
+        process.stdin.flush()
+        answers.append(process.stdout.readline().strip())
+    process.stdin.close()
+    assert process.wait(timeout=10) == 1
+    assert answers[:2] == ['0.5', '62.5']
+    assert answers[2] == 'error: invalid number in: cena x 1'
+    assert answers[3] == 'error: unknown command: obnizka'
+    assert answers[4] == 'error: Overflow in: marza 1e999999999 1e-999999999'
+    assert answers[5] == '1.0E+2'
+
+
+# Wall-clock budget of a whole `cli marza` process, interpreter startup included.
+STARTUP_BUDGET = 1.0
+
+
+def test_cli_marza_starts_without_heavy_imports():
+    repo_parent = Path(__file__).resolve().parents[2]
+    command = [sys.executable, '-X', 'importtime', '-m', 'margin_calculator.cli']
+    elapsed = []
+    for arguments in (['marza', '50', '100'], ['cena', '50', '0.2']) * 2:
+        start = time.perf_counter()
+        result = subprocess.run(
+            command + arguments, capture_output=True, text=True, cwd=repo_parent
+        )
+        elapsed.append(time.perf_counter() - start)
+        assert result.returncode == 0
+        imported = {
+            line.rsplit('|', 1)[1].strip().split('.')[0]
+            for line in result.stderr.splitlines()
+            if line.startswith('import time:')
+        }
+        assert not imported & {'numpy', 'pandas', 'streamlit'}
+    assert min(elapsed) < STARTUP_BUDGET
+
+
+def test_cli_option_values_match_their_modules():
+    from margin_calculator import (
+        batch,
+        cache,
+        cli,
+        incremental,
+        index,
+        optimizer,
+        server,
+        streaming,
+    )
+
+    assert cli.POLICIES == cache.POLICIES
+    assert cli.FORMATS == streaming.FORMATS
+    assert cli.ENGINES == streaming.ENGINES
+    assert cli.DEFAULT_CHUNK_SIZE == streaming.DEFAULT_CHUNK_SIZE
+    assert cli.BATCH_ENGINES == batch.ENGINES
+    assert cli.INDEX_COLUMNS == index.INDEX_COLUMNS
+    assert cli.MODELS == optimizer.MODELS
+    assert cli.DEFAULT_INTERVAL == incremental.DEFAULT_INTERVAL
+    assert (cli.DEFAULT_HOST, cli.DEFAULT_PORT) == (
+        server.DEFAULT_HOST,
+        server.DEFAULT_PORT,
+    )
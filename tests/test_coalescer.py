@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from margin_calculator.coalescer import MicroBatcher
+
+
+def test_concurrent_requests_are_batched():
+    async def main():
+        batcher = MicroBatcher(max_batch=100, max_delay_ms=50)
+        marze = [batcher.licz_marze_z_ceny(50, 100 + i) for i in range(250)]
+        ceny = [batcher.cena_z_marzy(50, 0.2) for _ in range(10)]
+        results = await asyncio.gather(*marze, *ceny)
+        return batcher.stats, results
+
+    stats, results = asyncio.run(main())
+    assert results[0] == 0.5
+    assert results[100] == pytest.approx(0.75)
+    assert results[250:] == [62.5] * 10
+    assert stats.requests == 260
+    assert stats.batches == 4  # 100 + 100 + 50 marza, 10 cena
+
+
+def test_timer_flushes_partial_batch():
+    async def main():
+        batcher = MicroBatcher(max_batch=1000, max_delay_ms=1)
+        return await asyncio.wait_for(batcher.cena_z_marzy(10, 1), timeout=1)
+
+    assert asyncio.run(main()) == 0.0
+
+
+def test_failing_request_does_not_fail_batch():
+    async def main():
+        batcher = MicroBatcher(max_delay_ms=1, engine='fixed')
+        return await asyncio.gather(
+            batcher.cena_z_marzy(80, 0.4),
+            batcher.cena_z_marzy(1e12, 0.4),
+            return_exceptions=True,
+        )
+
+    ok, failed = asyncio.run(main())
+    assert ok == 133.33
+    assert isinstance(failed, ValueError)
+
+
+def test_unexpected_error_fails_every_queued_request():
+    def broken(first, second, engine):
+        raise TypeError('broken batch function')
+
+    async def main():
+        batcher = MicroBatcher(max_delay_ms=1)
+        batcher._queues['cena'].func = broken
+        return await asyncio.wait_for(
+            asyncio.gather(
+                batcher.cena_z_marzy(80, 0.4),
+                batcher.cena_z_marzy(50, 0.2),
+                return_exceptions=True,
+            ),
+            timeout=1,
+        )
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, TypeError) for result in results)
+
+
+def test_invalid_configuration():
+    with pytest.raises(ValueError):
+        MicroBatcher(max_batch=0)
+    with pytest.raises(ValueError):
+        MicroBatcher(engine='quad')
@@ -0,0 +1,115 @@
+import unittest
+from decimal import Decimal
+
+import numpy as np
+
+from margin_calculator.batch import oblicz_obnizke_batch
+from margin_calculator.discount import (
+    ERR_FILL,
+    ERR_LOSS,
+    ERR_PAIR_NEW,
+    ERR_PAIR_OLD,
+    DiscountError,
+    oblicz_obnizke,
+)
+
+
+class TestObliczObnizke(unittest.TestCase):
+    def test_example_prices(self):
+        wynik = oblicz_obnizke(
+            Decimal("80"), 100, cena_stara=Decimal("120"), cena_nowa=Decimal("100")
+        )
+        self.assertEqual(wynik.zysk_stary, Decimal("40"))
+        self.assertEqual(wynik.zysk_nowy, Decimal("20"))
+        self.assertEqual(wynik.strata, Decimal("2000"))
+        self.assertEqual(wynik.ilosc_dodatkowa, 100)
+        self.assertEqual(wynik.ilosc_nowych, 200)
+
+    def test_example_margins_quantizes_prices(self):
+        wynik = oblicz_obnizke(
+            Decimal("80"),
+            Decimal("100"),
+            marza_stara=Decimal("0.4"),
+            marza_nowa=Decimal("0.2"),
+        )
+        self.assertEqual(wynik.cena_stara, Decimal("133.33"))
+        self.assertEqual(wynik.cena_nowa, Decimal("100.00"))
+        self.assertEqual(wynik.strata, Decimal("3333"))
+        self.assertEqual(wynik.ilosc_dodatkowa, 167)
+
+    def test_margin_takes_precedence_over_price(self):
+        wynik = oblicz_obnizke(
+            Decimal("80"),
+            100,
+            cena_stara=Decimal("500"),
+            marza_stara=Decimal("0.2"),
+            cena_nowa=Decimal("90"),
+        )
+        self.assertEqual(wynik.cena_stara, Decimal("100.00"))
+
+    def test_error_codes(self):
+        cases = [
+            ({"tkw": None, "ilosc_stara": 1}, ERR_FILL),
+            ({"tkw": Decimal("1"), "ilosc_stara": 1}, ERR_PAIR_OLD),
+            (
+                {"tkw": Decimal("1"), "ilosc_stara": 1, "cena_stara": Decimal("2")},
+                ERR_PAIR_NEW,
+            ),
+            (
+                {
+                    "tkw": Decimal("1"),
+                    "ilosc_stara": 1,
+                    "cena_stara": Decimal("2"),
+                    "cena_nowa": Decimal("1"),
+                },
+                ERR_LOSS,
+            ),
+        ]
+        for kwargs, code in cases:
+            with self.assertRaises(DiscountError) as ctx:
+                oblicz_obnizke(**kwargs)
+            self.assertEqual(ctx.exception.code, code)
+
+
+class TestObliczObnizkeBatch(unittest.TestCase):
+    def test_per_row_rules_and_errors(self):
+        nan = np.nan
+        res = oblicz_obnizke_batch(
+            [80, 80, nan, 80, 80, 80],
+            [100, 100, 100, 100, 100, 100],
+            cena_stara=[120, nan, 120, nan, 120, 120],
+            marza_stara=[nan, 0.4, nan, nan, nan, nan],
+            cena_nowa=[100, nan, 100, 100, nan, 70],
+            marza_nowa=[nan, 0.2, nan, nan, nan, nan],
+        )
+        np.testing.assert_array_equal(
+            res.blad, ["", "", ERR_FILL, ERR_PAIR_OLD, ERR_PAIR_NEW, ERR_LOSS]
+        )
+        np.testing.assert_allclose(res.ilosc_dodatkowa[:2], [100, 167])
+        np.testing.assert_allclose(res.ilosc_nowych[:2], [200, 267])
+        np.testing.assert_allclose(res.cena_stara[1], 133.33)
+        self.assertTrue(np.isnan(res.ilosc_dodatkowa[2:]).all())
+
+    def test_matches_scalar_engine(self):
+        rng = np.random.default_rng(1)
+        tkw = np.round(rng.uniform(1, 100, 100), 2)
+        ilosc = rng.integers(1, 1000, 100).astype(float)
+        marza_stara = np.round(rng.uniform(0.3, 0.6, 100), 4)
+        cena_nowa = np.round(tkw * rng.uniform(1.05, 1.3, 100), 2)
+        res = oblicz_obnizke_batch(
+            tkw, ilosc, marza_stara=marza_stara, cena_nowa=cena_nowa
+        )
+        for i in range(100):
+            wynik = oblicz_obnizke(
+                Decimal(str(tkw[i])),
+                int(ilosc[i]),
+                marza_stara=Decimal(str(marza_stara[i])),
+                cena_nowa=Decimal(str(cena_nowa[i])),
+            )
+            self.assertAlmostEqual(res.strata[i], float(wynik.strata), places=6)
+            # float64 may land on the other side of an exact .5 tie
+            self.assertLessEqual(abs(res.ilosc_dodatkowa[i] - wynik.ilosc_dodatkowa), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import random
+import unittest
+from decimal import Decimal
+
+import numpy as np
+
+from margin_calculator.batch import (
+    cena_z_marzy_batch,
+    cena_z_marzy_gr_batch,
+    licz_marze_z_ceny_batch,
+    licz_marze_z_ceny_gr_batch,
+)
+from margin_calculator.calculator import cena_z_marzy, licz_marze_z_ceny
+from margin_calculator.fixed import (
+    MARGIN_SCALE,
+    cena_z_marzy_gr,
+    do_groszy,
+    licz_marze_z_ceny_gr,
+    marza_do_int,
+    z_groszy,
+)
+
+GROSZ = Decimal('0.01')
+
+
+def _random_cases(seed, count):
+    rng = random.Random(seed)
+    for _ in range(count):
+        tkw = rng.choice(
+            [rng.randint(0, 10**4), rng.randint(-(10**6), 10**11 - 1)]
+        )
+        cena = rng.choice(
+            [rng.randint(1, 10**4), rng.randint(-(10**6), 10**11 - 1)]
+        )
+        marza = rng.choice(
+            [
+                rng.randint(-MARGIN_SCALE, MARGIN_SCALE),
+                rng.randint(-(10**9) + 1, 10**6),
+            ]
+        )
+        yield tkw, cena, marza
+
+
+class TestFixedPoint(unittest.TestCase):
+    def test_conversions(self):
+        self.assertEqual(do_groszy(Decimal('62.5')), 6250)
+        self.assertEqual(z_groszy(6250), Decimal('62.50'))
+        self.assertEqual(marza_do_int(Decimal('0.25')), 250000)
+        self.assertEqual(marza_do_int(Decimal('3')), MARGIN_SCALE)
+        for bad in (Decimal('0.001'), Decimal('1e12'), Decimal('NaN')):
+            with self.assertRaises(ValueError):
+                do_groszy(bad)
+        with self.assertRaises(ValueError):
+            marza_do_int(Decimal('0.0000001'))
+
+    def test_cena_matches_decimal_quantize(self):
+        for tkw, _, marza in _random_cases(0, 5000):
+            expected = cena_z_marzy(
+                z_groszy(tkw), Decimal(marza) / MARGIN_SCALE
+            ).quantize(GROSZ)
+            self.assertEqual(z_groszy(cena_z_marzy_gr(tkw, marza)), expected)
+
+    def test_cena_ties_round_half_even(self):
+        # 0.01 / (1 - 0.6) = 0.025 and 0.03 / 0.4 = 0.075 are exact ties
+        self.assertEqual(cena_z_marzy_gr(1, 600000), 2)
+        self.assertEqual(cena_z_marzy_gr(3, 600000), 8)
+        self.assertEqual(cena_z_marzy_gr(-1, 600000), -2)
+        for tkw in range(-500, 500):
+            for marza in (-500000, 200000, 600000, 750000, 875000, 960000):
+                expected = cena_z_marzy(
+                    z_groszy(tkw), Decimal(marza) / MARGIN_SCALE
+                ).quantize(GROSZ)
+                self.assertEqual(z_groszy(cena_z_marzy_gr(tkw, marza)), expected)
+
+    def test_marza_matches_decimal_two_decimal_percent(self):
+        for tkw, cena, _ in _random_cases(1, 5000):
+            margin = licz_marze_z_ceny(z_groszy(tkw), z_groszy(cena)) * 100
+            percent = licz_marze_z_ceny_gr(tkw, cena, scale=10**4)
+            self.assertEqual(f'{Decimal(percent).scaleb(-2):.2f}', f'{margin:.2f}')
+
+    def test_marza_zero_and_negative_price(self):
+        self.assertEqual(licz_marze_z_ceny_gr(5000, 0), 0)
+        self.assertEqual(licz_marze_z_ceny_gr(5000, -10000), 1500000)
+
+    def test_vectorized_matches_scalar(self):
+        cases = list(_random_cases(2, 2000))
+        tkw, cena, marza = (np.array(col, dtype=np.int64) for col in zip(*cases))
+        np.testing.assert_array_equal(
+            cena_z_marzy_gr_batch(tkw, marza),
+            [cena_z_marzy_gr(t, m) for t, _, m in cases],
+        )
+        np.testing.assert_array_equal(
+            licz_marze_z_ceny_gr_batch(tkw, cena),
+            [licz_marze_z_ceny_gr(t, c) for t, c, _ in cases],
+        )
+
+    def test_vectorized_rejects_out_of_range(self):
+        with self.assertRaises(ValueError):
+            cena_z_marzy_gr_batch([10**11], [0])
+
+    def test_batch_engine_fixed(self):
+        np.testing.assert_array_equal(
+            cena_z_marzy_batch([80, 0.01, 10], [0.4, 0.6, 1], engine='fixed'),
+            [133.33, 0.02, 0.0],
+        )
+        np.testing.assert_array_equal(
+            licz_marze_z_ceny_batch([80, 5], [120, 0], engine='fixed'),
+            [0.333333, 0.0],
+        )
+        with self.assertRaises(ValueError):
+            cena_z_marzy_batch([1], [0.1], engine='quad')
+        # Inputs are rejected, not rounded, where Decimal would differ.
+        with self.assertRaises(ValueError):
+            licz_marze_z_ceny_batch([0.0125], [0.02], engine='fixed')
+        with self.assertRaises(ValueError):
+            cena_z_marzy_batch([10], [0.1234567], engine='fixed')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import io
+import threading
+from decimal import Decimal
+
+import pytest
+
+from margin_calculator.incremental import (
+    OUTPUT_COLUMNS,
+    IncrementalCatalog,
+    new_delta_files,
+    read_updates,
+    watch,
+)
+
+
+BASE = [
+    {'sku': 'A', 'tkw': '80', 'ilosc_stara': '100', 'cena_stara': '120',
+     'cena_nowa': '100'},
+    {'sku': 'B', 'tkw': '80', 'ilosc_stara': '100', 'cena_stara': '120',
+     'marza_nowa': '0.2'},
+    {'sku': 'C', 'tkw': '50', 'cena_stara': '100'},
+]
+
+
+def test_apply_recomputes_and_returns_only_changed_rows():
+    catalog = IncrementalCatalog()
+    assert list(catalog.apply(BASE)) == ['A', 'B', 'C']
+    assert catalog['C']['marza_stara'] == Decimal('0.5')
+    assert catalog['C']['blad'] == 'err_pair_new'
+
+    # An equal cost changes nothing; a new target price clears the margin.
+    changes = catalog.apply([
+        {'sku': 'A', 'tkw': '80.0'},
+        {'sku': 'B', 'cena_nowa': '110'},
+        {'sku': 'B', 'tkw': ''},
+    ])
+    assert list(changes) == ['B']
+    assert changes['B']['marza_nowa'] == pytest.approx(Decimal(30) / 110)
+    assert changes['B']['ilosc_dodatkowa'] == 33
+    assert catalog.inputs('B')['marza_nowa'] is None
+
+    changes = catalog.apply([{'sku': 'A', 'tkw': '101'}])
+    assert changes['A']['blad'] == 'err_loss'
+
+
+def test_apply_validates_before_changing_state():
+    catalog = IncrementalCatalog()
+    catalog.apply(BASE)
+    with pytest.raises(ValueError, match='update 2: invalid tkw'):
+        catalog.apply([{'sku': 'A', 'tkw': '90'}, {'sku': 'B', 'tkw': 'x'}])
+    with pytest.raises(ValueError, match='missing sku'):
+        catalog.apply([{'tkw': '90'}])
+    assert catalog.inputs('A')['tkw'] == Decimal('80')
+
+
+def test_watch_applies_new_delta_files(tmp_path):
+    (tmp_path / '1.csv').write_text('SKU;TKW\nA;90\n', encoding='utf-8')
+    (tmp_path / '.partial.csv').write_text('sku;tkw\nA;1\n', encoding='utf-8')
+    (tmp_path / '2.csv').write_text('sku;tkw\nB;x\n', encoding='utf-8')
+    assert [p.name for p in new_delta_files(tmp_path, {'2.csv'})] == ['1.csv']
+
+    catalog = IncrementalCatalog()
+    catalog.apply(read_updates(io.StringIO('sku,tkw,ilosc_stara,cena_stara,'
+                                           'cena_nowa\nA,80,100,120,100\n')))
+    sink, errors = io.StringIO(), io.StringIO()
+    stop = threading.Event()
+    stop.set()
+    watch(catalog, tmp_path, sink, delimiter=';', stop=stop, errors=errors)
+    lines = sink.getvalue().splitlines()
+    assert lines[0] == ';'.join(OUTPUT_COLUMNS)
+    assert lines[1] == 'A;90;100;120;0.25;100;0.1;30;10;2000;200;300;'
+    assert len(lines) == 2
+    assert '2.csv: update 1: invalid tkw' in errors.getvalue()
+
+
+def test_apply_rejects_non_finite_and_reports_overflow():
+    catalog = IncrementalCatalog()
+    catalog.apply(BASE)
+    for value in ('nan', 'inf', '-Infinity'):
+        with pytest.raises(ValueError, match='update 1: invalid tkw'):
+            catalog.apply([{'sku': 'A', 'tkw': value}])
+    changes = catalog.apply([{'sku': 'A', 'tkw': '1e999999999'}])
+    assert changes['A']['blad'] == 'err_calc'
+    assert catalog.inputs('A')['tkw'] == Decimal('1e999999999')
+
+
+def test_apply_leaves_state_unchanged_when_a_row_fails(monkeypatch):
+    import margin_calculator.incremental as incremental
+
+    catalog = IncrementalCatalog()
+    catalog.apply(BASE)
+
+    def fail(wiersz):
+        raise RuntimeError('boom')
+
+    monkeypatch.setattr(incremental, 'oblicz_wiersz', fail)
+    with pytest.raises(RuntimeError):
+        catalog.apply([{'sku': 'A', 'tkw': '90'}, {'sku': 'D', 'tkw': '1'}])
+    assert catalog.inputs('A')['tkw'] == Decimal('80')
+    assert 'D' not in catalog and len(catalog) == 3
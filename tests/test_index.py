@@ -0,0 +1,100 @@
+import io
+
+import numpy as np
+import pytest
+
+from margin_calculator.index import MarginIndex, open_index
+from margin_calculator.store import import_csv, open_store, update_store
+
+
+def _catalog(rng, size):
+    tkw = rng.uniform(1, 100, size)
+    cena = tkw * rng.uniform(0.5, 3, size)
+    cena[::7] = np.nan
+    return [f'S{i}' for i in range(size)], tkw, cena
+
+
+def test_queries_match_full_scan():
+    rng = np.random.default_rng(0)
+    sku, tkw, cena = _catalog(rng, 1000)
+    index = MarginIndex(sku, tkw, cena)
+    marza = (cena - tkw) / cena
+    rows = index.between('marza', 0.1, 0.4)
+    assert set(rows) == set(np.flatnonzero((marza >= 0.1) & (marza <= 0.4)))
+    assert np.all(np.diff(marza[rows]) >= 0)
+    # Cutting the price by 10% needs extra volume 0.1 / (marza - 0.1).
+    rows = index.mozliwa_obnizka(0.1, 0.15)
+    expected = np.flatnonzero((marza > 0.1) & (0.1 / (marza - 0.1) < 0.15))
+    assert set(rows) == set(expected)
+    zysk = cena - tkw
+    assert set(index.between('zysk', high=0)) == set(np.flatnonzero(zysk <= 0))
+    assert index.indexed('elastycznosc') == np.count_nonzero(~np.isnan(cena))
+    with pytest.raises(ValueError):
+        index.mozliwa_obnizka(0.1, 0)
+
+
+def test_update_matches_rebuilt_index():
+    rng = np.random.default_rng(1)
+    sku, tkw, cena = _catalog(rng, 500)
+    index = MarginIndex(sku, tkw, cena)
+    changed = rng.choice(500, 50, replace=False)
+    tkw[changed] = rng.uniform(1, 100, 50)
+    cena[changed[:5]] = np.nan
+    index.update([sku[i] for i in changed] + ['NEW'], np.append(tkw[changed], 10),
+                 np.append(cena[changed], 50))
+    rebuilt = MarginIndex(sku + ['NEW'], np.append(tkw, 10), np.append(cena, 50))
+    for column in ('marza', 'zysk', 'elastycznosc'):
+        rows, expected = index.between(column), rebuilt.between(column)
+        assert sorted(index.sku(rows)) == sorted(rebuilt.sku(expected))
+        np.testing.assert_array_equal(
+            index.table(rows)[column], rebuilt.table(expected)[column]
+        )
+
+
+def test_index_of_store_roundtrip(tmp_path):
+    import_csv(io.StringIO('sku,tkw,cena,marza\nA,80,100,\nB,40,,0.5\nC,10,0,\n'),
+               tmp_path / 'store')
+    index = MarginIndex.from_store(open_store(tmp_path / 'store'))
+    index.save(tmp_path / 'index')
+    reopened = open_index(tmp_path / 'index')
+    rows = reopened.between('marza', 0.1)
+    assert reopened.sku(rows) == ['A', 'B']
+    np.testing.assert_array_equal(reopened.table(rows)['cena'], [100, 80])
+    reopened.update(['C'], 10, 20)
+    assert reopened.sku(reopened.between('marza', 0.5)) == ['B', 'C']
+    with pytest.raises(ValueError):
+        open_index(tmp_path / 'store')
+
+
+def test_index_of_replaced_store_is_stale(tmp_path):
+    store = tmp_path / 'store'
+    import_csv(io.StringIO('sku,tkw,cena\nA,80,100\n'), store)
+    MarginIndex.from_store(open_store(store)).save(store / 'index')
+    assert len(open_index(store / 'index', open_store(store))) == 1
+    import_csv(io.StringIO('sku,tkw,cena\nA,10,100\n'), store)
+    with pytest.raises(ValueError, match='out of date'):
+        open_index(store / 'index', open_store(store))
+
+
+def test_store_and_index_agree_after_update(tmp_path):
+    store = tmp_path / 'store'
+    import_csv(io.StringIO('sku,tkw,cena,marza\nA,80,100,\nB,50,100,\nC,1,,0.5\n'),
+               store)
+    MarginIndex.from_store(open_store(store)).save(store / 'index')
+    index = open_index(store / 'index', open_store(store))
+    import_csv(io.StringIO('sku,tkw,cena,marza\nB,10,,0.5\nA,,90,\nLONGER-SKU,1,,0.9\n'),
+               tmp_path / 'delta')
+    rows = update_store(store, open_store(tmp_path / 'delta'))
+    index.update_from_store(open_store(store), rows)
+    index.save(store / 'index')
+
+    reopened = open_index(store / 'index', open_store(store))
+    rebuilt = MarginIndex.from_store(open_store(store))
+    for column in ('marza', 'zysk', 'elastycznosc'):
+        rows, expected = reopened.between(column), rebuilt.between(column)
+        assert sorted(reopened.sku(rows)) == sorted(rebuilt.sku(expected))
+        np.testing.assert_array_equal(reopened.table(rows)[column],
+                                      rebuilt.table(expected)[column])
+    rows = reopened.between('marza', 0.3)
+    ceny = dict(zip(reopened.sku(rows), reopened.table(rows)['cena']))
+    assert ceny == pytest.approx({'B': 20, 'C': 2, 'LONGER-SKU': 10})
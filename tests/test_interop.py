@@ -0,0 +1,67 @@
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from margin_calculator.batch import licz_marze_z_ceny_batch
+from margin_calculator.calculator import cena_z_marzy, licz_marze_z_ceny
+from margin_calculator.interop import cena_z_marzy_column, licz_marze_z_ceny_column
+
+pa = pytest.importorskip('pyarrow')
+
+
+def test_series_keep_index_and_match_batch():
+    tkw = pd.Series([50.0, 80.0, 10.0], index=['A', 'B', 'C'])
+    cena = pd.Series([100.0, 0.0, 12.5], index=['A', 'B', 'C'])
+    marza = licz_marze_z_ceny_column(tkw, cena)
+    assert marza.name == 'marza' and list(marza.index) == ['A', 'B', 'C']
+    np.testing.assert_array_equal(marza, licz_marze_z_ceny_batch(tkw, cena))
+    ceny = cena_z_marzy_column(pa.chunked_array([[50.0], [10.0, None]]), 0.2)
+    assert ceny.num_chunks == 2 and ceny.to_pylist() == [62.5, 12.5, None]
+
+
+def test_decimal_columns_match_decimal_calculator():
+    rng = np.random.default_rng(3)
+    tkw = [Decimal(int(x)).scaleb(-2) for x in rng.integers(1, 10**7, 500)]
+    cena = [Decimal(int(x)).scaleb(-2) for x in rng.integers(0, 10**7, 500)]
+    marza = [Decimal(int(x)).scaleb(-6) for x in rng.integers(0, 10**6, 500)]
+    tkw_arr = pa.chunked_array([tkw[:200], tkw[200:]], pa.decimal128(12, 2))
+    marze = licz_marze_z_ceny_column(tkw_arr, pa.array(cena, pa.decimal128(12, 2)))
+    ceny = cena_z_marzy_column(tkw_arr, pa.array(marza, pa.decimal128(9, 6)))
+    assert marze.type == pa.decimal128(38, 6) and marze.num_chunks == 2
+    assert marze.to_pylist() == [
+        licz_marze_z_ceny(t, c).quantize(Decimal('0.000001')) for t, c in zip(tkw, cena)
+    ]
+    assert ceny.to_pylist() == [
+        cena_z_marzy(t, m).quantize(Decimal('0.01')) for t, m in zip(tkw, marza)
+    ]
+
+
+def test_decimal_series_with_nulls():
+    dtype = pd.ArrowDtype(pa.decimal128(10, 3))
+    tkw = pd.Series([Decimal('80'), None, Decimal('50.125')], dtype=dtype)
+    marza = licz_marze_z_ceny_column(tkw.iloc[1:], Decimal('100'))
+    assert str(marza.dtype) == 'decimal128(38, 6)[pyarrow]'
+    assert marza.index.tolist() == [1, 2]
+    assert marza.tolist()[1] == licz_marze_z_ceny(
+        Decimal('50.125'), Decimal('100')).quantize(Decimal('0.000001'))
+    assert pd.isna(marza.tolist()[0])
+    with pytest.raises(ValueError):
+        licz_marze_z_ceny_column(tkw, 100, engine='exact')
+
+
+def test_decimal_places_beyond_the_integer_engine_are_not_rounded():
+    tkw = [Decimal('0.0125'), Decimal('0.0049'), Decimal('80'), Decimal('1.2345')]
+    cena = [Decimal('0.02'), Decimal('0.02'), Decimal('100'), Decimal('2')]
+    marza = [Decimal('0.1234567'), Decimal('0.5'), Decimal('0.2'), Decimal('0.1')]
+    tkw_arr = pa.array(tkw, pa.decimal128(12, 4))
+    marze = licz_marze_z_ceny_column(tkw_arr, pa.array(cena, pa.decimal128(12, 2)))
+    assert marze.to_pylist()[:2] == [Decimal('0.375000'), Decimal('0.755000')]
+    assert marze.to_pylist() == [
+        licz_marze_z_ceny(t, c).quantize(Decimal('0.000001')) for t, c in zip(tkw, cena)
+    ]
+    ceny = cena_z_marzy_column(tkw_arr, pa.array(marza, pa.decimal128(12, 7)))
+    assert ceny.to_pylist() == [
+        cena_z_marzy(t, m).quantize(Decimal('0.01')) for t, m in zip(tkw, marza)
+    ]
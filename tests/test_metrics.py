@@ -0,0 +1,70 @@
+import pickle
+from decimal import Decimal
+
+import pytest
+
+from margin_calculator.cache import CalculatorCache
+from margin_calculator.metrics import METRICS, InstrumentedCalculator, Metrics
+from margin_calculator.utils import _to_decimal, _to_decimal_column
+
+
+def test_snapshot_and_prometheus_export():
+    metrics = Metrics(enabled=True)
+    metrics.observe('cena_z_marzy', 3e-6)
+    metrics.observe('cena_z_marzy', 0.2, error=True)
+    metrics.count('parse_errors', 2)
+    histogram = metrics.snapshot()['histograms']['cena_z_marzy']
+    assert histogram['count'] == 2 and histogram['errors'] == 1
+    assert histogram['buckets']['1e-06'] == 0
+    assert histogram['buckets']['5e-06'] == 1
+    assert histogram['buckets']['+Inf'] == 2
+    text = metrics.to_prometheus()
+    assert 'margin_calc_parse_errors_total 2\n' in text
+    assert 'margin_calc_duration_seconds_bucket{op="cena_z_marzy",le="0.5"} 2\n' in text
+    assert 'margin_calc_errors_total{op="cena_z_marzy"} 1\n' in text
+
+
+def test_merge_adds_snapshots():
+    worker, merged = Metrics(enabled=True), Metrics(enabled=True)
+    worker.observe('cena_z_marzy', 3e-6)
+    worker.observe('cena_z_marzy', 0.2, error=True)
+    worker.count('parse_errors', 2)
+    merged.observe('cena_z_marzy', 3e-6)
+    merged.merge(worker.snapshot())
+    merged.merge(Metrics(enabled=True).snapshot())
+    snapshot = merged.snapshot()
+    assert snapshot['counters'] == {'parse_errors': 2}
+    histogram = snapshot['histograms']['cena_z_marzy']
+    assert histogram['count'] == 3 and histogram['errors'] == 1
+    assert histogram['buckets']['5e-06'] == 2 and histogram['buckets']['0.5'] == 3
+    assert histogram['sum'] == pytest.approx(0.200006)
+
+
+def test_disabled_metrics_record_nothing():
+    metrics = Metrics()
+    metrics.count('parse_errors')
+    with metrics.timer('op'):
+        pass
+    assert metrics.snapshot() == {'counters': {}, 'histograms': {}}
+    with pytest.raises(ZeroDivisionError):
+        with Metrics(enabled=True).timer('op'):
+            1 / 0
+
+
+def test_instrumented_calculator_and_parse_errors():
+    METRICS.enable()
+    try:
+        calc = InstrumentedCalculator(CalculatorCache(maxsize=4))
+        assert calc.licz_marze_z_ceny(Decimal('50'), Decimal('100')) == Decimal('0.5')
+        assert calc.cena_z_marzy(Decimal('50'), Decimal('0.5')) == Decimal('100')
+        assert _to_decimal('x') == Decimal('0')
+        _to_decimal_column(['1', 'y', '', 'z'])
+        snapshot = METRICS.snapshot()
+        copy = pickle.loads(pickle.dumps(calc))
+    finally:
+        METRICS.disable()
+        METRICS.reset()
+    assert snapshot['counters'] == {'parse_errors': 3}
+    assert snapshot['histograms']['licz_marze_z_ceny']['count'] == 1
+    assert snapshot['histograms']['cena_z_marzy']['count'] == 1
+    assert copy.cache.maxsize == 4 and copy.metrics is METRICS
@@ -0,0 +1,84 @@
+import io
+import warnings
+
+import numpy as np
+import pytest
+
+from margin_calculator.optimizer import optymalna_cena, read_demand
+
+
+def test_matches_closed_form():
+    rng = np.random.default_rng(0)
+    size = 10_000
+    tkw = rng.uniform(1, 100, size)
+    cena = tkw * rng.uniform(1.05, 3, size)
+    elastycznosc = rng.uniform(1.1, 8, size)
+    model = np.where(rng.random(size) < 0.5, 'constant', 'linear')
+    wynik = optymalna_cena(tkw, cena, 500, elastycznosc, model=model)
+    assert wynik.zbiezne.all()
+    assert not wynik.ograniczona.any()
+    # Lerner rule for constant elasticity, midpoint of cost and choke price
+    # for linear demand.
+    expected = np.where(
+        model == 'linear',
+        (cena * (1 + 1 / elastycznosc) + tkw) / 2,
+        tkw * elastycznosc / (elastycznosc - 1),
+    )
+    np.testing.assert_allclose(wynik.cena, expected, rtol=1e-9)
+    assert wynik.iteracje.max() < 20
+
+
+def test_constant_elasticity_without_cost_needs_price_floor():
+    wynik = optymalna_cena([0, -5, 0, 0], 100, 1000, 3, model='constant',
+                           marza_min=[np.nan, np.nan, 0.2, np.nan],
+                           cena_min=[np.nan, np.nan, np.nan, 5])
+    np.testing.assert_array_equal(wynik.zbiezne, [False, False, False, True])
+    assert np.isnan(wynik.cena[:3]).all()
+    assert wynik.cena[3] == 5 and wynik.ograniczona[3]
+    # Linear demand has a finite optimum below the choke price regardless.
+    assert optymalna_cena(0, 100, 1000, 3, model='linear').zbiezne
+
+
+def test_constraints():
+    wynik = optymalna_cena(
+        [60, 60, 60, 60, 60],
+        100,
+        1000,
+        [3, 3, 3, 0.5, 0.5],
+        marza_min=[0.5, np.nan, np.nan, np.nan, np.nan],
+        cena_min=[np.nan, 95, np.nan, np.nan, np.nan],
+        cena_max=[np.nan, np.nan, 80, 150, np.nan],
+    )
+    np.testing.assert_allclose(wynik.cena[:4], [120, 95, 80, 150])
+    assert wynik.ograniczona.tolist() == [True, True, True, True, False]
+    assert wynik.zbiezne.tolist() == [True, True, True, True, False]
+    assert np.isnan(wynik.zysk[4])
+    # Infeasible bounds and invalid input do not converge.
+    wynik = optymalna_cena(
+        60, [100, 100, 0], 1000, [3, -1, 3], cena_min=120, cena_max=[110, 200, 200]
+    )
+    assert not wynik.zbiezne.any()
+    # A margin of at least 100 % or an infinite price floor has no finite price.
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        wynik = optymalna_cena(60, 100, 1000, [3, 3, 0.5],
+                               model=['constant', 'linear', 'linear'],
+                               marza_min=[1, 1.5, np.nan],
+                               cena_min=[np.nan, np.nan, np.inf])
+    assert not wynik.zbiezne.any() and not wynik.ograniczona.any()
+    assert np.isnan(wynik.cena).all() and np.isnan(wynik.zysk).all()
+    with pytest.raises(ValueError):
+        optymalna_cena(60, 100, 1000, 3, model='quadratic')
+
+
+def test_read_demand():
+    source = io.StringIO(
+        'SKU;tkw;cena;ilosc;elastycznosc;cena_max\nA;60;100;1000;2,5;\n'
+        'B;60;100;1000;3;110\n'
+    )
+    columns = read_demand(source, delimiter=';')
+    assert columns['sku'] == ['A', 'B']
+    np.testing.assert_array_equal(columns['elastycznosc'], [2.5, 3])
+    assert np.isnan(columns['cena_max'][0])
+    with pytest.raises(ValueError, match='missing column: elastycznosc'):
+        read_demand(io.StringIO('tkw,cena,ilosc\n1,2,3\n'))
@@ -0,0 +1,50 @@
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from margin_calculator.discount import DiscountError, oblicz_obnizke
+from margin_calculator.scenarios import siatka_obnizki
+
+
+def test_grid_matches_scalar_discount():
+    marze = np.array([0.1, 0.2, 0.25])
+    grid = siatka_obnizki(80, 100, marza_stara=0.4, marza_nowa=marze)
+    assert grid.ilosc_dodatkowa.shape == (3, 1)
+    for marza, extra, strata in zip(
+        marze, grid.ilosc_dodatkowa[:, 0], grid.strata[:, 0]
+    ):
+        wynik = oblicz_obnizke(
+            Decimal(80),
+            100,
+            marza_stara=Decimal('0.4'),
+            marza_nowa=Decimal(str(marza)),
+        )
+        assert extra == wynik.ilosc_dodatkowa
+        assert strata == pytest.approx(float(wynik.strata))
+
+
+def test_grid_broadcasts_cost_changes():
+    grid = siatka_obnizki(
+        80, 100, cena_stara=120, cena_nowa=np.linspace(90, 120, 4),
+        zmiana_tkw=[-0.1, 0, 0.1],
+    )
+    assert grid.strata.shape == (4, 3)
+    assert grid.tkw_nowe.tolist() == pytest.approx([72, 80, 88])
+    # Unchanged price and cost need no extra sales.
+    assert grid.ilosc_dodatkowa[3, 1] == 0
+    # A new price of 90 at a cost of 88 leaves a profit of 2 per unit.
+    assert grid.ilosc_dodatkowa[0, 2] == 1900
+    assert np.isnan(siatka_obnizki(80, 1, cena_stara=120, cena_nowa=[80]).ilosc_nowych)
+
+
+def test_grid_validation():
+    with pytest.raises(DiscountError) as exc:
+        siatka_obnizki(80, None, cena_stara=120, cena_nowa=[100])
+    assert exc.value.code == 'err_fill'
+    with pytest.raises(DiscountError) as exc:
+        siatka_obnizki(80, 100, cena_nowa=[100])
+    assert exc.value.code == 'err_pair_old'
+    with pytest.raises(DiscountError) as exc:
+        siatka_obnizki(80, 100, cena_stara=120)
+    assert exc.value.code == 'err_pair_new'
@@ -0,0 +1,119 @@
+import http.client
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from margin_calculator.cache import CalculatorCache
+from margin_calculator.metrics import METRICS
+from margin_calculator.server import make_server
+
+
+@pytest.fixture(scope='module')
+def base_url():
+    server = make_server('127.0.0.1', 0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+def _post(url, payload):
+    data = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+    request = urllib.request.Request(url, data=data, method='POST')
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def test_health(base_url):
+    with urllib.request.urlopen(base_url + '/health') as response:
+        assert json.loads(response.read()) == {'status': 'ok'}
+
+
+def test_marza_and_cena(base_url):
+    assert _post(base_url + '/marza', {'tkw': 50, 'cena': '100'}) == {'marza': '0.5'}
+    assert _post(base_url + '/cena', {'tkw': '50', 'marza': 0.2}) == {'cena': '62.5'}
+
+
+def test_batch_body_reports_errors_per_item(base_url):
+    result = _post(
+        base_url + '/cena',
+        [{'tkw': 50, 'marza': 0.2}, {'tkw': 'x', 'marza': 0.2}, 5, {'tkw': 1}],
+    )
+    assert result == [
+        {'cena': '62.5'},
+        {'error': "invalid tkw: 'x'"},
+        {'error': 'item is not a JSON object'},
+        {'error': 'missing marza'},
+    ]
+
+
+def test_obnizka(base_url):
+    result = _post(
+        base_url + '/obnizka',
+        [
+            {'tkw': 80, 'ilosc_stara': 100, 'cena_stara': 120, 'cena_nowa': 100},
+            {'tkw': 80, 'ilosc_stara': 100, 'cena_stara': 120},
+        ],
+    )
+    assert result[0]['ilosc_dodatkowa'] == 100
+    assert result[0]['strata'] == '2000'
+    assert result[1] == {'error': 'err_pair_new'}
+
+
+def test_bad_requests(base_url):
+    with pytest.raises(urllib.error.HTTPError) as exc:
+        _post(base_url + '/unknown', {})
+    assert exc.value.code == 404
+    with pytest.raises(urllib.error.HTTPError) as exc:
+        _post(base_url + '/marza', b'{not json')
+    assert exc.value.code == 400
+
+
+@pytest.mark.parametrize('length', ['abc', '-1'])
+def test_invalid_content_length(base_url, length):
+    connection = http.client.HTTPConnection(base_url.split('//')[1], timeout=5)
+    connection.putrequest('POST', '/marza')
+    connection.putheader('Content-Length', length)
+    connection.endheaders()
+    response = connection.getresponse()
+    assert response.status == 400
+    assert json.loads(response.read()) == {'error': 'invalid Content-Length'}
+    connection.close()
+
+
+def test_cache_stats_in_health():
+    server = make_server('127.0.0.1', 0, cache=CalculatorCache(maxsize=4))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f'http://127.0.0.1:{server.server_address[1]}'
+    try:
+        payload = [{'tkw': 50, 'cena': 100}, {'tkw': '50', 'cena': '100'}]
+        assert _post(url + '/marza', payload) == [{'marza': '0.5'}] * 2
+        with urllib.request.urlopen(url + '/health') as response:
+            health = json.loads(response.read())
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert health['cache'] == {'hits': 1, 'misses': 1, 'evictions': 0, 'size': 1}
+
+
+def test_metrics_endpoint_while_profiling(base_url):
+    with pytest.raises(urllib.error.HTTPError) as exc:
+        urllib.request.urlopen(base_url + '/metrics')
+    assert exc.value.code == 404
+    METRICS.enable()
+    try:
+        _post(base_url + '/cena', {'tkw': 50, 'marza': '0.5'})
+        with urllib.request.urlopen(base_url + '/metrics') as response:
+            text = response.read().decode()
+        with urllib.request.urlopen(base_url + '/metrics.json') as response:
+            snapshot = json.loads(response.read())
+    finally:
+        METRICS.disable()
+        METRICS.reset()
+    assert 'margin_calc_duration_seconds_count{op="http_cena"} 1\n' in text
+    assert snapshot['histograms']['cena_z_marzy']['count'] == 1
@@ -0,0 +1,51 @@
+import pytest
+
+from margin_calculator.discount import ERR_PAIR_NEW, DiscountError
+from margin_calculator.simulation import Distribution, symuluj_obnizke
+
+RYZYKO = dict(
+    cena_stara=120,
+    cena_nowa=Distribution('triangular', (95, 100, 105)),
+    wzrost_sprzedazy=Distribution('triangular', (0.5, 1, 1.5)),
+    proby=50_000,
+    seed=7,
+)
+
+
+def test_result_does_not_depend_on_workers():
+    tkw = Distribution('normal', (80, 4))
+    wynik = symuluj_obnizke(tkw, 100, chunk_size=7_000, **RYZYKO)
+    assert symuluj_obnizke(tkw, 100, chunk_size=7_000, workers=3, **RYZYKO) == wynik
+    assert 0.3 < wynik.prawdopodobienstwo < 0.7
+    straty = list(wynik.percentyle_straty.values())
+    assert straty == sorted(straty)
+    assert symuluj_obnizke(tkw, 100, **{**RYZYKO, 'seed': 8}) != wynik
+
+
+def test_constant_inputs_are_exact():
+    # Old profit 40 * 100, new profit 20 * 100 * (1 + wzrost).
+    pewna = symuluj_obnizke(
+        80, 100, marza_stara=1 / 3, cena_nowa=100, wzrost_sprzedazy=1.5, proby=1000
+    )
+    assert pewna.prawdopodobienstwo == 1
+    assert pewna.percentyle_straty[50] == pytest.approx(-1000)
+    stratna = symuluj_obnizke(
+        80,
+        100,
+        cena_stara=120,
+        cena_nowa=100,
+        wzrost_sprzedazy=Distribution('uniform', (0.2, 0.8)),
+        proby=1000,
+    )
+    assert stratna.prawdopodobienstwo == 0
+    assert 400 <= stratna.strata_srednia <= 1600
+
+
+def test_invalid_input():
+    with pytest.raises(DiscountError) as exc:
+        symuluj_obnizke(80, 100, cena_stara=120)
+    assert exc.value.code == ERR_PAIR_NEW
+    with pytest.raises(ValueError):
+        Distribution('uniform', (2, 1))
+    with pytest.raises(ValueError):
+        Distribution('normal', (1,))
@@ -0,0 +1,104 @@
+import io
+
+import numpy as np
+import pytest
+
+from margin_calculator.store import (
+    calculate_store,
+    import_csv,
+    open_store,
+    update_store,
+)
+
+
+CSV = (
+    'SKU;Name;TKW;Cena;Marza;Ilosc\n'
+    'A;first;50;100;;3\n'
+    'LONGER-SKU-Ż;second;50,00;;0,2;\n'
+    'C;third;x;100;;1\n'
+    'D;fourth;50;;;1\n'
+)
+
+
+def test_import_and_reopen(tmp_path):
+    summary = import_csv(io.StringIO(CSV), tmp_path, delimiter=';', chunk_size=1)
+    assert summary.rows == 4
+    assert summary.invalid == {'tkw': 1, 'cena': 0, 'marza': 0, 'ilosc': 0}
+
+    store = open_store(tmp_path)
+    assert len(store) == 4
+    assert isinstance(store['tkw'], np.memmap)
+    assert 'name' not in store
+    # SKU chunks of different widths are rewritten to a common width.
+    assert store['sku'].tolist() == [b'A', 'LONGER-SKU-Ż'.encode(), b'C', b'D']
+    np.testing.assert_array_equal(store['ilosc'], [3, np.nan, 1, 1])
+
+
+def test_calculate_store(tmp_path):
+    import_csv(io.StringIO(CSV), tmp_path, delimiter=';')
+    sink = io.StringIO()
+    summary = calculate_store(open_store(tmp_path), sink, chunk_size=3)
+    assert (summary.rows, summary.errors) == (4, 2)
+    assert sink.getvalue().splitlines() == [
+        'sku,tkw,cena,marza,error',
+        'A,50.0,100.0,0.5,',
+        'LONGER-SKU-Ż,50.0,62.5,0.2,',
+        'C,,,,missing tkw',
+        'D,50.0,,,provide either cena or marza',
+    ]
+
+
+def test_calculate_store_hybrid_reports_fallbacks(tmp_path):
+    import_csv(io.StringIO('tkw,marza\n0.9,0.2\n50,0.2\n'), tmp_path)
+    sink = io.StringIO()
+    summary = calculate_store(open_store(tmp_path), sink, engine='hybrid')
+    assert (summary.rows, summary.errors, summary.fallbacks) == (2, 0, 1)
+    assert sink.getvalue().splitlines()[1:] == ['0.9,1.12,0.2,', '50.0,62.5,0.2,']
+
+
+def test_calculate_store_fixed_rejects_rows_not_the_chunk(tmp_path):
+    rows = 'tkw,cena,marza\n50,100,\n1e12,100,\n0.015,1,\n50,,0.2\n50,,0.1234567\n'
+    import_csv(io.StringIO(rows), tmp_path)
+    sink = io.StringIO()
+    summary = calculate_store(open_store(tmp_path), sink, engine='fixed')
+    assert (summary.rows, summary.errors) == (5, 3)
+    assert sink.getvalue().splitlines()[1:] == [
+        '50.0,100.0,0.5,',
+        '1000000000000.0,,,tkw not representable in fixed point',
+        '0.015,,,tkw not representable in fixed point',
+        '50.0,62.5,0.2,',
+        '50.0,,,marza not representable in fixed point',
+    ]
+
+
+def test_update_store_by_sku(tmp_path):
+    import_csv(io.StringIO('sku,tkw,cena,marza\nA,80,100,\nB,50,,0.5\n'),
+               tmp_path / 'store')
+    before = open_store(tmp_path / 'store')
+    import_csv(io.StringIO('sku,tkw,cena\nB,,60\nNEW,5,10\n'), tmp_path / 'delta')
+    rows = update_store(tmp_path / 'store', open_store(tmp_path / 'delta'))
+    assert rows.tolist() == [1, 2]
+    store = open_store(tmp_path / 'store')
+    assert store['sku'].tolist() == [b'A', b'B', b'NEW']
+    np.testing.assert_array_equal(store['tkw'], [80, 50, 5])
+    np.testing.assert_array_equal(store['cena'], [100, 60, 10])
+    # The new price replaced the margin of its row.
+    assert np.isnan(store['marza']).all()
+    # A store opened before the update keeps its values.
+    assert before['cena'][1] != before['cena'][1] and len(before) == 2
+    import_csv(io.StringIO('sku,ilosc\nA,1\n'), tmp_path / 'other')
+    update_store(tmp_path / 'store', open_store(tmp_path / 'other'))
+    np.testing.assert_array_equal(open_store(tmp_path / 'store')['ilosc'][:2],
+                                  [1, np.nan])
+    import_csv(io.StringIO('tkw\n1\n'), tmp_path / 'unnamed')
+    with pytest.raises(ValueError, match='sku column'):
+        update_store(tmp_path / 'store', open_store(tmp_path / 'unnamed'))
+
+
+def test_empty_and_missing_stores(tmp_path):
+    import_csv(io.StringIO('tkw,cena\n'), tmp_path / 'empty')
+    assert len(open_store(tmp_path / 'empty')) == 0
+    with pytest.raises(ValueError):
+        open_store(tmp_path / 'missing')
+    with pytest.raises(ValueError):
+        import_csv(io.StringIO('sku,name\nA,x\n'), tmp_path / 'bad')
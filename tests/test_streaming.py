@@ -0,0 +1,86 @@
+import io
+import json
+
+import pytest
+
+from margin_calculator.streaming import calculate_row, guess_format, process_stream
+
+
+def test_calculate_row_from_price():
+    row = calculate_row({'sku': 'A', 'tkw': '50', 'cena': '100'})
+    assert row == {'sku': 'A', 'tkw': '50', 'cena': '100', 'marza': '0.5'}
+
+
+def test_calculate_row_from_margin_with_comma():
+    row = calculate_row({'tkw': '50', 'cena': '', 'marza': '0,2'})
+    assert row['cena'] == '62.5'
+
+
+def test_calculate_row_requires_single_target():
+    with pytest.raises(ValueError):
+        calculate_row({'tkw': '50', 'cena': '100', 'marza': '0.2'})
+    with pytest.raises(ValueError):
+        calculate_row({'tkw': '50'})
+
+
+def test_process_stream_jsonl_continues_after_errors():
+    source = io.StringIO(
+        '{"tkw": 50, "cena": 100}\nnot json\n\n{"tkw": "a", "cena": 1}\n'
+        '{"tkw": 10, "marza": 1}\n'
+    )
+    sink, errors = io.StringIO(), io.StringIO()
+    summary = process_stream(source, sink, fmt='jsonl', errors=errors)
+    rows = [json.loads(line) for line in sink.getvalue().splitlines()]
+    assert (summary.rows, summary.errors) == (4, 2)
+    assert rows[0]['marza'] == '0.5'
+    assert rows[1]['error'].startswith('invalid JSON')
+    assert rows[2]['error'] == "invalid tkw: 'a'"
+    assert rows[3]['cena'] == '0'
+    assert errors.getvalue().splitlines()[0].startswith('line 2:')
+
+
+def test_process_stream_csv_delimiter():
+    source = io.StringIO('tkw;marza\n50;0,2\n')
+    sink = io.StringIO()
+    process_stream(source, sink, delimiter=';')
+    assert sink.getvalue().splitlines() == ['tkw;marza;cena;error', '50;0.2;62.5;']
+
+
+def test_guess_format():
+    assert guess_format('prices.jsonl') == 'jsonl'
+    assert guess_format('prices.csv') == 'csv'
+    assert guess_format('-') == 'csv'
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'jsonl'])
+def test_process_stream_parallel_preserves_order(fmt):
+    if fmt == 'csv':
+        lines = ['tkw,cena,marza'] + [f'{i},{i + 100},' for i in range(50)]
+        lines.insert(10, 'bad,1,')
+    else:
+        lines = [json.dumps({'tkw': i, 'marza': '0.2'}) for i in range(50)]
+        lines.insert(10, '{broken')
+    text = '\n'.join(lines) + '\n'
+    outputs = []
+    for workers in (1, 2):
+        sink, errors = io.StringIO(), io.StringIO()
+        summary = process_stream(
+            io.StringIO(text), sink, fmt=fmt, errors=errors,
+            workers=workers, chunk_size=7,
+        )
+        assert (summary.rows, summary.errors) == (51, 1)
+        assert errors.getvalue().startswith('line 11:')
+        outputs.append(sink.getvalue())
+    assert outputs[0] == outputs[1]
+
+
+def test_process_stream_rejects_bad_chunk_size():
+    with pytest.raises(ValueError):
+        process_stream(io.StringIO(''), io.StringIO(), chunk_size=0)
+
+
+def test_calculate_row_fixed_engine():
+    row = calculate_row({'tkw': '80', 'marza': '0.4'}, engine='fixed')
+    assert row['cena'] == '133.33'
+    with pytest.raises(ValueError):
+        calculate_row({'tkw': '0.015', 'cena': '1'}, engine='fixed')
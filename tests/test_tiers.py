@@ -0,0 +1,72 @@
+import io
+
+import numpy as np
+import pytest
+
+from margin_calculator.discount import ERR_LOSS, ERR_PAIR_NEW
+from margin_calculator.tiers import TierTable, oblicz_obnizke_progowa, read_tiers
+
+
+def _profit(tkw, progi, ceny, ilosc):
+    granice = list(progi[1:]) + [np.inf]
+    return sum(
+        max(0, min(ilosc, koniec) - poczatek) * (cena - tkw)
+        for poczatek, koniec, cena in zip(progi, granice, ceny)
+    )
+
+
+def test_lookups_match_tier_walk():
+    rng = np.random.default_rng(0)
+    size = 500
+    tkw = rng.uniform(10, 100, size)
+    progi = [
+        [0, *np.cumsum(rng.integers(1, 200, rng.integers(0, 6))).tolist()]
+        for _ in range(size)
+    ]
+    ceny = [(tkw[i] * rng.uniform(0.9, 2, len(progi[i]))).tolist() for i in range(size)]
+    tabela = TierTable(tkw, progi, ceny)
+    ilosc = rng.uniform(0, 1000, size)
+    expected = [_profit(tkw[i], progi[i], ceny[i], ilosc[i]) for i in range(size)]
+    np.testing.assert_allclose(tabela.zysk(ilosc), expected)
+    cel = rng.uniform(1, 30_000, size)
+    potrzebna = tabela.ilosc_dla_zysku(cel)
+    for i in range(size):
+        if np.isnan(potrzebna[i]):
+            # Unreachable only when the last tier does not earn anything.
+            assert ceny[i][-1] <= tkw[i]
+            continue
+        zysk = _profit(tkw[i], progi[i], ceny[i], potrzebna[i])
+        assert zysk == pytest.approx(cel[i])
+        assert _profit(tkw[i], progi[i], ceny[i], potrzebna[i] - 1e-6) < cel[i]
+
+
+def test_break_even_against_flat_price():
+    stary = TierTable.flat([80, 80, 80], [120, 120, 120])
+    nowy = TierTable([80, 80, 80], [[0, 100], [0, 50], []], [[120, 100], [120, 79], []])
+    wynik = oblicz_obnizke_progowa(stary, nowy, 200)
+    assert wynik.zysk_stary.tolist() == [8000, 8000, 8000]
+    assert wynik.strata[0] == 2000
+    assert wynik.ilosc_nowych[0] == 300
+    assert wynik.ilosc_dodatkowa[0] == 100
+    assert wynik.blad.tolist() == ['', ERR_LOSS, ERR_PAIR_NEW]
+    with pytest.raises(ValueError, match='start at quantity 0'):
+        TierTable([80], [[10, 100]], [[120, 100]])
+    with pytest.raises(ValueError, match='increase'):
+        TierTable([80], [[0, 100, 100]], [[120, 110, 100]])
+
+
+def test_read_tiers():
+    source = io.StringIO(
+        'sku;tkw;ilosc_stara;prog;cena_stara;cena_nowa\n'
+        'A;;;100;;100\n'
+        'A;80;200;0;120;120\n'
+        'B;50,5;10;0;60;55\n'
+    )
+    katalog = read_tiers(source, delimiter=';')
+    assert katalog.sku == ['A', 'B']
+    assert katalog.ilosc_stara.tolist() == [200, 10]
+    assert katalog.nowy.liczba_progow.tolist() == [2, 1]
+    assert katalog.stary.liczba_progow.tolist() == [1, 1]
+    np.testing.assert_array_equal(katalog.nowy.tkw, [80, 50.5])
+    with pytest.raises(ValueError, match='missing column: prog'):
+        read_tiers(io.StringIO('sku,tkw,ilosc_stara,cena_stara,cena_nowa\n'))
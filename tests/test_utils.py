@@ -0,0 +1,50 @@
+from decimal import Decimal
+
+import numpy as np
+
+from margin_calculator.utils import _to_decimal, _to_decimal_column, _to_int_column
+
+
+def test_decimal_column_matches_scalar_parser():
+    cells = ['1,5', '', None, 'abc', ' 2 ', '1e3', '-0,25', '1 2', '.5', '5.']
+    parsed, valid = _to_decimal_column(cells)
+    expected = [_to_decimal(c, none_on_error=True) for c in cells]
+    assert valid.tolist() == [e is not None for e in expected]
+    assert parsed.tolist() == [float(e) if e is not None else 0.0 for e in expected]
+
+
+def test_decimal_column_none_on_error_gives_nan():
+    parsed, valid = _to_decimal_column(['1,5', 'n/a', ''], none_on_error=True)
+    assert parsed[0] == 1.5 and np.isnan(parsed[1]) and parsed[2] == 0.0
+    assert valid.tolist() == [True, False, True]
+
+
+def test_decimal_column_bytes_arrays_and_line_breaks():
+    parsed, valid = _to_decimal_column([b'12,34', b'x', b''])
+    assert parsed.tolist() == [12.34, 0.0, 0.0]
+    assert valid.tolist() == [True, False, True]
+    parsed, valid = _to_decimal_column(np.array([['1\n', '2\n3'], ['4', '']]))
+    assert parsed.shape == (2, 2)
+    assert valid.tolist() == [[True, False], [True, True]]
+
+
+def test_decimal_column_numeric_and_empty_input():
+    parsed, valid = _to_decimal_column(np.array([1, 2]))
+    assert parsed.dtype == np.float64 and valid.all()
+    parsed, valid = _to_decimal_column([])
+    assert parsed.size == 0 and valid.size == 0
+
+
+def test_int_column_truncates_like_to_int():
+    values, valid = _to_int_column(['1,9', '-2,7', 'x', 'inf', ''])
+    assert values.dtype == np.int64
+    assert values.tolist() == [1, -2, 0, 0, 0]
+    assert valid.tolist() == [True, True, False, False, True]
+    values, valid = _to_int_column(['7', 'x'], none_on_error=True)
+    assert values[0] == 7 and np.isnan(values[1])
+
+
+def test_scalar_helpers_unchanged():
+    assert _to_decimal('1,5') == Decimal('1.5')
+    assert _to_decimal('x') == Decimal('0')
+    assert _to_decimal('x', none_on_error=True) is None
@@ -0,0 +1,281 @@
+"""Break-even analysis for tiered volume-discount price lists.
+
+A tiered schedule prices units by quantity tiers: tier ``j`` starts at the
+quantity ``progi[j]`` (the first one at ``0``) and every unit beyond that
+threshold, up to the next one, is sold at ``ceny[j]``. The profit of ``Q``
+units is therefore piecewise linear in ``Q``.
+
+:class:`TierTable` holds the schedules of a whole catalog, one per row, as
+padded two-dimensional arrays and precomputes the cumulative profit at the
+start of every tier. The profit of a quantity and the smallest quantity
+reaching a profit are then found by a binary search over the tiers of every
+row at once, and :func:`oblicz_obnizke_progowa` answers the question of
+:func:`discount.oblicz_obnizke` -- how many extra units recover the loss of
+a price change -- for old and new schedules of every row.
+"""
+
+import csv
+from typing import IO, NamedTuple, Sequence
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+try:  # Prefer relative import when installed as a package
+    from .discount import ERR_FILL, ERR_LOSS, ERR_PAIR_NEW, ERR_PAIR_OLD
+    from .utils import _to_decimal_column
+except ImportError:  # Fallback for running as a standalone script
+    from discount import ERR_FILL, ERR_LOSS, ERR_PAIR_NEW, ERR_PAIR_OLD
+    from utils import _to_decimal_column
+
+TIER_COLUMNS = ("sku", "tkw", "ilosc_stara", "prog", "cena_stara", "cena_nowa")
+
+
+def _search_rows(table: np.ndarray, values: np.ndarray, side: str) -> np.ndarray:
+    """Row-wise :func:`numpy.searchsorted` of ``values`` in sorted ``table``.
+
+    All rows are bisected together, taking ``log2`` of the number of columns
+    steps.
+    """
+    rows = np.arange(len(table))
+    lo = np.zeros(len(table), dtype=np.int64)
+    hi = np.full(len(table), table.shape[1], dtype=np.int64)
+    while True:
+        active = lo < hi
+        if not active.any():
+            return lo
+        mid = (lo + hi) // 2
+        probe = table[rows, np.minimum(mid, table.shape[1] - 1)]
+        right = (probe <= values) if side == "right" else (probe < values)
+        right &= active
+        lo = np.where(right, mid + 1, lo)
+        hi = np.where(active & ~right, mid, hi)
+
+
+class TierTable:
+    """Tiered price schedules of a catalog with precomputed cumulative profits.
+
+    Parameters
+    ----------
+    tkw : array_like
+        Unit production cost of every row.
+    progi, ceny : sequence of sequences of float
+        Tier thresholds and unit prices of every row. Thresholds must
+        increase and start at ``0``; a row without tiers has no schedule.
+
+    Examples
+    --------
+    >>> tabela = TierTable([80, 80], [[0, 100, 500], [0]], [[120, 110, 100], [110]])
+    >>> tabela.zysk([200, 200])
+    array([7000., 6000.])
+    >>> tabela.ilosc_dla_zysku([7000, 6000])
+    array([200., 200.])
+    """
+
+    def __init__(
+        self,
+        tkw: ArrayLike,
+        progi: Sequence[Sequence[float]],
+        ceny: Sequence[Sequence[float]],
+    ):
+        self.tkw = np.asarray(tkw, dtype=np.float64).reshape(-1)
+        if not len(self.tkw) == len(progi) == len(ceny):
+            raise ValueError("tkw, progi and ceny differ in length")
+        self.liczba_progow = np.array([len(row) for row in progi], dtype=np.int64)
+        if any(len(row) != len(cena) for row, cena in zip(progi, ceny)):
+            raise ValueError("progi and ceny of a row differ in length")
+        width = max(1, int(self.liczba_progow.max(initial=0)))
+        self.progi = np.full((len(progi), width), np.inf)
+        self.ceny = np.full((len(ceny), width), np.nan)
+        for row, (prog, cena) in enumerate(zip(progi, ceny)):
+            self.progi[row, : len(prog)] = prog
+            self.ceny[row, : len(cena)] = cena
+        tiers = self.progi < np.inf
+        if np.isnan(self.progi).any() or np.isnan(self.ceny[tiers]).any():
+            raise ValueError("tier thresholds and prices must be numbers")
+        filled = self.liczba_progow > 0
+        if (self.progi[filled, 0] != 0).any():
+            raise ValueError("the first tier must start at quantity 0")
+        with np.errstate(invalid="ignore"):  # inf - inf between padding
+            szerokosc = np.diff(self.progi, axis=1, append=np.inf)
+        if (szerokosc <= 0).any():
+            raise ValueError("tier thresholds must increase")
+
+        # Unit profit and the profit of every tier from its start to its end.
+        self.jednostkowy = self.ceny - self.tkw[:, None]
+        with np.errstate(invalid="ignore"):
+            przyrost = np.where(self.jednostkowy == 0, 0, self.jednostkowy * szerokosc)
+        skumulowany = np.zeros_like(przyrost)
+        np.cumsum(przyrost[:, :-1], axis=1, out=skumulowany[:, 1:])
+        # Profit at the start of every tier and the highest profit reached up
+        # to the end of every tier, which is sorted along every row.
+        self.na_progu = skumulowany
+        najwyzszy = np.fmax(skumulowany, skumulowany + przyrost)
+        najwyzszy[~tiers] = -np.inf
+        self._osiagalny = np.maximum.accumulate(najwyzszy, axis=1)
+
+    @classmethod
+    def flat(cls, tkw: ArrayLike, cena: ArrayLike) -> "TierTable":
+        """Return schedules with a single price; ``NaN`` gives no schedule."""
+        tkw = np.asarray(tkw, dtype=np.float64).reshape(-1)
+        cena = np.broadcast_to(np.asarray(cena, dtype=np.float64), tkw.shape)
+        return cls(
+            tkw,
+            [[] if np.isnan(c) else [0.0] for c in cena.tolist()],
+            [[] if np.isnan(c) else [c] for c in cena.tolist()],
+        )
+
+    def __len__(self) -> int:
+        return len(self.tkw)
+
+    def zysk(self, ilosc: ArrayLike) -> np.ndarray:
+        """Return the total profit of selling ``ilosc`` units of every row.
+
+        ``NaN`` for rows without a schedule.
+        """
+        ilosc = np.broadcast_to(np.asarray(ilosc, dtype=np.float64), self.tkw.shape)
+        tier = np.maximum(_search_rows(self.progi, ilosc, "right") - 1, 0)
+        rows = np.arange(len(self))
+        return self.na_progu[rows, tier] + self.jednostkowy[rows, tier] * (
+            ilosc - self.progi[rows, tier]
+        )
+
+    def ilosc_dla_zysku(self, zysk: ArrayLike) -> np.ndarray:
+        """Return the smallest quantity of every row earning ``zysk`` in total.
+
+        ``NaN`` for rows whose schedule never reaches the profit, for example
+        because the unit profit of its last tier is not positive.
+        """
+        zysk = np.broadcast_to(np.asarray(zysk, dtype=np.float64), self.tkw.shape)
+        tier = _search_rows(self._osiagalny, zysk, "left")
+        reached = tier < self.progi.shape[1]
+        tier = np.minimum(tier, self.progi.shape[1] - 1)
+        rows = np.arange(len(self))
+        start = self.na_progu[rows, tier]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ilosc = self.progi[rows, tier] + np.where(
+                start >= zysk, 0, (zysk - start) / self.jednostkowy[rows, tier]
+            )
+        return np.where(reached & ~np.isnan(zysk), ilosc, np.nan)
+
+
+class TierBatchResult(NamedTuple):
+    """Result of :func:`oblicz_obnizke_progowa`.
+
+    ``zysk_stary`` and ``zysk_nowy`` are the total profits of ``ilosc_stara``
+    units under the old and the new schedule, ``strata`` their difference and
+    ``ilosc_nowych`` the total quantity, rounded to whole units, at which the
+    new schedule earns ``zysk_stary``. ``blad`` holds a :mod:`discount` error
+    code or an empty string per row.
+    """
+
+    zysk_stary: np.ndarray
+    zysk_nowy: np.ndarray
+    strata: np.ndarray
+    ilosc_dodatkowa: np.ndarray
+    ilosc_nowych: np.ndarray
+    blad: np.ndarray
+
+
+def oblicz_obnizke_progowa(
+    stary: TierTable, nowy: TierTable, ilosc_stara: ArrayLike
+) -> TierBatchResult:
+    """Return the extra sales needed after changing tiered price lists.
+
+    Both tables hold the schedules of the same rows; a flat old price can be
+    given with :meth:`TierTable.flat`. Failing rows are marked in ``blad``
+    like in :func:`batch.oblicz_obnizke_batch`: ``ERR_LOSS`` when the new
+    schedule never earns the old profit.
+
+    Examples
+    --------
+    >>> stary = TierTable.flat([80], [120])
+    >>> nowy = TierTable([80], [[0, 100]], [[120, 100]])
+    >>> wynik = oblicz_obnizke_progowa(stary, nowy, [200])
+    >>> wynik.strata, wynik.ilosc_dodatkowa
+    (array([2000.]), array([100.]))
+    """
+    if len(stary) != len(nowy):
+        raise ValueError("stary and nowy differ in length")
+    ilosc = np.broadcast_to(np.asarray(ilosc_stara, dtype=np.float64), stary.tkw.shape)
+    zysk_stary = stary.zysk(ilosc)
+    zysk_nowy = nowy.zysk(ilosc)
+    ilosc_nowych = np.rint(nowy.ilosc_dla_zysku(zysk_stary))
+
+    blad = np.full(len(stary), "", dtype="<U12")
+    blad[np.isnan(ilosc_nowych)] = ERR_LOSS
+    blad[nowy.liczba_progow == 0] = ERR_PAIR_NEW
+    blad[stary.liczba_progow == 0] = ERR_PAIR_OLD
+    blad[np.isnan(stary.tkw) | np.isnan(nowy.tkw) | np.isnan(ilosc)] = ERR_FILL
+    return TierBatchResult(
+        zysk_stary=zysk_stary,
+        zysk_nowy=zysk_nowy,
+        strata=zysk_stary - zysk_nowy,
+        ilosc_dodatkowa=ilosc_nowych - ilosc,
+        ilosc_nowych=ilosc_nowych,
+        blad=blad,
+    )
+
+
+class TierCatalog(NamedTuple):
+    """Catalog read by :func:`read_tiers`."""
+
+    sku: list[str]
+    ilosc_stara: np.ndarray
+    stary: TierTable
+    nowy: TierTable
+
+
+def read_tiers(source: IO[str], *, delimiter: str = ",") -> TierCatalog:
+    """Return the tiered catalog in the CSV ``source``.
+
+    The file has one row per tier with the columns ``TIER_COLUMNS``. Rows of
+    the same ``sku`` form its schedules, in any order; ``tkw`` and
+    ``ilosc_stara`` are taken from the first row of a SKU giving them. A
+    blank ``cena_stara`` or ``cena_nowa`` leaves the tier out of that
+    schedule. Numbers may use a decimal comma.
+    """
+    reader = csv.reader(source, delimiter=delimiter)
+    header = [name.strip().lower() for name in next(reader, [])]
+    missing = [name for name in TIER_COLUMNS if name not in header]
+    if missing:
+        raise ValueError(f"missing column: {', '.join(missing)}")
+    indices = [header.index(name) for name in TIER_COLUMNS]
+    rows = [
+        [row[index].strip() if index < len(row) else "" for index in indices]
+        for row in reader
+        if row
+    ]
+    cells = dict(zip(TIER_COLUMNS, zip(*rows))) if rows else {}
+    values = {}
+    for name in TIER_COLUMNS[1:]:
+        column = cells.get(name, ())
+        parsed, valid = _to_decimal_column(column, none_on_error=True)
+        if not valid.all():
+            raise ValueError(f"invalid {name}: {column[int(np.argmin(valid))]!r}")
+        parsed[[not cell for cell in column]] = np.nan
+        values[name] = parsed
+
+    groups: dict[str, list[int]] = {}
+    for number, sku in enumerate(cells.get("sku", ())):
+        groups.setdefault(sku, []).append(number)
+    tkw, ilosc = [], []
+    schedules: dict[str, tuple[list, list]] = {
+        "cena_stara": ([], []),
+        "cena_nowa": ([], []),
+    }
+    for numbers in groups.values():
+        for name, target in (("tkw", tkw), ("ilosc_stara", ilosc)):
+            given = values[name][numbers]
+            given = given[~np.isnan(given)]
+            target.append(given[0] if given.size else np.nan)
+        numbers = np.array(numbers)[np.argsort(values["prog"][numbers], kind="stable")]
+        for name, (progi, ceny) in schedules.items():
+            tiers = numbers[~np.isnan(values[name][numbers])]
+            progi.append(values["prog"][tiers].tolist())
+            ceny.append(values[name][tiers].tolist())
+    return TierCatalog(
+        sku=list(groups),
+        ilosc_stara=np.array(ilosc, dtype=np.float64),
+        stary=TierTable(tkw, *schedules["cena_stara"]),
+        nowy=TierTable(tkw, *schedules["cena_nowa"]),
+    )
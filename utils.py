@@ -1,7 +1,33 @@
 """Utility helpers for converting user input to numeric types."""
 
+import operator
+import re
 from decimal import Decimal, InvalidOperation
-from typing import Optional
+from itertools import compress
+from typing import TYPE_CHECKING, Iterable, Optional
+
+try:  # Prefer relative import when installed as a package
+    from .metrics import METRICS
+except ImportError:  # Fallback for running as a standalone script
+    from metrics import METRICS
+
+if TYPE_CHECKING:  # NumPy is imported lazily by the column parsers
+    import numpy as np
+
+# Syntax accepted by ``float()`` (after the decimal comma has been replaced).
+_DIGITS = r"\d(?:_?\d)*"
+_NUMBER = re.compile(
+    rf"\s*[+-]?(?:(?:{_DIGITS}(?:\.(?:{_DIGITS})?)?|\.{_DIGITS})"
+    rf"(?:[eE][+-]?{_DIGITS})?|inf(?:inity)?|nan)\s*",
+    re.IGNORECASE,
+)
+_EMPTY_LINE = re.compile(r"^$", re.MULTILINE)
+# Lines that are not plain decimal numbers and need the full ``_NUMBER`` check,
+# and a character that cannot occur in plain decimal numbers.
+_NOT_PLAIN_LINE = re.compile(
+    r"^(?![ \t]*[+-]?(?:\d+\.?\d*|\.\d+)[ \t]*$).*$", re.MULTILINE | re.ASCII
+)
+_NOT_PLAIN_CHAR = re.compile(r"[^0-9.+\-\n \t]")
 
 
 def _to_decimal(value: str, *, none_on_error: bool = False) -> Optional[Decimal]:
@@ -16,6 +42,7 @@ def _to_decimal(value: str, *, none_on_error: bool = False) -> Optional[Decimal]
     try:
         return Decimal(value.replace(",", "."))
     except (InvalidOperation, AttributeError):
+        METRICS.count("parse_errors")
         return None if none_on_error else Decimal("0")
 
 
@@ -32,3 +59,144 @@ def _to_int(value: str, *, none_on_error: bool = False) -> Optional[int]:
         return int(dec)
     except (InvalidOperation, ValueError):
         return None if none_on_error else 0
+
+
+def _decimal_field(row: dict, name: str) -> Optional[Decimal]:
+    """Return ``row[name]`` as ``Decimal`` or ``None`` when it is blank.
+
+    Values of any type are converted through ``str``; ``ValueError`` is
+    raised for values that cannot be parsed.
+    """
+    value = row.get(name)
+    if value is None or (isinstance(value, str) and value.strip() == ""):
+        return None
+    dec = _to_decimal(str(value).strip(), none_on_error=True)
+    if dec is None:
+        raise ValueError(f"invalid {name}: {value!r}")
+    return dec
+
+
+def _column_text(cells: list) -> str:
+    """Join ``cells`` into one newline separated string.
+
+    ``None`` becomes an empty line and objects that are neither ``str`` nor
+    ``bytes`` become a line that does not parse.
+    """
+    try:
+        return "\n".join(cells)
+    except TypeError:
+        pass
+    try:
+        return b"\n".join(cells).decode("utf-8", "replace")
+    except TypeError:
+        pass
+    return "\n".join(
+        (
+            ""
+            if cell is None
+            else cell.decode("utf-8", "replace")
+            if isinstance(cell, bytes)
+            else cell
+            if isinstance(cell, str)
+            else "\0"
+        )
+        for cell in cells
+    )
+
+
+def _replace_line_breaks(cell):
+    """Return ``cell`` with line breaks replaced by spaces."""
+    if isinstance(cell, str):
+        return cell.replace("\n", " ")
+    if isinstance(cell, bytes):
+        return cell.replace(b"\n", b" ")
+    return cell
+
+
+def _to_decimal_column(
+    values: Iterable, *, none_on_error: bool = False
+) -> tuple["np.ndarray", "np.ndarray"]:
+    """Convert a whole column of user input to ``float64`` in one pass.
+
+    ``values`` may be any sequence or array of ``str``, ``bytes`` or ``None``.
+    Returns the parsed values and a boolean mask that is ``False`` for cells
+    that could not be parsed. Like :func:`_to_decimal`, decimal commas are
+    accepted and empty strings and ``None`` are treated as ``0``. Invalid
+    cells are ``0`` or, when ``none_on_error`` is ``True``, ``NaN``.
+
+    The column is joined into a single string so that decimal commas are
+    rewritten in one pass. Unless the text contains characters that cannot
+    occur in plain decimal numbers, it is converted as a whole. Otherwise
+    cells that are not plain decimal numbers are located by a single regular
+    expression pass over the text and only those are validated individually;
+    no exception is raised per invalid cell.
+    """
+    import numpy as np
+
+    if isinstance(values, np.ndarray):
+        if values.dtype.kind in "biuf":
+            return values.astype(np.float64), np.ones(values.shape, dtype=bool)
+        shape, cells = values.shape, values.ravel().tolist()
+    else:
+        cells = list(values)
+        shape = (len(cells),)
+    count = len(cells)
+    if count == 0:
+        return np.zeros(shape), np.ones(shape, dtype=bool)
+
+    text = _column_text(cells)
+    if text.count("\n") != count - 1:  # line breaks inside cells
+        text = _column_text([_replace_line_breaks(cell) for cell in cells])
+    text = text.replace(",", ".")
+
+    valid = np.ones(count, dtype=bool)
+    if _NOT_PLAIN_CHAR.search(text) is None:
+        try:
+            lines = _EMPTY_LINE.sub("0", text).split("\n")
+            parsed = np.fromiter(map(float, lines), np.float64, count)
+            return parsed.reshape(shape), valid.reshape(shape)
+        except ValueError:
+            pass
+
+    suspicious: list[str] = []
+
+    def flag(match: re.Match) -> str:
+        suspicious.append(match.group())
+        return "nan"
+
+    text = _NOT_PLAIN_LINE.sub(flag, text)
+    parsed = np.fromiter(map(float, text.split("\n")), np.float64, count)
+    # Plain numbers never parse as NaN, so these are exactly the flagged cells.
+    flagged = np.flatnonzero(np.isnan(parsed))
+    empty = np.fromiter(map(operator.not_, suspicious), bool, len(flagged))
+    ok = np.fromiter(map(bool, map(_NUMBER.fullmatch, suspicious)), bool, len(flagged))
+    parsed[flagged] = np.nan if none_on_error else 0.0
+    parsed[flagged[empty]] = 0.0
+    parsed[flagged[ok]] = np.fromiter(
+        map(float, compress(suspicious, ok)), np.float64, ok.sum()
+    )
+    invalid = flagged[~(ok | empty)]
+    valid[invalid] = False
+    METRICS.count("parse_errors", len(invalid))
+    return parsed.reshape(shape), valid.reshape(shape)
+
+
+def _to_int_column(
+    values: Iterable, *, none_on_error: bool = False
+) -> tuple["np.ndarray", "np.ndarray"]:
+    """Convert a whole column of user input to integers in one pass.
+
+    Values are parsed by :func:`_to_decimal_column` and truncated towards
+    zero like :func:`_to_int`. Non-finite values and values outside of the
+    ``int64`` range are invalid. The result is an ``int64`` array holding
+    ``0`` for invalid cells or, when ``none_on_error`` is ``True``, a
+    ``float64`` array of integral values holding ``NaN`` for invalid cells.
+    """
+    import numpy as np
+
+    parsed, valid = _to_decimal_column(values)
+    truncated = np.trunc(parsed)
+    valid &= np.isfinite(truncated) & (np.abs(truncated) < 2.0**63)
+    if none_on_error:
+        return np.where(valid, truncated, np.nan), valid
+    return np.where(valid, truncated, 0).astype(np.int64), valid